@@ -0,0 +1,128 @@
+import numpy as np
+import Lattice as lat
+import interactive as interact
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Default values:
+params = {"X Dimension":50,
+          "Y Dimension":-1,
+          "Seed" : None,
+          "tMax" : 5000,
+          "Engine" : "vector",
+          "MaxNodes" : 1000000,
+          "History" : 4096,
+          "Soups" : 1000,
+          "Workers" : 1,
+          "Rule" : "B3/S23",
+          "outDir" : "Census"
+          }
+"""
+Census of random soups: many lattices with random initial states (25% alive, as Main.py with no
+-i), each run until it settles into a still life or oscillator or reaches -N sweeps. For every
+soup the settle time (sweep at which the cycle was entered, -1 if it did not settle), the period,
+the final population and the drift of the centre of mass (final minus initial, the shortest way
+round the lattice) are recorded, one row per soup, in Census.csv and, as one array per column,
+Census.npz.
+
+Soups run in worker processes (-w), so Python and NumPy are only imported once per worker. Each
+soup gets its own random stream spawned from a single SeedSequence in soup order, so results are
+the same whatever the number of workers. The root seed is saved to Seed.txt.
+
+Example with 10000 soups on 4 workers:
+python Census.py -soups 10000 -w 4
+"""
+
+columns = ["Soup", "Settle", "Period", "Population", "DriftX", "DriftY"]
+
+def runSoup(task):
+    """
+    Run one soup until it settles. Runs in a worker process, so everything it needs is passed in.
+    :param task: Tuple (soupNum, seedSeq, settings), where seedSeq is the SeedSequence for this
+                 soup and settings the census parameters.
+    :return result: Tuple (soupNum, settle, period, population, driftX, driftY).
+    """
+    soupNum, seedSeq, settings = task
+    np.random.seed(seedSeq.generate_state(1)[0])
+    lattice = lat.lattice(settings["X Dimension"],
+                          settings["Y Dimension"],
+                          measure=False,
+                          engine=settings["Engine"],
+                          maxNodes=settings["MaxNodes"],
+                          cycles="stop",
+                          history=settings["History"],
+                          status=False,
+                          rule=settings["Rule"])
+    try:
+        startCoM = lattice.getCoM()
+        lattice.run(tMax=settings["tMax"])
+    finally:
+        lattice.close()                                                     # Threads or worker processes of the engine
+    if lattice.cycles.found():
+        settle, period = lattice.cycles.transient, lattice.cycles.period
+    else:
+        settle, period = -1, 0
+    # Centre of mass moved since the start, as the shortest way round the periodic lattice.
+    # Soups are too disordered to follow it sweep by sweep.
+    dims = np.array([lattice.xDim, lattice.yDim])
+    drift = (lattice.getCoM() - startCoM + 0.5*dims) % dims - 0.5*dims
+    return((soupNum, settle, period, lattice.population(), drift[0], drift[1]))
+
+def runAll(tasks, workers):
+    """
+    Run every soup, writing each result to Census.csv as it arrives.
+    :return results: Dictionary of arrays, one per column, in soup order.
+    """
+    with open("{}/Census.csv".format(params["outDir"]), "w") as outFile:
+        outFile.write(",".join(columns) + "\n")
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            output = executor.map(runSoup, tasks, chunksize=max(1, len(tasks)//(16*workers)))
+        else:
+            output = map(runSoup, tasks)
+        results = []
+        for res in output:
+            outFile.write("{},{},{},{},{},{}\n".format(*res))
+            results.append(res)
+            if len(results) % 100 == 0:
+                outFile.flush()
+                print("{} of {} soups done".format(len(results), len(tasks)))
+        if workers > 1:
+            executor.shutdown()
+    results = list(zip(*results))
+    types = [int, int, int, int, float, float]
+    return({key : np.array(col, dtype=t) for key, col, t in zip(columns, results, types)})
+
+if __name__ == "__main__":
+    # Get input from command line
+    args = sys.argv[1:]
+    interact.readArgs(args, params)
+
+    outDir = params["outDir"]
+    if os.path.exists(outDir):
+        print("Error. Output directory exists. Will not overwrite. Exitting...")
+        exit()
+    os.mkdir(outDir)
+
+    # Random streams for every soup come from one root sequence, save its entropy so it can be repeated.
+    rootSeq = np.random.SeedSequence(params["Seed"])
+    print("Root seed: {}".format(rootSeq.entropy))
+    with open("{}/Seed.txt".format(outDir), "w") as outFile:
+        outFile.write(str(rootSeq.entropy))
+
+    seeds = rootSeq.spawn(params["Soups"])
+    tasks = [(i + 1, seedSeq, params) for i, seedSeq in enumerate(seeds)]
+    start = time.time()
+    results = runAll(tasks, params["Workers"])
+    np.savez("{}/Census.npz".format(outDir), **results)
+
+    settled = results["Settle"] >= 0
+    print("{} soups in {:.1f} s".format(params["Soups"], time.time() - start))
+    print("{} of {} settled within {} sweeps".format(np.count_nonzero(settled), params["Soups"], params["tMax"]))
+    if settled.any():
+        print("Settle time: mean {:.1f}, median {:.0f}, max {}".format(results["Settle"][settled].mean(), np.median(results["Settle"][settled]), results["Settle"][settled].max()))
+        print("Final population of settled soups: mean {:.1f}".format(results["Population"][settled].mean()))
+        for period in np.unique(results["Period"][settled]):
+            print("Period {}: {} soups".format(period, np.count_nonzero(results["Period"][settled] == period)))
@@ -0,0 +1,51 @@
+"""
+Detection of repeated states, for runs which settle into still lifes or oscillators. Each
+generation is reduced to a short BLAKE2 digest of the packed board and kept in a bounded
+history; the first digest seen twice gives the period of the cycle and when it was entered.
+"""
+import hashlib
+from collections import deque
+import numpy as np
+
+def digest(data):
+    """
+    Digest of a generation.
+    :param data: Array holding the board, e.g. bits from np.packbits or words from Packed.pack.
+    """
+    return(hashlib.blake2b(np.ascontiguousarray(data).tobytes(), digest_size=16).digest())
+
+class cycleDetector(object):
+    """
+    Bounded history of generation digests. Cycles longer than the history are not found, and
+    if the start of a cycle has been dropped from the history it is found a period later,
+    overestimating the transient.
+    """
+    def __init__(self, history=4096):
+        """
+        :param history: Number of generations remembered.
+        """
+        self.history = history
+        self.seen = {}          # Time each remembered digest was first seen
+        self.order = deque()    # Remembered digests, oldest first
+        self.period = None      # Period of the cycle, once found
+        self.transient = None   # Generation at which the cycle was entered, once found
+
+    def found(self):
+        return(self.period is not None)
+
+    def check(self, key, t):
+        """
+        Record the digest of generation t, checking whether it has been seen before.
+        :return found: Whether a cycle has been found.
+        """
+        if self.found():
+            return(True)
+        if key in self.seen:
+            self.transient = self.seen[key]
+            self.period = t - self.transient
+            return(True)
+        self.seen[key] = t
+        self.order.append(key)
+        if len(self.order) > self.history:
+            del self.seen[self.order.popleft()]
+        return(False)
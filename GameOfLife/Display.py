@@ -0,0 +1,95 @@
+"""
+Plotting and animation for the Game of Life. Kept apart from the simulation so that headless
+runs never import matplotlib; Lattice and Main import this module only when they need it.
+"""
+import numpy as np
+import matplotlib.pyplot as pyplot
+from matplotlib.animation import FuncAnimation
+
+views = ["max", "density"]
+maxPixels = 800 # Largest image side drawn before downsampling automatically
+
+def downsample(lat, factor, view="max"):
+    """
+    Reduce the lattice to one pixel per factor x factor block, cropping any remainder.
+    :param lat: 2D array of 0s and 1s.
+    :param factor: Side of each block.
+    :param view: "max" (a pixel is alive if any cell in its block is) or "density" (fraction alive).
+    """
+    if factor <= 1:
+        return(lat)
+    xDim, yDim = (lat.shape[0]//factor)*factor, (lat.shape[1]//factor)*factor
+    # Combine the factor^2 strided slices, one per offset within a block, which is much
+    # quicker than reducing over a reshaped array.
+    pooled = lat[0:xDim:factor, 0:yDim:factor].astype(np.uint16)
+    for i in range(0, factor):
+        for j in range(0, factor):
+            if i > 0 or j > 0:
+                part = lat[i:xDim:factor, j:yDim:factor]
+                if view == "density":
+                    np.add(pooled, part, out=pooled, casting="unsafe")
+                else:
+                    np.maximum(pooled, part, out=pooled, casting="unsafe")
+    if view == "density":
+        return(pooled/float(factor*factor))
+    return(pooled)
+
+def autoFactor(xDim, yDim):
+    """
+    Smallest downsampling factor which fits the lattice in maxPixels.
+    """
+    return(max(1, -(-max(xDim, yDim)//maxPixels)))
+
+def animate(f, lattice, im, tMax, sweeps, factor, view):
+    """
+    Advance up to sweeps sweeps and redraw by updating the one image in place.
+    """
+    for s in range(0, sweeps):
+        if lattice.t < tMax:
+            lattice.next()
+    im.set_data(downsample(lattice.lattice, factor, view))
+    if f == -(-tMax//sweeps) - 1:
+        print("Animation finished. Please close the animation window.")
+    return([im])
+
+def display(lattice, tMax=1000, interval=300, sweeps=1, factor=0, view="max"):
+    """
+    Animate the lattice for tMax sweeps. One image is drawn and its data replaced every frame,
+    so blitting only redraws that image and the frame rate does not fall as the run goes on.
+    :param lattice: Lattice.lattice object, stepped as the animation runs.
+    :param interval: Time between frames in ms.
+    :param sweeps: Number of sweeps per frame.
+    :param factor: Downsampling factor (see downsample()), 0 to fit the lattice in maxPixels.
+    :param view: How blocks are downsampled, "max" or "density".
+    """
+    if view not in views:
+        print("Error. View {} not recognised. Options are {}.".format(view, ", ".join(views)))
+        exit()
+    if factor <= 0:
+        factor = autoFactor(lattice.xDim, lattice.yDim)
+    sweeps = max(1, sweeps)
+    fig, axis = pyplot.subplots()
+    for s in axis.spines: axis.spines[s].set_color("r")
+    axis.spines['left'].set_position(('outward', 1))
+    axis.spines['top'].set_position(('outward', 0.5))
+    im = axis.imshow(downsample(lattice.lattice, factor, view), cmap="gray", interpolation="nearest", vmin=0., vmax=1.02) #"bwr"
+    pyplot.colorbar(im)
+    frames = -(-tMax//sweeps)
+    anim = FuncAnimation(fig, animate, frames, interval=interval, blit=True, repeat=False, fargs=(lattice, im, tMax, sweeps, factor, view))
+    pyplot.show()
+    return(anim)
+
+def plotDistance(t, distance, tFit, vFit):
+    """
+    Plot the distance of the centre of mass from its starting point against time, with the fit.
+    :param t: Times of the kept measurements (may be empty).
+    :param distance: Distance from the starting point at each time.
+    :param tFit: Times at the ends of the fitted line.
+    :param vFit: Fitted distance at those times.
+    """
+    if len(t) > 0:
+        pyplot.plot(t, distance, "kx")
+    pyplot.plot(tFit, vFit, "r-")
+    pyplot.xlabel("Time")
+    pyplot.ylabel("Distance from Starting Point")
+    pyplot.show()
@@ -0,0 +1,93 @@
+"""
+Domain decomposition of the Game of Life across worker processes. The current and next
+lattices live in multiprocessing.shared_memory, and each worker owns a strip of whole rows,
+which it steps with Tiled.stepStrip() reading its halo rows (above and below, wrapping round)
+straight from the shared current lattice. Nothing is copied between processes: each
+generation the main process names the current buffer, every process meets at a barrier, the
+workers step their strips, and all meet at the barrier again before the buffers are swapped.
+
+Workers are started with fork, so they share the mappings of the parent and need nothing
+pickled. This runs on one Linux (or other Unix) machine with any number of local processes.
+"""
+import numpy as np
+import atexit
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import Tiled
+
+def strips(xDim, workers):
+    """
+    Rows (start, stop) owned by each worker, of (nearly) equal height.
+    """
+    edges = np.linspace(0, xDim, workers + 1).astype(int)
+    return([(int(edges[i]), int(edges[i + 1])) for i in range(0, workers)])
+
+def work(arrays, r0, r1, source, barrier, rule):
+    """
+    Worker loop: wait at the barrier, step rows r0 to r1 from the buffer named by source into
+    the other, and wait again. Stops when source is negative.
+    """
+    rows = np.empty((r1 - r0, arrays[0].shape[1]), dtype=arrays[0].dtype)
+    count = np.empty_like(rows)
+    ruleWork = rule.work(rows.shape)
+    while True:
+        barrier.wait()
+        if source.value < 0:
+            break
+        Tiled.stepStrip(arrays[source.value], arrays[1 - source.value], r0, r1, rows, count, rule, ruleWork)
+        barrier.wait()
+
+class stripPool(object):
+    """
+    Two lattice buffers in shared memory and the worker processes that step them.
+    """
+    def __init__(self, shape, dtype, rule, workers=1):
+        """
+        :param shape: Shape of the lattice.
+        :param dtype: Type of the lattice array.
+        :param rule: Rules.rule to apply.
+        :param workers: Number of worker processes, each owning a strip of rows.
+        """
+        if "fork" not in mp.get_all_start_methods():
+            print("Error. The distributed engine needs processes started with fork, not available here.")
+            exit()
+        ctx = mp.get_context("fork")
+        self.workers = max(1, min(workers, shape[0]))
+        nBytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        self.memory = [shared_memory.SharedMemory(create=True, size=max(1, nBytes)) for i in range(0, 2)]
+        self.arrays = [np.ndarray(shape, dtype=dtype, buffer=mem.buf) for mem in self.memory] # Current and next lattice
+        self.source = ctx.Value("i", 0, lock=False)     # Index of the current buffer, -1 to stop
+        self.barrier = ctx.Barrier(self.workers + 1)    # Workers and the main process
+        self.processes = [ctx.Process(target=work, args=(self.arrays, r0, r1, self.source, self.barrier, rule), daemon=True)
+                          for r0, r1 in strips(shape[0], self.workers)]
+        for process in self.processes:
+            process.start()
+        self.closed = False
+        atexit.register(self.close)
+
+    def step(self, src, dst):
+        """
+        Write the next generation of src into dst, both from self.arrays, returning once every strip is done.
+        """
+        self.source.value = 0 if src is self.arrays[0] else 1
+        self.barrier.wait()                             # Start
+        self.barrier.wait()                             # Every strip done
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.source.value = -1
+        self.barrier.wait()
+        for process in self.processes:
+            process.join()
+        self.arrays = None
+        for mem in self.memory:
+            mem.unlink()                                # Freed once every mapping is gone
+            try:
+                mem.close()
+            except BufferError:
+                pass                                    # The lattice still holds views, unmapped at exit
@@ -0,0 +1,254 @@
+"""
+HashLife engine for the Game of Life on a periodic lattice. The lattice is held as a quadtree
+of canonical (hash consed) nodes, so identical regions are stored once, and the result of
+advancing each node is memoised. Runs of periodic or sparse patterns can then be skipped
+forward by powers of two at a time.
+
+The periodic lattice must be square with a power of two side, L = 2^k. To advance it by 2^j
+generations the lattice is tiled into a larger node whose centre, once advanced, is again a
+(possibly shifted) copy of the periodic lattice.
+"""
+import numpy as np
+
+class node(object):
+    """
+    Node of the quadtree. Level k nodes cover 2^k x 2^k cells, level 0 nodes are single cells.
+    Nodes are only made through hashLife.join() so that equal nodes are the same object.
+    """
+    __slots__ = ("k", "nw", "ne", "sw", "se", "pop")
+
+    def __init__(self, k, nw=None, ne=None, sw=None, se=None, pop=0):
+        self.k = k
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.pop = pop # Number of live cells.
+
+dead = node(0, pop=0)
+alive = node(0, pop=1)
+
+class tableFull(Exception):
+    """
+    Raised part way through a jump when the node table has passed its ceiling.
+    """
+    pass
+
+class hashLife(object):
+    """
+    Quadtree store for a periodic lattice with memoised stepping.
+    """
+    def __init__(self, rule, maxNodes=1000000):
+        """
+        :param rule: Rules.rule to apply. Empty nodes are taken to stay empty, so it may not have birth on 0.
+        :param maxNodes: Ceiling on the number of canonical nodes, checked as a jump goes (see
+                         jump()). Beyond it everything not reachable from the current lattice
+                         is dropped along with the memoised results.
+        """
+        self.rule = rule
+        self.maxNodes = maxNodes
+        self.bounded = True     # Whether successor() enforces the ceiling.
+        self.table = {}         # Canonical nodes, keyed by their four children.
+        self.results = {}       # Memoised results, keyed by (node, j).
+        self.empty = [dead]     # Empty node of each level.
+        self.root = dead        # Lattice node, level k.
+        self.k = 0
+        self.shape = (1, 1)     # Shape of the periodic lattice before tiling.
+
+    def join(self, nw, ne, sw, se):
+        """
+        Get the canonical node with the given children.
+        """
+        key = (nw, ne, sw, se)
+        n = self.table.get(key)
+        if n is None:
+            n = node(nw.k + 1, nw, ne, sw, se, nw.pop + ne.pop + sw.pop + se.pop)
+            self.table[key] = n
+        return(n)
+
+    def emptyNode(self, k):
+        """
+        Get the empty node of level k.
+        """
+        while len(self.empty) <= k:
+            e = self.empty[-1]
+            self.empty.append(self.join(e, e, e, e))
+        return(self.empty[k])
+
+    def fromArray(self, lat):
+        """
+        Set the lattice from a dense array. Each dimension must be a power of two; the smaller
+        one is tiled (which leaves the periodic lattice unchanged) to make the node square.
+        :param lat: 2D array of 0s and 1s.
+        """
+        xDim, yDim = lat.shape
+        self.shape = (xDim, yDim)
+        L = max(xDim, yDim)
+        lat = np.tile(lat != 0, (L//xDim, L//yDim))
+        self.k = int(L).bit_length() - 1
+        self.root = self.build(lat)
+        self.collect()
+
+    def build(self, lat):
+        """
+        Recursively build the node for a square power of two array.
+        """
+        L = lat.shape[0]
+        if L == 1:
+            return(alive if lat[0, 0] else dead)
+        if not lat.any():
+            return(self.emptyNode(int(L).bit_length() - 1))
+        h = L//2
+        return(self.join(self.build(lat[:h, :h]), self.build(lat[:h, h:]), self.build(lat[h:, :h]), self.build(lat[h:, h:])))
+
+    def toArray(self):
+        """
+        Get the lattice as a dense array of 0s and 1s, with the shape passed to fromArray().
+        """
+        L = 2**self.k
+        lat = np.zeros((L, L), dtype=np.uint8)
+        self.fill(self.root, lat, 0, 0)
+        return(lat[:self.shape[0], :self.shape[1]])
+
+    def fill(self, n, lat, x, y):
+        """
+        Write the live cells of node n into lat with its top left corner at (x, y).
+        """
+        if n.pop == 0:
+            return
+        if n.k == 0:
+            lat[x, y] = 1
+            return
+        h = 2**(n.k - 1)
+        self.fill(n.nw, lat, x, y)
+        self.fill(n.ne, lat, x, y + h)
+        self.fill(n.sw, lat, x + h, y)
+        self.fill(n.se, lat, x + h, y + h)
+
+    def base(self, m):
+        """
+        Advance a level 2 (4 x 4) node by one generation, returning its 2 x 2 centre.
+        """
+        rows = [[m.nw.nw, m.nw.ne, m.ne.nw, m.ne.ne],
+                [m.nw.sw, m.nw.se, m.ne.sw, m.ne.se],
+                [m.sw.nw, m.sw.ne, m.se.nw, m.se.ne],
+                [m.sw.sw, m.sw.se, m.se.sw, m.se.se]]
+        cells = [[c.pop for c in row] for row in rows]
+        new = []
+        for i in (1, 2):
+            for j in (1, 2):
+                N = sum(cells[x][y] for x in range(i-1, i+2) for y in range(j-1, j+2)) - cells[i][j]
+                new.append(alive if self.rule.lists[cells[i][j]][N] else dead)
+        return(self.join(*new))
+
+    def successor(self, m, j):
+        """
+        Advance node m (level k) by 2^j generations, returning its level k-1 centre.
+        :param m: The node, level 2 or above.
+        :param j: Log2 of the number of generations, capped at k-2.
+        """
+        j = min(j, m.k - 2)
+        key = (m, j)
+        r = self.results.get(key)
+        if r is not None:
+            return(r)
+        if self.bounded and len(self.table) > self.maxNodes:
+            raise tableFull()
+        if m.pop == 0:
+            r = m.nw
+        elif m.k == 2:
+            r = self.base(m)
+        else:
+            a, b, c, d = m.nw, m.ne, m.sw, m.se
+            # Nine overlapping level k-1 nodes, each advanced to give level k-2 centres.
+            c1 = self.successor(a, j)
+            c2 = self.successor(self.join(a.ne, b.nw, a.se, b.sw), j)
+            c3 = self.successor(b, j)
+            c4 = self.successor(self.join(a.sw, a.se, c.nw, c.ne), j)
+            c5 = self.successor(self.join(a.se, b.sw, c.ne, d.nw), j)
+            c6 = self.successor(self.join(b.sw, b.se, d.nw, d.ne), j)
+            c7 = self.successor(c, j)
+            c8 = self.successor(self.join(c.ne, d.nw, c.se, d.sw), j)
+            c9 = self.successor(d, j)
+            if j < m.k - 2:
+                # Already advanced far enough, just take the centre.
+                r = self.join(self.join(c1.se, c2.sw, c4.ne, c5.nw),
+                              self.join(c2.se, c3.sw, c5.ne, c6.nw),
+                              self.join(c4.se, c5.sw, c7.ne, c8.nw),
+                              self.join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                # Full speed, advance the four combined nodes a second time.
+                r = self.join(self.successor(self.join(c1, c2, c4, c5), j),
+                              self.successor(self.join(c2, c3, c5, c6), j),
+                              self.successor(self.join(c4, c5, c7, c8), j),
+                              self.successor(self.join(c5, c6, c8, c9), j))
+        self.results[key] = r
+        return(r)
+
+    def jump(self, j):
+        """
+        Advance the periodic lattice by 2^j generations. If the node table passes maxNodes part
+        way through, the jump is abandoned, every node not in the lattice is dropped and the
+        lattice is advanced by two jumps of 2^(j-1) instead, so the table stays close to the
+        ceiling throughout. A single generation can not be split, so is always finished.
+        """
+        # Tile the lattice 2^m times in each direction so that the node is big enough.
+        m = max(1, j - self.k + 2)
+        big = self.root
+        for i in range(0, m):
+            big = self.join(big, big, big, big)
+        self.bounded = j > 0
+        try:
+            r = self.successor(big, j)
+        except tableFull:
+            self.collect()
+            self.jump(j - 1)
+            self.jump(j - 1)
+            return
+        if m == 1:
+            # Centre is shifted by half the lattice, swap the diagonal quadrants back.
+            r = self.join(r.se, r.sw, r.ne, r.nw)
+        else:
+            # Centre is shifted by a whole number of lattices, any copy will do.
+            while r.k > self.k:
+                r = r.nw
+        self.root = r
+        if len(self.table) > self.maxNodes:
+            self.collect()
+
+    def advance(self, n):
+        """
+        Advance the periodic lattice by n generations, using one jump for each binary digit of n.
+        """
+        j = 0
+        while n > 0:
+            if n & 1:
+                self.jump(j)
+            n >>= 1
+            j += 1
+
+    def collect(self):
+        """
+        Drop every node that is not part of the current lattice, and all memoised results.
+        """
+        self.table = {}
+        self.results = {}
+        self.empty = [dead]
+        self.register(self.root)
+
+    def register(self, n):
+        """
+        Put node n and its descendants back in the table.
+        """
+        if n.k == 0:
+            return
+        key = (n.nw, n.ne, n.sw, n.se)
+        if key in self.table:
+            return
+        self.table[key] = n
+        for child in key:
+            self.register(child)
+
+    def population(self):
+        """
+        Number of live cells in the periodic lattice (a single copy).
+        """
+        copies = (2**self.k//self.shape[0])*(2**self.k//self.shape[1])
+        return(self.root.pop//copies)
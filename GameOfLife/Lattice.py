@@ -1,94 +1,357 @@
 import numpy as np
-import matplotlib.pyplot as pyplot
-from matplotlib.animation import FuncAnimation
 import os
-from PIL import Image
+import Packed
+import Patterns
+import Rules
+import HashLife
+import Sparse
+import Tiled
+import Distributed
+import Observables
+import Cycles
+
+engines = ["vector", "loop", "packed", "hashlife", "sparse", "threaded", "distributed"]
+keeps = ["all", "ring", "none"]
+cycleActions = ["off", "stop", "skip"]
+dtypes = ["uint8", "int8"]
+palette = [(0, 0, 0), (255, 255, 255)] # Colours of dead and live cells in recorded frames
+
+def wrapSum(a, out):
+    """
+    Sum of each entry and its neighbours either side along the first axis, with periodic
+    boundary conditions, written into out without allocating (as np.roll(a, 1, 0) + a + np.roll(a, -1, 0)).
+    :param a: Array to sum.
+    :param out: Array of the same shape, not overlapping a.
+    """
+    n = a.shape[0]
+    np.add(a[:-2], a[1:-1], out=out[1:-1])
+    np.add(out[1:-1], a[2:], out=out[1:-1])
+    np.add(a[-1], a[0], out=out[0])
+    np.add(out[0], a[1 % n], out=out[0])
+    if n > 1:
+        np.add(a[-2], a[-1], out=out[-1])
+        np.add(out[-1], a[0], out=out[-1])
+
+def neighbourCount(lat, rows=None, out=None):
+    """
+    Get the number of live neighbours of every site at once, with periodic boundary conditions.
+    :param lat: 2D array of 0s and 1s.
+    :param rows: Optional work array of the same shape and dtype as lat.
+    :param out: Optional array of the same shape and dtype as lat for the result. With rows
+                and out given nothing is allocated.
+    :return N: Integer array of the same shape with the live neighbour count of each site.
+    """
+    if rows is None or out is None:
+        lat = lat.astype(np.int8, copy=False)
+        rows, out = np.empty_like(lat), np.empty_like(lat)
+    wrapSum(lat, rows)                                                   # Sum of column of 3 around each site
+    wrapSum(rows.T, out.T)                                               # Sum of 3 x 3 box
+    np.subtract(out, lat, out=out)                                       # Don't count self
+    return(out)
 
 class lattice(object):
     """
     Lattice object for the Game of Life with built in dynamics and periodic boundary
     conditions
     """
-    def __init__(self, xDim=50, yDim=0, initialState=None, measure=False):
+    def __init__(self, xDim=50, yDim=0, initialState=None, measure=False, engine="vector", maxNodes=1000000, keep="all", keepLength=1024, cycles="off", history=4096, status=True, dtype="uint8", threads=0, workers=1, rule="B3/S23"):
         """
         Constructor for the lattice object. Defaults to square lattice.
         :param xDim: The x dimension of the lattice. Defaults to 50.
         :param yDim: The y dimension of the lattice (optional), defaults to square lattice.
         :param initialState: Path to file determining initial state of lattice. If none is provided, random.
+        :param measure: Whether to record the centre of mass each sweep.
+        :param engine: Update engine, "vector" (whole lattice NumPy update, default), "loop" (per cell reference)
+                       "packed" (64 cells per uint64 word, bitwise update) or "hashlife" (memoised quadtree,
+                       for very long runs) or "sparse" (only steps tiles near recent changes, falling back to
+                       vector when busy) or "threaded" (as vector, in strips of rows on a pool of threads)
+                       or "distributed" (strips of rows stepped by worker processes on shared memory).
+                       HashLife needs power of two dimensions and pads the lattice if not.
+        :param maxNodes: Ceiling on the number of HashLife nodes (see HashLife.hashLife.jump).
+        :param keep: Which centre of mass measurements to keep as a raw series, "all", "ring" (only
+                     the last keepLength) or "none". The straight line fits of the centre of mass
+                     are accumulated as the run goes either way (see Observables.linearFit).
+        :param keepLength: Number of measurements kept with keep="ring".
+        :param cycles: What run() does once the lattice repeats a state (a still life or oscillator),
+                       "off" (no checks), "stop" or "skip" (jump ahead to the last sweep, stepping
+                       only the remainder of the period; when measuring this stops instead, as the
+                       measurements need every sweep). The period and transient are kept in self.cycles.
+        :param history: Number of sweeps remembered by the cycle check (see Cycles.cycleDetector).
+        :param status: Whether to print the state once created, and when a cycle is found.
+        :param dtype: Type of the lattice array for the vector, loop, sparse and threaded engines, "uint8"
+                      or "int8". These engines (bar sparse) write each sweep into a second preallocated
+                      array and swap the two, so no lattice sized arrays are allocated per sweep.
+        :param threads: Number of threads for the threaded engine, 0 for one per core.
+        :param workers: Number of worker processes for the distributed engine.
+        :param rule: Life-like rule for every engine, "B<birth counts>/S<survival counts>" or a name from
+                     Rules.named (see Rules.py). HashLife cannot run rules with birth on 0 neighbours.
         """
+        if engine not in engines:
+            print("Error. Engine {} not recognised. Options are {}.".format(engine, ", ".join(engines)))
+            exit()
+        self.engine = engine
+        if dtype not in dtypes:
+            print("Error. Lattice type {} not recognised. Options are {}.".format(dtype, ", ".join(dtypes)))
+            exit()
+        self.dtype = np.dtype(dtype)
+        self.rule = Rules.rule(rule)
+        if self.engine == "hashlife" and self.rule.bornFromNothing():
+            print("Error. HashLife cannot run rule {}, empty regions must stay empty (no B0).".format(self.rule))
+            exit()
+        self.packed = None # Packed words, only used by the packed engine.
+        self.hashLife = None # Quadtree, only used by the hashlife engine.
+        self.activeSet = None # Dirty tiles, only used by the sparse engine.
+        self.tiled = None # Thread pool and strips, only used by the threaded engine.
+        self.threads = threads
+        self.shared = None # Shared memory buffers and worker processes, only used by the distributed engine.
+        self.workers = workers
+        self._changed = None # Cells changed in a sweep, for measureCoM() with the dense engines.
+        if cycles not in cycleActions:
+            print("Error. Cycle option {} not recognised. Options are {}.".format(cycles, ", ".join(cycleActions)))
+            exit()
+        self.cycleAction = cycles
+        self.cycles = None # Digests of past sweeps, if checking for cycles.
+        if cycles != "off":
+            self.cycles = Cycles.cycleDetector(history)
+        if self.engine == "hashlife":
+            self.hashLife = HashLife.hashLife(self.rule, maxNodes)
         self.t = 0 # Number of sweeps performed.
+        self.resyncInterval = 1000 # Sweeps between full recomputes of the centre of mass
         self.xDim = xDim
         if yDim > 0:
             self.yDim = yDim
         else:
             self.yDim = xDim
-        if initialState is None:
+        if initialState is None and self.engine == "packed":
+            # Generate packed words directly so the dense array is never built.
+            self.packed = Packed.random(self.xDim, self.yDim)
+        elif initialState is None:
             #Generate array of determined size with random entries 0, 1 with 25% alive.
-            self.lattice = np.random.choice([0, 1], size=(self.xDim, self.yDim), p=[0.75, 0.25])
+            #Same draws as np.random.choice([0, 1], p=[0.75, 0.25]), without its int64 array.
+            self.lattice = np.random.random_sample((self.xDim, self.yDim)) >= 0.75
         elif type(initialState) is str:
-            if initialState[-4:] == ".txt":
-                self.latFromTXT(initialState)
-            elif initialState[-4:] == ".png":
-                self.latFromIMG(initialState)
-            else:
-                print("Error. Input file {} not valid. Require txt or png file.".initialState)
-                exit()
+            self.latFromFile(initialState)
         else:
-            print("Error. Input file {} not valid. Require txt or png file.".initialState)
+            print("Error. Input file {} not valid. Require {} file.".format(initialState, ", ".join(Patterns.formats)))
             exit()
         self.size = self.xDim*self.yDim
         self.measure=measure
         if self.measure:
-            self.COMList = []
-            self.tList = []
-        print(self)
+            if keep not in keeps:
+                print("Error. Keep option {} not recognised. Options are {}.".format(keep, ", ".join(keeps)))
+                exit()
+            self.COMSeries = None # Raw centre of mass series, if kept
+            if keep != "none":
+                self.COMSeries = Observables.series(keepLength, width=2, ring=(keep == "ring"))
+            self.COMTracker = None # Circular mean centre of mass, set up at the first measurement
+            self.COMStart = None # First centre of mass measured
+            self.xFit = Observables.linearFit() # Fits of centre of mass against time
+            self.yFit = Observables.linearFit() #
+        self.status = status
+        self.hooks = [] # Functions called with the lattice after every sweep
+        if self.status:
+            print(self)
     
-    def latFromTXT(self, path):
-        with open(path, "r") as inFile:                                    # Open file        
-            lines = inFile.readlines()                                     # Read file        
-            self.xDim = len(lines)                                         # Height is number of lines
-            self.yDim = max([len(line.strip("\n")) for line in lines])     # Width is (maximum) line length
-            lat = np.zeros(shape=(self.xDim, self.yDim))                   # Lattice of zeros is starting point
-            for x in range(0, len(lines)):                                 # Go through each line
-                line = lines[x].strip("\n")                                #
-                for y in range(0, len(line)):                              # Go through each character
-                    if line[y] in ["0", "1"]: lat[x, y] = float(line[y])   # Update lattice
-        self.lattice = lat                                                 # Set
-        
-    def latFromIMG(self, path):
-        img = Image.open(path).convert('L')                                     # Open image (greyscale).
-        data = np.asarray(img.getdata()).reshape((img.size[1], img.size[0]))    # Convert to array, no idea why image size is loading rotated but it is.
-        self.xDim, self.yDim = data.shape
-        for i in range(0, self.xDim):
-            for j in range(0, self.yDim):
-                if data[i, j] > 255./2.: data[i, j] = 0
-                else: data[i, j] = 1
-        self.lattice = data
+    @property
+    def lattice(self):
+        """
+        The lattice as a 2D array of 0s and 1s. For the packed engine this is unpacked on request.
+        """
+        if self.packed is not None:
+            return(Packed.unpack(self.packed, self.yDim))
+        if self.hashLife is not None:
+            return(self.hashLife.toArray())
+        return(self._lattice)
+
+    @lattice.setter
+    def lattice(self, lat):
+        if self.engine == "packed":
+            self.packed = Packed.pack(lat)
+        elif self.engine == "hashlife":
+            self.hashLife.fromArray(self.padPowerTwo(lat))
+        elif self.engine == "distributed":
+            if self.shared is not None:
+                self.shared.close()
+            self.shared = Distributed.stripPool(lat.shape, self.dtype, self.rule, self.workers)
+            self._lattice, self._back = self.shared.arrays  # Both buffers are in shared memory
+            self._lattice[...] = lat
+        else:
+            self._lattice = np.array(lat, dtype=self.dtype)     # Front buffer, the current state
+            self._back = np.empty_like(self._lattice)           # Back buffer, the next state is written here
+            if self.engine == "vector" or self.engine == "sparse":
+                self._rows = np.empty_like(self._lattice)       # Work arrays for neighbourCount()
+                self._count = np.empty_like(self._lattice)      #
+                self._work = self.rule.work(self._lattice.shape)  # Work array for the rule, if needed
+            if self.engine == "threaded":
+                if self.tiled is not None:
+                    self.tiled.close()
+                self.tiled = Tiled.tiledStepper(self._lattice.shape, self.dtype, self.rule, self.threads)
+            if self.engine == "sparse":
+                self.activeSet = Sparse.activeSet(lat.shape)
+
+    def close(self):
+        """
+        Stop the threads of the threaded engine, or the worker processes of the distributed
+        engine and free its shared memory. Nothing to do for the other engines.
+        """
+        if self.tiled is not None:
+            self.tiled.close()
+            self.tiled = None
+        if self.shared is not None:
+            self._lattice = np.array(self._lattice)                 # Keep the state once the shared memory is gone
+            self._back = None
+            self.shared.close()
+            self.shared = None
+
+    def population(self):
+        """
+        Get the number of live cells.
+        """
+        if self.packed is not None:
+            return(Packed.population(self.packed))
+        if self.hashLife is not None:
+            return(self.hashLife.population())
+        return(np.count_nonzero(self._lattice == 1))
+
+    def padPowerTwo(self, lat):
+        """
+        Pad the lattice with dead cells so that both dimensions are powers of two, as needed by HashLife.
+        Note this changes the periodic boundaries.
+        """
+        xDim, yDim = lat.shape
+        xNew, yNew = 2**int(np.ceil(np.log2(xDim))), 2**int(np.ceil(np.log2(yDim)))
+        if (xNew, yNew) != (xDim, yDim):
+            print("Warning. HashLife needs power of two dimensions, padding lattice from {} x {} to {} x {}.".format(xDim, yDim, xNew, yNew))
+            padded = np.zeros((xNew, yNew), dtype=lat.dtype)
+            padded[:xDim, :yDim] = lat
+            lat = padded
+            self.xDim, self.yDim = xNew, yNew
+        return(lat)
+
+    def latFromFile(self, path):
+        """
+        Set the lattice and its dimensions from a .txt, .png, .cells or .rle file (see Patterns.py).
+        """
+        lat = Patterns.load(path)
+        self.xDim, self.yDim = lat.shape
+        self.lattice = lat
         
     def __str__(self):
         """
         Returns string for printing key details of object.
         """
-        return("Array has shape {}, contains {} live cells and {} dead cells.".format(self.lattice.shape, np.count_nonzero(self.lattice == 1), np.count_nonzero(self.lattice == 0)))
+        live = self.population()
+        return("Array has shape {}, contains {} live cells and {} dead cells.".format((self.xDim, self.yDim), live, self.size - live))
     
     def next(self):
         """
-        Perform one sweep.
+        Perform one sweep with the selected engine.
+        """
+        if self.cycles is not None and len(self.cycles.seen) == 0:
+            self.cycles.check(self.stateKey(), self.t)                              # Remember the starting state
+        old = self._lattice if self.measure and self.engine in ["vector", "loop", "threaded", "distributed"] else None
+        if self.engine == "loop":
+            self.nextLoop()
+        elif self.engine == "packed":
+            self.packed = Packed.step(self.packed, self.yDim, self.rule)
+        elif self.engine == "hashlife":
+            self.hashLife.advance(1)
+        elif self.engine == "sparse":
+            self.nextSparse()
+        elif self.engine == "threaded":
+            self.tiled.step(self._lattice, self._back)
+            self._lattice, self._back = self._back, self._lattice
+        elif self.engine == "distributed":
+            self.shared.step(self._lattice, self._back)
+            self._lattice, self._back = self._back, self._lattice
+        else:
+            self.nextVector()
+        self.t += 1                                                                 # Increase time.
+        if self.measure:
+            self.measureCoM(old)
+        if self.cycles is not None:
+            self.cycles.check(self.stateKey(), self.t)
+        for hook in self.hooks:
+            hook(self)
+
+    def stateKey(self):
+        """
+        Digest of the current state for cycle checks, from the packed words for the packed engine
+        and the lattice packed to bits otherwise.
+        """
+        if self.packed is not None:
+            return(Cycles.digest(self.packed))
+        return(Cycles.digest(np.packbits(self.lattice == 1)))
+
+    def measureCoM(self, old=None):
+        """
+        Measure the centre of mass and add it to the fits. The circular mean is updated from the
+        cells which changed this sweep where the engine gives them, otherwise recomputed, and
+        recomputed every resyncInterval sweeps to stop rounding errors building up. Only the
+        sparse engine knows its changed cells (from the active set) without looking at the whole
+        lattice. The vector, loop, threaded and distributed engines find them by comparing with
+        the previous lattice, still in the back buffer so nothing is copied, into a preallocated
+        array. That is O(area) per sweep like the step itself, and only saves the row and column
+        counts and sums over the whole lattice of a recompute.
+        :param old: The lattice before this sweep, for the vector, loop, threaded and distributed engines.
+        """
+        if self.COMTracker is None or self.t % self.resyncInterval == 0:
+            if self.COMTracker is None:
+                self.COMTracker = Observables.circularCoM(self.xDim, self.yDim)
+            self.COMTracker.reset(self.lattice)
+        elif old is not None:
+            if self._changed is None or self._changed.shape != old.shape:
+                self._changed = np.empty(old.shape, dtype=bool)
+            rows, cols = np.nonzero(np.not_equal(old, self._lattice, out=self._changed))
+            self.COMTracker.update(rows, cols, self._lattice[rows, cols])
+        elif self.engine == "sparse":
+            rows, cols = self.activeSet.changed
+            self.COMTracker.update(rows, cols, self._lattice[rows, cols])
+        else:
+            self.COMTracker.reset(self.lattice)
+        com = self.COMTracker.measure()
+        if self.COMSeries is not None:
+            self.COMSeries.add(self.t, com)
+        if np.isnan(com).any():
+            return
+        if self.COMStart is None:
+            self.COMStart = com
+        self.xFit.add(self.t, com[0])
+        self.yFit.add(self.t, com[1])
+
+    def nextVector(self):
+        """
+        Update the whole lattice at once. Neighbour counts come from sums of shifted slices of
+        the lattice, then the rule is applied (see Rules.rule.apply), all into preallocated arrays.
+        The new state goes into the back buffer, which is then swapped with the front.
         """
-        newLat = np.empty(shape=self.lattice.shape)                                 # Updated lattice, only updated when required, otherwise kept.
+        lat = self._lattice
+        N = neighbourCount(lat, self._rows, self._count)
+        self.rule.apply(lat, N, self._back, self._work)
+        self._lattice, self._back = self._back, lat
+
+    def nextSparse(self):
+        """
+        Update only the tiles around cells which changed last sweep, or the whole lattice with
+        nextVector() if too much of it is active.
+        """
+        if self.activeSet.busy():
+            old = self._lattice
+            self.nextVector()
+            self.activeSet.markChanges(old, self._lattice)
+        else:
+            self.activeSet.step(self._lattice, self.rule)
+
+    def nextLoop(self):
+        """
+        Update the lattice one cell at a time. Slow, kept as a reference for the other engines.
+        """
+        newLat = self._back                                                         # Updated lattice, written into the back buffer.
         for i in range(0, self.xDim):                                               # Loop through lattice.
             for j in range(0, self.yDim):                                           # 
                 N = self.liveNeighbours(i, j)                                       # Get number of neighbours for site.
-                if self.lattice[i, j] == 1 and (N < 2 or N > 3):                    # Check if cell is alive and num neighbours requires change.
-                    newLat[i, j] = 0                                                # Kill live cell if required.
-                elif self.lattice[i, j] == 0 and N == 3:                            # Check if cell is dead and num neighbours requires change.                
-                    newLat[i, j] = 1                                                # Revive dead cell if required.
-                else: newLat[i, j] = self.lattice[i, j]
-        self.lattice = newLat                                                       # Update lattice.
-        self.t += 1                                                                 # Increase time.    
-        if self.measure:
-            self.COMList.append(self.getCoM())
-            self.tList.append(self.t)
+                newLat[i, j] = self.rule.lists[self.lattice[i, j]][N]               # Next state from the rule's table.
+        self._lattice, self._back = newLat, self._lattice                          # Swap buffers.
                 
     def liveNeighbours(self, i, j):
         """
@@ -107,41 +370,86 @@ class lattice(object):
 
     def getCoM(self):
         """
-        Get the centre of mass of the system, i.e. the average x and y coordinate of live sites.
-        :return x: The x coordinate of the c.o.m
-        :return y: The y coordinate of the c.o.m
+        Get the centre of mass of the system from scratch, as the circular mean of the x and y
+        coordinates of live sites (see Observables.circularCoM), so it is defined across the
+        periodic boundaries.
+        :return com: Array of the x and y coordinates of the c.o.m, NaN if undefined.
         """
-        # Get all indices of nonzero sites, average each to get 2D position of C.o.M
-        inds = np.argwhere(self.lattice > 0)
-        # If both sides of either boundary are occupied then it is crossing, return NaNs
-        if (((0 in inds[:,0] or 1 in inds[:,0]) and ((self.xDim-1) in inds[:,0] or (self.xDim-2) in inds[:,0]))\
-        or ((0 in inds[:,1] or 1 in inds[:,1]) and ((self.yDim-1) in inds[:,1] or (self.yDim-2) in inds[:,1]))):
-            com = np.array([np.nan, np.nan])
-        else:
-            com = inds.mean(axis=0)
-        return(com)
+        tracker = Observables.circularCoM(self.xDim, self.yDim)
+        tracker.reset(self.lattice)
+        return(tracker.com())
 
-    def animate(self, f, tMax):
-        if self.t <= tMax:
-            self.next()
-        im = pyplot.imshow(self.lattice, cmap="gray", interpolation="nearest") #"seismic"
-        pyplot.clim(0., 1.02)
-        if f == (tMax)-1:
-            print("Animation finished. Please close the animation window.")
-        return([im])
-        
-    def display(self, tMax=1000, interval=300):
-        fig, axis = pyplot.subplots()
-        for s in axis.spines: axis.spines[s].set_color("r")
-        axis.spines['left'].set_position(('outward', 1))
-        axis.spines['top'].set_position(('outward', 0.5))
-        pyplot.imshow(self.lattice, cmap="gray", interpolation="nearest") #"bwr"
-        pyplot.clim(0., 1.02)
-        pyplot.colorbar()
-        anim = FuncAnimation(fig, self.animate, tMax, interval=interval, blit=True, repeat=False, fargs=(tMax,))
-        pyplot.show()
+    def display(self, tMax=1000, interval=300, sweeps=1, factor=0, view="max"):
+        """
+        Animate the lattice (see Display.display, imported here so headless runs never load matplotlib).
+        :param sweeps: Number of sweeps per frame.
+        :param factor: Downsampling factor for large lattices, 0 to choose one to fit the screen.
+        :param view: How blocks are downsampled, "max" or "density".
+        """
+        import Display
+        Display.display(self, tMax, interval, sweeps, factor, view)
         
-    def run(self, tMax=1000):
+    def recordTrajectory(self, path, frames):
+        """
+        Save the state now and after every following sweep, 8 cells per byte, to a memory mapped
+        file (see Trajectory.py), through a hook. Close the writer returned once the run is over.
+        :param path: Output .npy file.
+        :param frames: Number of frames to allocate space for, usually tMax + 1.
+        :return writer: The Trajectory.trajectoryWriter.
+        """
+        import Trajectory
+        writer = Trajectory.trajectoryWriter(path, self.frame().shape, frames, packed=True)
+        writer(self)
+        self.hooks.append(writer)
+        return(writer)
+
+    def frame(self):
+        """
+        Get the current state as a uint8 image of palette indices (0 dead, 1 alive) for a Video.frameWriter.
+        """
+        return(self.lattice.astype(np.uint8, copy=False))
+
+    def record(self, path, tMax=1000, sweeps=1, factor=1, fmt="auto", fps=30):
+        """
+        Run for tMax sweeps without a window, writing a frame every sweeps sweeps (see Video.py).
+        :param path: Output file or directory.
+        :param factor: Keep every factor-th row and column of each frame.
+        :param fmt: Video format, one of Video.formats.
+        :param fps: Frames per second of movies.
+        """
+        import Video
+        sweeps = max(1, sweeps)
+        writer = Video.frameWriter(path, self.frame().shape, tMax//sweeps + 1, palette, fmt, fps, factor)
+        try:
+            self.run(tMax, video=writer, every=sweeps)
+        finally:
+            writer.close()
+        if self.status:
+            print("{} frames written to {}".format(writer.count, writer.path))
+
+    def run(self, tMax=1000, video=None, every=1):
+        """
+        :param video: Video.frameWriter to pass a frame to every every sweeps (and at the start), or None.
+        """
+        if video is not None:
+            video.write(self.frame())
+        if self.engine == "hashlife" and not self.measure and self.cycles is None and video is None and len(self.hooks) == 0:
+            # No measurements needed in between, so skip straight to the end.
+            self.hashLife.advance(tMax)
+            self.t += tMax
+            return
         for i in range(0, tMax):
             self.next()
+            if video is not None and (i + 1) % every == 0:
+                video.write(self.frame())
+            if self.cycles is not None and self.cycles.found():
+                remaining = tMax - i - 1
+                if self.cycleAction == "skip" and not self.measure and video is None and len(self.hooks) == 0:
+                    # States repeat every period, so only the remainder needs stepping.
+                    self.t += remaining - remaining % self.cycles.period
+                    for j in range(0, remaining % self.cycles.period):
+                        self.next()
+                if self.status:
+                    print("Cycle of period {} entered after {} sweeps, found at sweep {}.".format(self.cycles.period, self.cycles.transient, self.cycles.transient + self.cycles.period))
+                break
         
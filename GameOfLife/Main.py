@@ -1,9 +1,7 @@
 import numpy as np
 import Lattice as lat
 import interactive as interact
-import matplotlib.pyplot as pyplot
 import sys
-from scipy.optimize import curve_fit
 
 # Default values:
 params = {"X Dimension":50,
@@ -13,7 +11,24 @@ params = {"X Dimension":50,
           "Seed": None,
           "tMax" : 1000,
           "Measure" : False,
-          "Animate" : True
+          "Animate" : True,
+          "Engine" : "vector",
+          "MaxNodes" : 1000000,
+          "Keep" : "all",
+          "KeepLength" : 1024,
+          "Cycles" : "off",
+          "History" : 4096,
+          "SweepsPerFrame" : 1,
+          "Downsample" : 0,
+          "View" : "max",
+          "Video" : None,
+          "VideoFormat" : "auto",
+          "FPS" : 30,
+          "Trajectory" : None,
+          "DType" : "uint8",
+          "Threads" : 0,
+          "Workers" : 1,
+          "Rule" : "B3/S23"
           }
 
 # Get input from command line
@@ -24,16 +39,36 @@ np.random.seed(params["Seed"]) #None is default, changes each run.
 lattice = lat.lattice(params["X Dimension"], 
                       params["Y Dimension"], 
                       initialState=params["Initial"],
-                      measure=params["Measure"])
+                      measure=params["Measure"],
+                      engine=params["Engine"],
+                      maxNodes=params["MaxNodes"],
+                      keep=params["Keep"],
+                      keepLength=params["KeepLength"],
+                      cycles=params["Cycles"],
+                      history=params["History"],
+                      dtype=params["DType"],
+                      threads=params["Threads"],
+                      workers=params["Workers"],
+                      rule=params["Rule"])
 
-if not (params["Animate"] or params["Measure"]):
-    print("Either animate or measure must be true.")
-    exit()
+# Save every sweep to a trajectory file if asked, through a hook on the lattice.
+trajectory = None
+if params["Trajectory"] is not None:
+    trajectory = lattice.recordTrajectory(params["Trajectory"], params["tMax"] + 1)
 
-if params["Animate"]:
-    lattice.display(tMax=params["tMax"], interval=params["UpdateRate"])
-elif params["Measure"]:
+if params["Video"] is not None:
+    # Record to file instead of animating, with no window and no matplotlib.
+    lattice.record(params["Video"], tMax=params["tMax"], sweeps=params["SweepsPerFrame"], factor=max(1, params["Downsample"]), fmt=params["VideoFormat"], fps=params["FPS"])
+elif params["Animate"]:
+    lattice.display(tMax=params["tMax"], interval=params["UpdateRate"], sweeps=params["SweepsPerFrame"], factor=params["Downsample"], view=params["View"])
+else:
     lattice.run(tMax=params["tMax"])
+    if not params["Measure"]:
+        # Nothing to plot, just report the final state.
+        print("After {} sweeps: {}".format(lattice.t, lattice))
+if trajectory is not None:
+    trajectory.close()
+    print("{} frames saved to {}".format(trajectory.count, trajectory.path))
 
 if params["Measure"]:
     
@@ -41,33 +76,18 @@ if params["Measure"]:
     def fitFunc(x, m, c):
         return(m*x + c)
     
-    # Get the x and y c.o.m values as well as times
-    comArr = np.array(lattice.COMList)
-    xFull = comArr[:,0]
-    yFull = comArr[:,1]
-    tFull = lattice.tList
-    # NaNs should occur in same place at x and y
-    # Keep only up to first NaN, could update to keep over longest range
-    if np.argwhere(np.isnan(xFull)).size > 0:
-        maxInd = np.argwhere(np.isnan(xFull))[0,0]
-        x = xFull[0:maxInd] - xFull[0]
-        y = yFull[0:maxInd] - yFull[0]
-        t = tFull[0:maxInd]
-    else:
-        x = xFull - xFull[0]
-        y = yFull - yFull[0]
-        t = tFull
-    # Initial guess for fitting
-    p0 = [0.3, 0.]
-    
-    # Perform fit for x and y
-    xParams, xVar = curve_fit(fitFunc, t, x, p0=p0)
-    yParams, yVar = curve_fit(fitFunc, t, y, p0=p0)
-    xErr = np.sqrt(np.diag(xVar))
-    yErr = np.sqrt(np.diag(yVar))
+    # Fits of the x and y c.o.m against time were accumulated during the run. The c.o.m
+    # is a circular mean, unwrapped to follow the pattern across the periodic boundaries.
+    if lattice.xFit.n < 3:
+        print("Error. Too few measurements of the centre of mass to fit. Exiting...")
+        exit()
+    xParams, xErr = lattice.xFit.result()
+    yParams, yErr = lattice.yFit.result()
+    # Relative to the starting point
+    xParams[1] -= lattice.COMStart[0]
+    yParams[1] -= lattice.COMStart[1]
     
     # Combine for total values
-    pos = np.sqrt(np.square(x) + np.square(y))
     totVel = np.sqrt(xParams[0]**2. + yParams[0]**2.)
     err = np.sqrt((1./totVel)*((xParams[0]*xErr[0])**2. + (yParams[0]*yErr[0])**2.))
     print("X component of velocity is {:.5f} +/- {:.5f}".format(xParams[0], xErr[0]))
@@ -76,13 +96,15 @@ if params["Measure"]:
     
     # Plot fit
     off = np.sqrt(xParams[1]**2. + yParams[1]**2.)
-    tFit = np.array([min(t)*0.97, max(t)*1.03]) # Since it's linear only need two points
+    tFit = np.array([lattice.xFit.tMin*0.97, lattice.xFit.tMax*1.03]) # Since it's linear only need two points
     vFit = fitFunc(tFit, totVel, -off)
     
-    pyplot.plot(tFull, np.sqrt(np.square(xFull - xFull[0]) + np.square(yFull - yFull[0])), "kx")
-    pyplot.plot(tFit, vFit, "r-")
-    pyplot.xlabel("Time")
-    pyplot.ylabel("Distance from Starting Point")
-    pyplot.show()
+    tFull, dist = [], []
+    if lattice.COMSeries is not None:
+        tFull = lattice.COMSeries.times()
+        comArr = lattice.COMSeries.values()
+        dist = np.sqrt(np.square(comArr[:,0] - lattice.COMStart[0]) + np.square(comArr[:,1] - lattice.COMStart[1]))
+    import Display # Plotting only loaded when needed
+    Display.plotDistance(tFull, dist, tFit, vFit)
     if params["Animate"]:
         print("#"*40 + "\nNote: If animation was exited manually then an error sometimes appears above.\nDisregard this error.\n" + "#"*40)
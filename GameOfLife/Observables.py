@@ -0,0 +1,126 @@
+"""
+Measurements taken during a run, accumulated one value at a time so that long runs need no
+growing lists: raw values in preallocated typed arrays (optionally a fixed-size ring) and a
+straight line fit updated as points arrive.
+"""
+import numpy as np
+from Series import series
+
+class linearFit(object):
+    """
+    Least squares fit of a straight line x = m*t + c, updated one point at a time from running
+    means and co-moments (as Welford's algorithm) in constant memory. Gives the same parameters
+    and errors as scipy.optimize.curve_fit on all the points.
+    """
+    def __init__(self):
+        self.n = 0          # Number of points
+        self.tMean = 0.     # Mean of t
+        self.xMean = 0.     # Mean of x
+        self.Stt = 0.       # Sum of squared deviations of t
+        self.Stx = 0.       # Sum of products of deviations of t and x
+        self.Sxx = 0.       # Sum of squared deviations of x
+        self.tMin = np.inf
+        self.tMax = -np.inf
+
+    def add(self, t, x):
+        """
+        Add the point (t, x).
+        """
+        self.n += 1
+        dt = t - self.tMean
+        dx = x - self.xMean
+        self.tMean += dt/self.n
+        self.xMean += dx/self.n
+        self.Stt += dt*(t - self.tMean)
+        self.Stx += dt*(x - self.xMean)
+        self.Sxx += dx*(x - self.xMean)
+        self.tMin = min(self.tMin, t)
+        self.tMax = max(self.tMax, t)
+
+    def result(self):
+        """
+        Get the fitted line.
+        :return params: Array [m, c].
+        :return errors: Array of standard errors on [m, c], from the scatter of the points
+                        about the line. NaN with too few points.
+        """
+        if self.n < 2 or self.Stt == 0.:
+            return(np.array([np.nan, np.nan]), np.array([np.nan, np.nan]))
+        m = self.Stx/self.Stt
+        c = self.xMean - m*self.tMean
+        if self.n < 3:
+            return(np.array([m, c]), np.array([np.nan, np.nan]))
+        s2 = max(self.Sxx - m*self.Stx, 0.)/(self.n - 2)     # Residual variance
+        mErr = np.sqrt(s2/self.Stt)
+        cErr = np.sqrt(s2*(1./self.n + self.tMean**2/self.Stt))
+        return(np.array([m, c]), np.array([mErr, cErr]))
+
+class circularCoM(object):
+    """
+    Centre of mass of the live cells on a periodic lattice, as a circular mean. Each coordinate
+    is mapped to an angle around its axis, and the mean position comes from the angle of the
+    summed unit vectors, so it stays defined as a pattern crosses a boundary. The sums are
+    updated from the cells born and killed each generation rather than recounted.
+    """
+    def __init__(self, xDim, yDim):
+        """
+        :param xDim: The x dimension of the lattice.
+        :param yDim: The y dimension of the lattice.
+        """
+        self.dims = np.array([xDim, yDim], dtype=float)
+        xAngles = 2.*np.pi*np.arange(xDim)/xDim
+        yAngles = 2.*np.pi*np.arange(yDim)/yDim
+        self.xCos, self.xSin = np.cos(xAngles), np.sin(xAngles)
+        self.yCos, self.ySin = np.cos(yAngles), np.sin(yAngles)
+        self.sums = np.zeros(4)     # Sums of cos and sin of the x angle, then of the y angle
+        self.population = 0
+        self.last = None            # Last position measured, within the lattice
+        self.unwrapped = None       # Last position measured, following the pattern across boundaries
+
+    def reset(self, lat):
+        """
+        Recompute the sums from the whole lattice.
+        :param lat: 2D array of 0s and 1s.
+        """
+        rows = np.count_nonzero(lat, axis=1)
+        cols = np.count_nonzero(lat, axis=0)
+        self.sums = np.array([rows @ self.xCos, rows @ self.xSin, cols @ self.yCos, cols @ self.ySin])
+        self.population = int(rows.sum())
+
+    def update(self, rows, cols, alive):
+        """
+        Update the sums from the cells which changed in a generation.
+        :param rows: First indices of the changed cells.
+        :param cols: Second indices of the changed cells.
+        :param alive: New state of each changed cell, 1 for born and 0 for killed.
+        """
+        sign = 2.*np.asarray(alive, dtype=float) - 1.
+        self.sums += [sign @ self.xCos[rows], sign @ self.xSin[rows], sign @ self.yCos[cols], sign @ self.ySin[cols]]
+        self.population += int(sign.sum())
+
+    def com(self):
+        """
+        Get the centre of mass within the lattice, NaN if there are no live cells or they are
+        spread evenly enough around an axis that it is undefined.
+        """
+        resultant = np.hypot(self.sums[[0, 2]], self.sums[[1, 3]])
+        if self.population == 0 or (resultant < 1e-9*self.population).any():
+            return(np.array([np.nan, np.nan]))
+        angles = np.arctan2(self.sums[[1, 3]], self.sums[[0, 2]]) % (2.*np.pi)
+        return(angles*self.dims/(2.*np.pi))
+
+    def measure(self):
+        """
+        Get the centre of mass, unwrapped so that it moves continuously across the boundaries,
+        assuming it moves less than half the lattice between measurements.
+        """
+        com = self.com()
+        if np.isnan(com).any():
+            return(com)
+        if self.unwrapped is None:
+            self.unwrapped = com
+        else:
+            step = (com - self.last + 0.5*self.dims) % self.dims - 0.5*self.dims
+            self.unwrapped = self.unwrapped + step
+        self.last = com
+        return(self.unwrapped)
@@ -0,0 +1,124 @@
+"""
+Bit packed storage for the Game of Life. Each row of the lattice is stored as 64 cells per
+uint64 word, with bit j%64 of word j//64 holding cell j. Any padding bits in the last word of
+a row are kept at zero.
+"""
+import numpy as np
+
+one = np.uint64(1)
+top = np.uint64(63)
+
+def nWords(yDim):
+    """
+    Number of uint64 words needed to hold a row of yDim cells.
+    """
+    return((yDim + 63)//64)
+
+def padMask(yDim):
+    """
+    Mask of the valid bits in the last word of each row.
+    """
+    if yDim % 64 == 0:
+        return(np.uint64(0xFFFFFFFFFFFFFFFF))
+    return(np.uint64((1 << (yDim % 64)) - 1))
+
+def pack(lat):
+    """
+    Pack a 2D array of 0s and 1s into words.
+    :param lat: 2D array, any non-zero entry is taken as alive.
+    :return words: uint64 array of shape (xDim, nWords(yDim)).
+    """
+    xDim, yDim = lat.shape
+    packedBytes = np.packbits(lat != 0, axis=1, bitorder="little")
+    data = np.zeros((xDim, nWords(yDim)*8), dtype=np.uint8)
+    data[:, :packedBytes.shape[1]] = packedBytes
+    return(data.view("<u8").astype(np.uint64, copy=False))
+
+def unpack(words, yDim):
+    """
+    Unpack words back into a 2D uint8 array of 0s and 1s.
+    :param words: uint64 array from pack().
+    :param yDim: Number of cells in each row.
+    """
+    data = np.ascontiguousarray(words.astype("<u8", copy=False)).view(np.uint8)
+    return(np.unpackbits(data, axis=1, count=yDim, bitorder="little"))
+
+def random(xDim, yDim, chunk=1 << 20):
+    """
+    Random packed lattice with each cell alive with probability 0.25, from the same draws as the
+    dense engines (np.random.random_sample((xDim, yDim)) >= 0.75), so a seed gives the same
+    lattice whatever the engine. Drawn and packed a block of rows at a time, so the dense array
+    is never built.
+    :param chunk: Roughly the number of cells drawn at a time.
+    """
+    words = np.empty((xDim, nWords(yDim)), dtype=np.uint64)
+    rows = max(1, chunk//max(1, yDim))
+    for r in range(0, xDim, rows):
+        n = min(rows, xDim - r)
+        words[r:r + n] = pack(np.random.random_sample((n, yDim)) >= 0.75)     # Draws in row order, as one call
+    return(words)
+
+def population(words):
+    """
+    Number of live cells in a packed lattice.
+    """
+    if hasattr(np, "bitwise_count"):
+        return(int(np.bitwise_count(words).sum()))
+    return(int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum()))
+
+def shiftWest(words, yDim):
+    """
+    Bit j of each row of the result holds cell j-1 of the row, periodic in y.
+    """
+    last = words.shape[1] - 1
+    w = words << one
+    w[:, 1:] |= words[:, :-1] >> top
+    w[:, 0] |= (words[:, last] >> np.uint64((yDim - 1) % 64)) & one
+    w[:, last] &= padMask(yDim)
+    return(w)
+
+def shiftEast(words, yDim):
+    """
+    Bit j of each row of the result holds cell j+1 of the row, periodic in y.
+    """
+    last = words.shape[1] - 1
+    e = words >> one
+    e[:, :-1] |= words[:, 1:] << top
+    e[:, last] |= (words[:, 0] & one) << np.uint64((yDim - 1) % 64)
+    return(e)
+
+def step(words, yDim, rule=None):
+    """
+    Advance a packed lattice by one generation with periodic boundaries.
+    The 8 neighbours are summed for 64 cells at a time with bitwise full adders.
+    :param words: uint64 array from pack().
+    :param yDim: Number of cells in each row.
+    :param rule: Rules.rule to apply, B3/S23 if None.
+    :return words: The next generation, packed.
+    """
+    w = shiftWest(words, yDim)
+    e = shiftEast(words, yDim)
+    # Full adders over the rows above and below give 2 bit counts (0-3) for each.
+    aboveW, above, aboveE = np.roll(w, 1, axis=0), np.roll(words, 1, axis=0), np.roll(e, 1, axis=0)
+    belowW, below, belowE = np.roll(w, -1, axis=0), np.roll(words, -1, axis=0), np.roll(e, -1, axis=0)
+    a0 = aboveW ^ above ^ aboveE
+    a1 = (aboveW & above) | (aboveE & (aboveW ^ above))
+    b0 = belowW ^ below ^ belowE
+    b1 = (belowW & below) | (belowE & (belowW ^ below))
+    # Half adder for the west and east neighbours (0-2).
+    c0 = w ^ e
+    c1 = w & e
+    # Add the three counts. s0 is the ones bit, k1 the carry into the twos.
+    s0 = a0 ^ b0 ^ c0
+    k1 = (a0 & b0) | (c0 & (a0 ^ b0))
+    # Twos bit is the parity of the four weight 2 bits, count is >= 4 if two or more are set.
+    s1 = a1 ^ b1 ^ c1 ^ k1
+    s2 = (a1 & b1) | (c1 & k1) | ((a1 ^ b1) & (c1 ^ k1))
+    if rule is None or rule.conway:
+        # Alive next on a count of 3, or a count of 2 for live cells.
+        return(s1 & ~s2 & (s0 | words))
+    # Other rules need the whole count: fours bit set for two or three weight 2 bits, eights for all four.
+    s3 = a1 & b1 & c1 & k1
+    new = rule.bitwise(words, [s0, s1, s2 & ~s3, s3])
+    new[:, -1] &= padMask(yDim)                                         # Padding bits may be born (B0)
+    return(new)
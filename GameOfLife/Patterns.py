@@ -0,0 +1,151 @@
+"""
+Loaders for initial states, each returning a 2D uint8 array of 0s and 1s (rows are x). All
+work on whole arrays rather than cell by cell, so very large patterns load quickly.
+txt     One row per line, "1" alive and anything else ("0") dead. Lines may differ in length.
+png     Any image, dark pixels (below 128 in greyscale) alive.
+cells   Plaintext Life format: "!" comment lines, then rows of "." dead and "O" alive.
+rle     Run length encoded Life format: "#" comment lines, a header "x = <columns>, y = <rows>, ...",
+        then runs such as "3o2b$" ended by "!". Decoded in chunks, so the text of huge patterns is
+        never held in memory at once.
+"""
+import numpy as np
+import re
+
+formats = ["txt", "png", "cells", "rle"]
+chunkSize = 1 << 20 # Bytes of RLE read at a time
+
+def load(path):
+    """
+    Load a pattern, choosing the loader from the file extension.
+    :param path: Path to a .txt, .png, .cells or .rle file.
+    :return lat: 2D uint8 array of 0s and 1s.
+    """
+    ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    if ext == "txt":
+        return(loadTXT(path))
+    if ext == "png":
+        return(loadIMG(path))
+    if ext == "cells":
+        return(loadCells(path))
+    if ext == "rle":
+        return(loadRLE(path))
+    print("Error. Input file {} not valid. Require {} file.".format(path, ", ".join(formats)))
+    exit()
+
+def textGrid(data, alive):
+    """
+    Turn lines of text into a lattice, one row per line and one cell per character.
+    :param data: Bytes of the lines, separated by newlines.
+    :param alive: Bytes of the characters meaning alive, anything else is dead.
+    :return lat: 2D uint8 array, as wide as the longest line.
+    """
+    lines = data.replace(b"\r", b"").split(b"\n")
+    if len(lines) > 0 and len(lines[-1]) == 0:
+        lines.pop()                                                                 # No row after the last newline
+    width = max([len(line) for line in lines]) if len(lines) > 0 else 0
+    aliveCodes = np.frombuffer(alive, dtype=np.uint8)
+    lengths = set(len(line) for line in lines)
+    if len(lengths) == 1:
+        # Equal lines: one array over the whole file, without the newlines.
+        chars = np.frombuffer(b"".join(lines), dtype=np.uint8).reshape(len(lines), width)
+        return(np.isin(chars, aliveCodes).astype(np.uint8))
+    lat = np.zeros((len(lines), width), dtype=np.uint8)
+    for x in range(0, len(lines)):
+        chars = np.frombuffer(lines[x], dtype=np.uint8)
+        lat[x, :len(chars)] = np.isin(chars, aliveCodes)
+    return(lat)
+
+def loadTXT(path):
+    with open(path, "rb") as inFile:
+        return(textGrid(inFile.read(), b"1"))
+
+def loadCells(path):
+    with open(path, "rb") as inFile:
+        lines = [line for line in inFile.read().split(b"\n") if not line.startswith(b"!")]
+    return(textGrid(b"\n".join(lines), b"O*"))
+
+def loadIMG(path):
+    from PIL import Image                                                           # Only needed for image input.
+    Image.MAX_IMAGE_PIXELS = None                                                   # Large seeds are intended, not an attack.
+    img = Image.open(path).convert("L")                                             # Open image (greyscale).
+    return((np.asarray(img) < 128).astype(np.uint8))                                # Rows of the array are image rows.
+
+def loadRLE(path):
+    """
+    Decode an RLE file chunk by chunk into a lattice preallocated from the header.
+    """
+    with open(path, "rb") as inFile:
+        line = inFile.readline()
+        while line.startswith(b"#") or len(line.strip()) == 0:
+            if len(line) == 0:
+                print("Error. No header found in RLE file {}.".format(path))
+                exit()
+            line = inFile.readline()
+        header = dict(re.findall(rb"(\w+)\s*=\s*([^,\s]+)", line))
+        try:
+            cols, rows = int(header[b"x"]), int(header[b"y"])
+        except (KeyError, ValueError):
+            print("Error. RLE header {} should give x and y.".format(line.strip().decode(errors="replace")))
+            exit()
+        lat = np.zeros(rows*cols, dtype=np.uint8)                                   # Flat, filled by runs.
+        row, col = 0, 0
+        carry = b""                                                                 # Unfinished token at the end of a chunk
+        while True:
+            chunk = inFile.read(chunkSize)
+            data = carry + b"".join(chunk.split())                                  # Whitespace means nothing in RLE
+            end = len(chunk) == 0 or b"!" in data
+            if not end:
+                # Hold back trailing digits, the rest of their token is in the next chunk.
+                cut = len(data.rstrip(b"0123456789"))
+                data, carry = data[:cut], data[cut:]
+            if len(data) > 0:
+                row, col = decodeRuns(data, lat, rows, cols, row, col)
+            if end:
+                break
+    return(lat.reshape(rows, cols))
+
+def decodeRuns(data, lat, rows, cols, row, col):
+    """
+    Write one chunk of RLE runs into the flat lattice at once.
+    :param data: Bytes of whole tokens (an optional count then a tag), without whitespace.
+    :param row: Row the chunk starts on.
+    :param col: Column the chunk starts at.
+    :return row, col: Where the next chunk starts.
+    """
+    chars = np.frombuffer(data, dtype=np.uint8)
+    isDigit = (chars >= ord("0")) & (chars <= ord("9"))
+    tagAt = np.flatnonzero(~isDigit)
+    digitAt = np.flatnonzero(isDigit)
+    digitAt = digitAt[digitAt < (tagAt[-1] if len(tagAt) > 0 else 0)]            # Digits with no tag after them mean nothing
+    # Each count is the sum of its digits times powers of ten, found from their distance to the tag.
+    owner = np.searchsorted(tagAt, digitAt)
+    place = tagAt[owner] - digitAt - 1
+    counts = np.bincount(owner, weights=(chars[digitAt] - ord("0"))*10.**place, minlength=len(tagAt)).astype(np.int64)
+    counts[np.bincount(owner, minlength=len(tagAt)) == 0] = 1                      # No count means 1
+    tags = chars[tagAt]
+    stop = np.flatnonzero(tags == ord("!"))
+    if len(stop) > 0:
+        counts, tags = counts[:stop[0]], tags[:stop[0]]
+    newRow = tags == ord("$")
+    dead = tags == ord("b")
+    runs = np.where(newRow, 0, counts)                                              # Cells covered by each token
+    rowOf = row + np.cumsum(np.where(newRow, counts, 0)) - np.where(newRow, counts, 0)   # Row each token starts on
+    # Column: cells covered since the start of the chunk, less those before the last "$".
+    before = np.cumsum(runs) - runs
+    lastBreak = np.maximum.accumulate(np.where(newRow, np.arange(len(tags)), -1))
+    since = before - np.where(lastBreak >= 0, before[np.maximum(lastBreak, 0)] + runs[np.maximum(lastBreak, 0)], 0)
+    colOf = np.where(lastBreak >= 0, since, col + before)
+    live = ~newRow & ~dead & (runs > 0)
+    if (rowOf[live] >= rows).any() or (colOf[live] + runs[live] > cols).any():
+        print("Error. RLE pattern is larger than its header x = {}, y = {}.".format(cols, rows))
+        exit()
+    if live.any():
+        starts = rowOf[live]*cols + colOf[live]
+        lengths = runs[live]
+        # Index of every live cell: each run's start repeated along the run plus its offset in it.
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        lat[np.repeat(starts, lengths) + offsets] = 1
+    if len(tags) == 0:
+        return(row, col)
+    last = len(tags) - 1
+    return(int(rowOf[last] + (counts[last] if newRow[last] else 0)), int(colOf[last] + runs[last]) if not newRow[last] else 0)
@@ -0,0 +1,126 @@
+"""
+Life-like (outer totalistic) rules, where a cell's next state depends only on its own state and
+its number of live neighbours. Rules are written "B<counts>/S<counts>": a dead cell is born on
+any of the birth counts and a live cell survives on any of the survival counts, so Conway's
+Game of Life is B3/S23. The older "<survival>/<birth>" form (23/3) and the names below are
+also accepted.
+
+Each rule is compiled into a lookup table of the next state by (state, neighbour count), used
+as it is by the per cell engines, and into one bit mask per state, bit N set if a cell with N
+neighbours is alive next. Whole arrays are stepped by shifting the mask of each cell right by
+its count, in place and at the cost of a few ufuncs, as a gather from a table (np.take or
+fancy indexing) is several times slower than the whole Conway step.
+"""
+import numpy as np
+import re
+
+named = {"conway" : "B3/S23",
+         "life" : "B3/S23",
+         "highlife" : "B36/S23",
+         "seeds" : "B2/S",
+         "daynight" : "B3678/S34678",
+         "lifewithoutdeath" : "B3/S012345678",
+         "maze" : "B3/S12345",
+         "replicator" : "B1357/S1357",
+         "2x2" : "B36/S125",
+         "morley" : "B368/S245",
+         "diamoeba" : "B35678/S5678"}
+
+def parse(text):
+    """
+    Read a rule string.
+    :param text: "B3/S23", "23/3" or a name from named, any case.
+    :return birth, survival: Sorted lists of neighbour counts.
+    """
+    rule = named.get(text.lower().replace(" ", "").replace("&", ""), text)
+    match = re.fullmatch(r"\s*[Bb]([0-8]*)\s*/\s*[Ss]([0-8]*)\s*", rule)
+    if match is not None:
+        birth, survival = match.groups()
+    else:
+        match = re.fullmatch(r"\s*([0-8]*)\s*/\s*([0-8]*)\s*", rule)
+        if match is None:
+            print("Error. Rule {} not recognised. Give B<counts>/S<counts>, such as B3/S23, or one of {}.".format(text, ", ".join(named)))
+            exit()
+        survival, birth = match.groups()
+    return(sorted(set(int(c) for c in birth)), sorted(set(int(c) for c in survival)))
+
+class rule(object):
+    """
+    A Life-like rule compiled for each engine.
+    """
+    def __init__(self, text="B3/S23"):
+        """
+        :param text: The rule, see parse().
+        """
+        self.birth, self.survival = parse(text)
+        self.name = "B{}/S{}".format("".join(str(c) for c in self.birth), "".join(str(c) for c in self.survival))
+        self.conway = self.name == "B3/S23"     # Stepped with the dedicated Conway expressions
+        self.table = np.zeros((2, 9), dtype=np.uint8)
+        self.table[0, self.birth] = 1
+        self.table[1, self.survival] = 1
+        self.lists = self.table.tolist()        # Next state as rule.lists[state][N], quickest from Python
+        # Births and survivals as bit masks, in a type wide enough for a count of 8.
+        self.maskType = np.dtype(np.uint16) if 8 in self.birth + self.survival else np.dtype(np.uint8)
+        bits = 8*self.maskType.itemsize
+        self.birthMask = self.maskType.type(sum(1 << c for c in self.birth))
+        survivalMask = sum(1 << c for c in self.survival)
+        self.difference = self.maskType.type((survivalMask - int(self.birthMask)) % (1 << bits)) # Added for live cells, wrapping
+
+    def __str__(self):
+        return(self.name)
+
+    def bornFromNothing(self):
+        """
+        Whether dead cells with no live neighbours are born (B0), so empty regions do not stay empty.
+        """
+        return(0 in self.birth)
+
+    def work(self, shape):
+        """
+        Work array for apply(), not needed for Conway's rule.
+        """
+        if self.conway:
+            return(None)
+        return(np.empty(shape, dtype=self.maskType))
+
+    def apply(self, lat, N, out, work=None):
+        """
+        Write the next state of every cell into out, from the states and neighbour counts.
+        :param lat: Array of 0s and 1s.
+        :param N: Live neighbour count of each cell, overwritten.
+        :param out: Array of the same shape for the result, may not be lat.
+        :param work: Array from work(), allocated if not given.
+        """
+        if self.conway:
+            # Birth on 3, survival on 2 or 3: N | alive is 3 exactly for these (N = 3, or N = 2 and alive).
+            np.bitwise_or(N, lat, out=N)
+            np.equal(N, 3, out=out)
+            return
+        if work is None:
+            work = self.work(lat.shape)
+        # Mask of each cell (birthMask, or survivalMask for live cells), bit N of it is the next state.
+        np.multiply(lat, self.difference, out=work, casting="unsafe")
+        np.add(work, self.birthMask, out=work, casting="unsafe")
+        np.right_shift(work, N, out=work, casting="unsafe")
+        np.bitwise_and(work, 1, out=out, casting="unsafe")
+
+    def bitwise(self, cell, bits):
+        """
+        Next state of 64 cells per word (see Packed.py) from their states and counts.
+        :param cell: Words of cell states.
+        :param bits: Words of the four bits of the neighbour counts, least significant first.
+        """
+        inverse = [~b for b in bits]
+        born = np.zeros_like(cell)
+        survive = np.zeros_like(cell)
+        for count in range(0, 9):
+            if count not in self.birth and count not in self.survival:
+                continue
+            match = ~np.zeros_like(cell)
+            for i in range(0, 4):
+                match &= bits[i] if (count >> i) & 1 else inverse[i]
+            if count in self.birth:
+                born |= match
+            if count in self.survival:
+                survive |= match
+        return((born & ~cell) | (survive & cell))
@@ -0,0 +1,61 @@
+"""
+Raw values of a measurement in preallocated typed arrays, shared by the Game of Life and SIRS.
+Both directories hold the same copy of this file (checked by test_SIRS.py), as each program
+runs on its own from its directory.
+"""
+import numpy as np
+
+class series(object):
+    """
+    Raw values of a measurement and the times they were taken, in preallocated typed arrays.
+    Unless it is a ring, the arrays double in size when full. As a ring only the last
+    capacity values are kept, so memory stays fixed however long the run.
+    """
+    def __init__(self, capacity=1024, dtype=float, width=None, ring=False):
+        """
+        :param capacity: Number of values to allocate space for.
+        :param dtype: Type of the values.
+        :param width: Length of each value if they are vectors, otherwise None.
+        :param ring: Whether to overwrite the oldest values when full instead of growing.
+        """
+        shape = (capacity,) if width is None else (capacity, width)
+        self.t = np.empty(capacity, dtype=np.int64)
+        self.x = np.empty(shape, dtype=dtype)
+        self.ring = ring
+        self.count = 0  # Number of values ever added
+
+    def __len__(self):
+        return(min(self.count, self.t.shape[0]))
+
+    def add(self, t, x):
+        """
+        Add value x measured at time t.
+        """
+        capacity = self.t.shape[0]
+        if self.count == capacity and not self.ring:
+            self.t = np.concatenate([self.t, np.empty_like(self.t)])
+            self.x = np.concatenate([self.x, np.empty_like(self.x)])
+            capacity *= 2
+        i = self.count % capacity
+        self.t[i] = t
+        self.x[i] = x
+        self.count += 1
+
+    def times(self):
+        """
+        Times of the values kept, oldest first.
+        """
+        return(self.ordered(self.t))
+
+    def values(self):
+        """
+        Values kept, oldest first.
+        """
+        return(self.ordered(self.x))
+
+    def ordered(self, arr):
+        capacity = arr.shape[0]
+        if self.count <= capacity:
+            return(arr[:self.count])
+        start = self.count % capacity
+        return(np.concatenate([arr[start:], arr[:start]]))
@@ -0,0 +1,91 @@
+"""
+Active set stepping for the Game of Life. The lattice is split into square tiles and only tiles
+flagged as dirty are evaluated. A tile is dirty if a cell in it, or in one of the 8 tiles around
+it, changed in the previous generation, so the cost of a generation scales with the activity
+rather than with the area of the lattice.
+"""
+import numpy as np
+
+class activeSet(object):
+    """
+    Dirty tile flags for a periodic lattice, with a sparse generation step.
+    """
+    def __init__(self, shape, tileSize=16, threshold=0.3):
+        """
+        :param shape: Shape of the lattice (xDim, yDim).
+        :param tileSize: Side of each tile in cells.
+        :param threshold: Fraction of dirty tiles above which the lattice counts as busy and
+                          should be stepped densely instead.
+        """
+        self.xDim, self.yDim = shape
+        self.tileSize = tileSize
+        self.threshold = threshold
+        self.nx = -(-self.xDim//tileSize) # Number of tiles in each direction, rounded up.
+        self.ny = -(-self.yDim//tileSize)
+        self.offsets = np.arange(-1, tileSize + 1) # Rows/columns of a tile including its halo.
+        self.changed = (np.array([], dtype=int), np.array([], dtype=int)) # Cells changed last generation.
+        self.reset()
+
+    def reset(self):
+        """
+        Flag every tile as dirty, e.g. after the lattice is replaced.
+        """
+        self.dirty = np.ones((self.nx, self.ny), dtype=bool)
+
+    def busy(self):
+        """
+        Whether enough tiles are dirty that a dense step would be quicker.
+        """
+        return(np.count_nonzero(self.dirty) > self.threshold*self.dirty.size)
+
+    def mark(self, rows, cols):
+        """
+        Record the cells changed this generation and flag their tiles, and the tiles around
+        them, as dirty for the next one.
+        :param rows: First indices of the changed cells.
+        :param cols: Second indices of the changed cells.
+        """
+        self.changed = (rows, cols)
+        hit = np.zeros((self.nx, self.ny), dtype=bool)
+        hit[rows//self.tileSize, cols//self.tileSize] = True
+        self.dirty = np.zeros_like(hit)
+        for dx in (-1, 0, 1):                              # Spread to neighbouring tiles, periodic.
+            for dy in (-1, 0, 1):
+                self.dirty |= np.roll(np.roll(hit, dx, axis=0), dy, axis=1)
+
+    def markChanges(self, old, new):
+        """
+        Flag dirty tiles from a generation which was stepped densely.
+        :param old: The lattice before the generation.
+        :param new: The lattice after the generation.
+        """
+        rows, cols = np.nonzero(old != new)
+        self.mark(rows, cols)
+
+    def step(self, lat, rule):
+        """
+        Advance the lattice by one generation in place, evaluating only dirty tiles. A cell whose
+        3 x 3 neighbourhood did not change last generation does not change, whatever the rule.
+        :param lat: The lattice, 2D array of 0s and 1s.
+        :param rule: Rules.rule to apply.
+        """
+        tiles = np.argwhere(self.dirty)
+        T = self.tileSize
+        # Rows and columns of each dirty tile with a one cell halo, periodic.
+        rows = (tiles[:, 0, None]*T + self.offsets[None, :]) % self.xDim
+        cols = (tiles[:, 1, None]*T + self.offsets[None, :]) % self.yDim
+        blocks = lat[rows[:, :, None], cols[:, None, :]].astype(np.int8)
+        # Neighbour count for the inside of each tile.
+        N = (blocks[:, :-2, :-2] + blocks[:, :-2, 1:-1] + blocks[:, :-2, 2:]
+             + blocks[:, 1:-1, :-2] + blocks[:, 1:-1, 2:]
+             + blocks[:, 2:, :-2] + blocks[:, 2:, 1:-1] + blocks[:, 2:, 2:])
+        alive = blocks[:, 1:-1, 1:-1]
+        new = rule.table[alive, N]                                  # Next state by (state, count)
+        # Ignore cells past the edge of the lattice in the last row or column of tiles.
+        inRows = tiles[:, 0, None]*T + np.arange(T)[None, :] < self.xDim
+        inCols = tiles[:, 1, None]*T + np.arange(T)[None, :] < self.yDim
+        changed = (new != alive) & inRows[:, :, None] & inCols[:, None, :]
+        t, a, b = np.nonzero(changed)
+        r, c = rows[t, a + 1], cols[t, b + 1]
+        lat[r, c] = new[t, a, b]
+        self.mark(r, c)
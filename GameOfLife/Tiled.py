@@ -0,0 +1,98 @@
+"""
+Multi-threaded stepping for the Game of Life. The lattice is split into strips of whole rows,
+each stepped by its own thread from the shared current state into the shared next state. A
+strip's halo (the row above and below it, wrapping round at the top and bottom) is read
+straight from the current state, which no thread writes to during a generation, so no copies
+are exchanged. All strips finish before step() returns, which is the barrier between
+generations. The work is NumPy ufuncs on large arrays, which release the GIL, so the threads
+run in parallel.
+"""
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+def shiftedRows(src, r0, r1, k, out, add=False):
+    """
+    Write (or add) rows r0 + k to r1 + k of src, wrapping periodically, into out.
+    :param k: Row offset, -1, 0 or 1.
+    :param add: Whether to add to out rather than overwrite it.
+    """
+    n = src.shape[0]
+    a, b = r0 + k, r1 + k
+    # At most two slices: the part inside the lattice and the part wrapped round.
+    if a < 0:
+        parts = [(a % n, n, 0), (0, b, -a)]
+    elif b > n:
+        parts = [(a, n, 0), (0, b - n, n - a)]
+    else:
+        parts = [(a, b, 0)]
+    for start, stop, at in parts:
+        if add:
+            np.add(out[at:at + stop - start], src[start:stop], out=out[at:at + stop - start])
+        else:
+            out[at:at + stop - start] = src[start:stop]
+
+def wrapColumns(a, out):
+    """
+    Sum of each entry and its neighbours left and right, wrapping periodically along rows.
+    """
+    n = a.shape[1]
+    np.add(a[:, :-2], a[:, 1:-1], out=out[:, 1:-1])
+    np.add(out[:, 1:-1], a[:, 2:], out=out[:, 1:-1])
+    np.add(a[:, -1], a[:, 0], out=out[:, 0])
+    np.add(out[:, 0], a[:, 1 % n], out=out[:, 0])
+    if n > 1:
+        np.add(a[:, -2], a[:, -1], out=out[:, -1])
+        np.add(out[:, -1], a[:, 0], out=out[:, -1])
+
+def stepStrip(src, dst, r0, r1, rows, count, rule, work=None):
+    """
+    Step rows r0 to r1 (exclusive) of the lattice by one generation.
+    :param src: Current lattice, read only.
+    :param dst: Next lattice, only rows r0 to r1 are written.
+    :param rows: Work array of shape (r1 - r0, Y) and the lattice dtype.
+    :param count: Work array as rows.
+    :param rule: Rules.rule to apply.
+    :param work: Work array from rule.work() for the strip.
+    """
+    shiftedRows(src, r0, r1, -1, rows)                                      # Sum of column of 3 around each site
+    shiftedRows(src, r0, r1, 0, rows, add=True)                             #
+    shiftedRows(src, r0, r1, 1, rows, add=True)                             #
+    wrapColumns(rows, count)                                                # Sum of 3 x 3 box
+    np.subtract(count, src[r0:r1], out=count)                               # Don't count self
+    rule.apply(src[r0:r1], count, dst[r0:r1], work)
+
+class tiledStepper(object):
+    """
+    Steps a lattice in strips on a pool of threads.
+    """
+    def __init__(self, shape, dtype, rule, threads=0):
+        """
+        :param shape: Shape of the lattice.
+        :param dtype: Type of the lattice array.
+        :param rule: Rules.rule to apply.
+        :param threads: Number of threads (and strips), 0 for one per core.
+        """
+        if threads <= 0:
+            threads = os.cpu_count() or 1
+        self.threads = max(1, min(threads, shape[0]))
+        edges = np.linspace(0, shape[0], self.threads + 1).astype(int)     # Strips of (nearly) equal height
+        self.strips = [(edges[i], edges[i + 1]) for i in range(0, self.threads)]
+        self.work = [(np.empty((r1 - r0, shape[1]), dtype=dtype), np.empty((r1 - r0, shape[1]), dtype=dtype), rule, rule.work((r1 - r0, shape[1])))
+                     for r0, r1 in self.strips]
+        self.pool = ThreadPoolExecutor(max_workers=self.threads) if self.threads > 1 else None
+
+    def step(self, src, dst):
+        """
+        Write the next generation of src into dst, returning once every strip is done.
+        """
+        if self.pool is None:
+            stepStrip(src, dst, 0, src.shape[0], *self.work[0])
+            return
+        futures = [self.pool.submit(stepStrip, src, dst, r0, r1, *work) for (r0, r1), work in zip(self.strips, self.work)]
+        for future in futures:
+            future.result()                                                 # Barrier, and raises any error from a strip
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -14,7 +14,7 @@ def readArgs(args, params):
                 exit()
         elif args[i] in ["-RS", "-rs"]: 
             try:
-                updates["Seed"] = float(args[i+1])
+                updates["Seed"] = int(float(args[i+1]))
                 i += 2
             except:
                 print("Unrecognised seed.")
@@ -82,6 +82,139 @@ def readArgs(args, params):
             except:
                 print("Error with -M tag.")
                 exit()
+        elif args[i] in ["-e", "-E"]:
+            try:
+                updates["Engine"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -e.")
+                exit()
+        elif args[i] in ["-nodes", "-Nodes"]:
+            try:
+                updates["MaxNodes"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -nodes.")
+                exit()
+        elif args[i] in ["-cyc", "-Cyc"]:
+            try:
+                updates["Cycles"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -cyc.")
+                exit()
+        elif args[i] in ["-hist", "-Hist"]:
+            try:
+                updates["History"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -hist.")
+                exit()
+        elif args[i] in ["-w", "-W"]:
+            try:
+                updates["Workers"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -w.")
+                exit()
+        elif args[i] in ["-soups", "-Soups"]:
+            try:
+                updates["Soups"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -soups.")
+                exit()
+        elif args[i] in ["-o", "-O"]:
+            try:
+                updates["outDir"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -o.")
+                exit()
+        elif args[i] in ["-k", "-K"]:
+            try:
+                updates["SweepsPerFrame"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -k.")
+                exit()
+        elif args[i] in ["-d", "-D"]:
+            try:
+                updates["Downsample"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -d.")
+                exit()
+        elif args[i] in ["-view", "-View"]:
+            try:
+                updates["View"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -view.")
+                exit()
+        elif args[i] in ["-vid", "-Vid"]:
+            try:
+                updates["Video"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -vid.")
+                exit()
+        elif args[i] in ["-vf", "-VF"]:
+            try:
+                updates["VideoFormat"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -vf.")
+                exit()
+        elif args[i] in ["-fps", "-FPS"]:
+            try:
+                updates["FPS"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -fps.")
+                exit()
+        elif args[i] in ["-traj", "-Traj"]:
+            try:
+                updates["Trajectory"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -traj.")
+                exit()
+        elif args[i] in ["-dtype", "-DType"]:
+            try:
+                updates["DType"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -dtype.")
+                exit()
+        elif args[i] in ["-threads", "-Threads"]:
+            try:
+                updates["Threads"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -threads.")
+                exit()
+        elif args[i] in ["-rule", "-Rule"]:
+            try:
+                updates["Rule"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -rule.")
+                exit()
+        elif args[i] in ["-keep", "-Keep"]:
+            try:
+                updates["Keep"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -keep.")
+                exit()
+        elif args[i] in ["-kl", "-KL"]:
+            try:
+                updates["KeepLength"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -kl.")
+                exit()
         else:
             print("Key {} not recognised. Ignoring.".format(args[i]))
             i += 2
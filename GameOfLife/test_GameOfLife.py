@@ -0,0 +1,180 @@
+"""
+Checks of the Game of Life engines and tools, run with pytest from this directory.
+"""
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import Lattice
+import Packed
+import Observables
+import Census
+import Video
+import Trajectory
+import Patterns
+
+def seeded(engine, shape=(32, 40), seed=1, **kwargs):
+    """
+    Lattice with the given engine and a random start, the same for every engine.
+    """
+    lat = Lattice.lattice(*shape, engine=engine, status=False, **kwargs)
+    rng = np.random.default_rng(seed)
+    lat.lattice = (rng.random(shape) < 0.3).astype(np.uint8)
+    return(lat)
+
+def test_trajectory_full_drops_frames(tmp_path):
+    lat = seeded("vector")
+    writer = lat.recordTrajectory(str(tmp_path / "traj"), 3)
+    lat.run(6)
+    writer.close()
+    assert lat.t == 6
+    reader = Trajectory.trajectoryReader(str(tmp_path / "traj"))
+    assert list(reader.times()) == [0, 1, 2]
+
+@pytest.mark.parametrize("engine", ["threaded", "distributed"])
+def test_close_frees_engine(engine):
+    lat = seeded(engine, threads=2, workers=2)
+    lat.run(3)
+    state = lat.lattice.copy()
+    lat.close()
+    assert lat.tiled is None and lat.shared is None
+    assert (lat.lattice == state).all()
+
+def test_census_soup_closes_workers():
+    settings = dict(Census.params, **{"X Dimension" : 16, "tMax" : 20, "Engine" : "distributed", "Workers" : 2})
+    before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    Census.runSoup((1, np.random.SeedSequence(1), settings))
+    after = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    assert after <= before
+
+@pytest.mark.parametrize("engine", ["vector", "loop", "sparse", "threaded", "distributed"])
+def test_incremental_com_matches_recompute(engine):
+    lat = seeded(engine, measure=True, keep="all", threads=2, workers=2)
+    lat.resyncInterval = 1000
+    for t in range(0, 8):
+        lat.next()
+    assert np.allclose(lat.COMTracker.com(), lat.getCoM())
+    lat.close()
+
+@pytest.mark.parametrize("engine", ["packed", "sparse", "threaded"])
+def test_random_start_same_for_every_engine(engine):
+    np.random.seed(5)
+    dense = Lattice.lattice(30, 70, engine="vector", status=False).lattice
+    np.random.seed(5)
+    other = Lattice.lattice(30, 70, engine=engine, status=False)
+    assert (other.lattice == dense).all()
+    other.close()
+
+def test_packed_random_chunks():
+    np.random.seed(2)
+    whole = Packed.random(40, 100)
+    np.random.seed(2)
+    assert (Packed.random(40, 100, chunk=150) == whole).all()
+
+@pytest.mark.parametrize("yDim", [1, 63, 64, 65, 130])
+def test_packed_round_trip(yDim):
+    lat = (np.random.default_rng(3).random((5, yDim)) < 0.5).astype(np.uint8)
+    words = Packed.pack(lat)
+    assert (Packed.unpack(words, yDim) == lat).all()
+    assert Packed.population(words) == lat.sum()
+
+def history(engine, rule="B3/S23", sweeps=6, shape=(32, 40), **kwargs):
+    """
+    States after each of the first sweeps from the shared random start.
+    """
+    lat = seeded(engine, shape=shape, rule=rule, threads=2, workers=2, **kwargs)
+    states = []
+    for t in range(0, sweeps):
+        lat.next()
+        states.append(lat.lattice.copy())
+    lat.close()
+    return(states)
+
+@pytest.mark.parametrize("rule", ["B3/S23", "highlife", "daynight", "B0/S8"])
+@pytest.mark.parametrize("engine", ["vector", "packed", "sparse", "threaded", "distributed"])
+def test_engines_match_loop(engine, rule):
+    for a, b in zip(history("loop", rule), history(engine, rule)):
+        assert (a == b).all()
+
+@pytest.mark.parametrize("rule", ["B3/S23", "highlife"])
+def test_hashlife_matches_loop(rule):
+    for a, b in zip(history("loop", rule, shape=(32, 32)), history("hashlife", rule, shape=(32, 32))):
+        assert (a == b).all()
+
+def test_hashlife_node_ceiling():
+    lat = seeded("hashlife", shape=(64, 64), maxNodes=5000)
+    ref = seeded("vector", shape=(64, 64))
+    peak = [0]
+    join = lat.hashLife.join
+    def counted(*children):
+        n = join(*children)
+        peak[0] = max(peak[0], len(lat.hashLife.table))
+        return(n)
+    lat.hashLife.join = counted
+    lat.run(300)
+    ref.run(300)
+    assert (lat.lattice == ref.lattice).all()
+    assert peak[0] <= 5100
+
+def test_linear_fit_matches_polyfit():
+    t = np.arange(0, 50)
+    x = 0.3*t + np.random.default_rng(2).normal(size=t.size)
+    fit = Observables.linearFit()
+    for ti, xi in zip(t, x):
+        fit.add(ti, xi)
+    params, errors = fit.result()
+    assert np.allclose(params, np.polyfit(t, x, 1))
+
+@pytest.mark.parametrize("engine", ["vector", "packed"])
+def test_blinker_cycle_found(engine):
+    lat = seeded(engine, shape=(10, 10), cycles="stop")
+    blinker = np.zeros((10, 10), dtype=np.uint8)
+    blinker[4, 3:6] = 1
+    lat.lattice = blinker
+    lat.run(20)
+    assert lat.cycles.period == 2 and lat.cycles.transient == 0
+    assert lat.t < 20
+
+def test_census_soup_repeatable():
+    settings = dict(Census.params, **{"X Dimension" : 16, "tMax" : 50})
+    first = Census.runSoup((1, np.random.SeedSequence(1), settings))
+    second = Census.runSoup((1, np.random.SeedSequence(1), settings))
+    assert first == second
+
+def test_headless_import_skips_plotting():
+    code = "import sys, Lattice; print(sorted(m for m in ['matplotlib', 'PIL'] if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_int8_matches_uint8():
+    for a, b in zip(history("vector"), history("vector", dtype="int8")):
+        assert (a == b).all()
+
+def test_raw_video_round_trip(tmp_path):
+    lat = seeded("vector")
+    lat.record(str(tmp_path / "run.npy"), tMax=4, fmt="raw")
+    frames, palette = Video.readRaw(str(tmp_path / "run.npy"))
+    assert frames.shape == (5, 32, 40)
+    assert (frames[-1] == lat.lattice).all()
+
+def test_trajectory_round_trip(tmp_path):
+    lat = seeded("packed")
+    writer = lat.recordTrajectory(str(tmp_path / "traj"), 5)
+    states = [lat.lattice.copy()]
+    for t in range(0, 4):
+        lat.next()
+        states.append(lat.lattice.copy())
+    writer.close()
+    reader = Trajectory.trajectoryReader(str(tmp_path / "traj"))
+    for t in range(0, 5):
+        assert (reader[t] == states[t]).all()
+
+def test_rle_loads(tmp_path):
+    path = tmp_path / "glider.rle"
+    path.write_text("#C glider\nx = 5, y = 4, rule = B3/S23\nbo$2bo$3o!\n")
+    lat = Patterns.load(str(path))
+    expected = np.zeros((4, 5), dtype=np.uint8)
+    expected[0, 1] = expected[1, 2] = 1
+    expected[2, :3] = 1
+    assert (lat == expected).all()
@@ -0,0 +1,64 @@
+import numpy as np
+import Lattice as lat
+import interactive as interact
+import sys
+import os
+import time
+
+# Default values:
+params = {"X Dimension":50,
+          "Y Dimension":-1,
+          "Seed" : None,
+          "tMax" : 2000,
+          "tCorr" : 20,
+          "tEquib" : 150,
+          "outDir" : "Compare"
+          }
+"""
+Compare the random sequential and checkerboard update schemes. Both use the same rules but
+the checkerboard scheme updates every site exactly once per sweep, so the two are different
+dynamics and need not agree exactly. This runs both at the example points from Main.py and
+reports <psi>, the variance of I per site and the time per sweep of each.
+"""
+
+# Get input from command line
+args = sys.argv[1:]
+interact.readArgs(args, params)
+np.random.seed(params["Seed"]) #None is default, changes each run.
+
+outDir = params["outDir"]
+if os.path.exists(outDir):
+    print("Error. Output directory exists. Will not overwrite. Exitting...")
+    exit()
+else:
+    os.mkdir(outDir)
+
+points = {"Absorbing" : (0.1, 1./3., 1./3.),
+          "Dynamic" : (1./3., 1./3., 1./3.),
+          "Waves" : (0.22, 1./3., 1./3.)}
+
+with open("{}/Comparison.csv".format(outDir), "w") as outFile:
+    outFile.write("Point:,Update:,p1:,p2:,p3:,<Psi>:,Var_I/N:,Sweeps:,Time per sweep (s):\n")
+    for name, pVals in points.items():
+        for update in lat.updates:
+            lattice = lat.lattice(params["X Dimension"],
+                                  params["Y Dimension"],
+                                  initProportions=[0.5, 0.5, 0., 0.],
+                                  probs=pVals,
+                                  tCorr=params["tCorr"],
+                                  tEquib=params["tEquib"],
+                                  measure=True,
+                                  label="{}_{}".format(name, update),
+                                  outDir=outDir,
+                                  status=False,
+                                  update=update,
+                                  seed=params["Seed"])
+            try:
+                start = time.time()
+                lattice.run(tMax=params["tMax"])
+                perSweep = (time.time() - start)/lattice.t
+                avPsi, varPsi, avI, varI, N, n = lattice.analyse(showPlot=False)
+            finally:
+                lattice.close()
+            print("{:10s} {:13s} <psi> = {:.4f}, Var(I)/N = {:.4f}, {:.2e} s per sweep".format(name, update, avPsi, varI/N, perSweep))
+            outFile.write("{},{},{},{},{},{},{},{},{}\n".format(name, update, pVals[0], pVals[1], pVals[2], avPsi, varI/N, lattice.t, perSweep))
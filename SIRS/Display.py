@@ -0,0 +1,109 @@
+"""
+Plotting and animation for the SIRS model. Kept apart from the simulation so that headless
+runs never import matplotlib; Lattice imports this module only when it needs it.
+"""
+import numpy as np
+import matplotlib.pyplot as pyplot
+from matplotlib import colors
+from matplotlib.animation import FuncAnimation
+from matplotlib.patches import Patch
+
+# make a color map of fixed colors
+cList = ["yellow", "orange", "red", "black"]
+cmap = colors.ListedColormap(cList)
+bounds=[-1.5, -0.5, 0.5, 1.5, 2.5]
+norm = colors.BoundaryNorm(bounds, cmap.N)
+
+views = ["sample", "density"]
+maxPixels = 800 # Largest image side drawn before downsampling automatically
+
+def downsample(lat, factor, view="sample"):
+    """
+    Reduce the lattice to one pixel per factor x factor block, cropping any remainder.
+    :param lat: 2D array of states.
+    :param factor: Side of each block.
+    :param view: "sample" (the state of the first site in each block, keeping the colours) or
+                 "density" (fraction of infected sites in each block).
+    """
+    if view == "density":
+        if factor <= 1:
+            return((lat == 1).astype(float))
+        xDim, yDim = (lat.shape[0]//factor)*factor, (lat.shape[1]//factor)*factor
+        # Sum the factor^2 strided slices, one per offset within a block, which is much
+        # quicker than reducing over a reshaped array.
+        infected = (lat[:xDim, :yDim] == 1).view(np.uint8)
+        count = np.zeros((xDim//factor, yDim//factor), dtype=np.uint16)
+        for i in range(0, factor):
+            for j in range(0, factor):
+                count += infected[i::factor, j::factor]
+        return(count/float(factor*factor))
+    if factor <= 1:
+        return(lat)
+    return(lat[::factor, ::factor])
+
+def autoFactor(xDim, yDim):
+    """
+    Smallest downsampling factor which fits the lattice in maxPixels.
+    """
+    return(max(1, -(-max(xDim, yDim)//maxPixels)))
+
+def animate(f, lattice, im, tMax, sweeps, factor, view):
+    """
+    Advance up to sweeps sweeps and redraw by updating the one image in place.
+    """
+    for s in range(0, sweeps):
+        if not lattice.stop and lattice.t < tMax:
+            lattice.next()
+    im.set_data(downsample(lattice.lattice, factor, view))
+    return([im])
+
+def display(lattice, tMax=1000, sweeps=1, factor=0, view="sample"):
+    """
+    Animate the lattice for up to tMax sweeps. One image is drawn and its data replaced every
+    frame, so blitting only redraws that image and the frame rate does not fall as the run goes on.
+    :param lattice: Lattice.lattice object, stepped as the animation runs.
+    :param sweeps: Number of sweeps per frame.
+    :param factor: Downsampling factor (see downsample()), 0 to fit the lattice in maxPixels.
+    :param view: How blocks are downsampled, "sample" or "density".
+    """
+    if view not in views:
+        print("Error. View {} not recognised. Options are {}.".format(view, ", ".join(views)))
+        exit()
+    if factor <= 0:
+        factor = autoFactor(lattice.xDim, lattice.yDim)
+    sweeps = max(1, sweeps)
+    fig, axis = pyplot.subplots()
+    for s in axis.spines: axis.spines[s].set_color("r")
+    axis.spines['left'].set_position(('outward', 1))
+    axis.spines['top'].set_position(('outward', 0.5))
+    if view == "density":
+        im = axis.imshow(downsample(lattice.lattice, factor, view), cmap="Reds", interpolation="nearest", vmin=0., vmax=1.)
+        pyplot.colorbar(im, label="Fraction infected")
+    else:
+        im = axis.imshow(downsample(lattice.lattice, factor, view), cmap=cmap, interpolation="nearest", vmin=-1.5, vmax=2.5) #"bwr"
+        labels = ["Recovered", "Susceptible", "Infected", "Immune"]
+        legendElements = []
+        for e in [1, 2, 0, 3]:
+            legendElements.append(Patch(facecolor=cList[e], edgecolor="k", label=labels[e]))
+        fig.legend(handles=legendElements, loc="center right")
+        axis.set_position([0.01, 0.08, 0.85, 0.85], which='both')
+    frames = -(-tMax//sweeps)
+    anim = FuncAnimation(fig, animate, frames, interval=0, blit=True, repeat=False, fargs=(lattice, im, tMax, sweeps, factor, view))
+    pyplot.show()
+    print("Animation finished. Please close the animation window.")
+    return(anim)
+
+def plotPsi(t, psi, path, showPlot=False):
+    """
+    Plot psi against time and save it to PsiVsTime.png.
+    :param path: Run directory.
+    :param showPlot: Whether to show the plot as well.
+    """
+    pyplot.plot(t, psi)
+    pyplot.xlabel("Time (sweeps)")
+    pyplot.ylabel("$\\psi$")
+    pyplot.savefig("{}/PsiVsTime.png".format(path))
+    if showPlot:
+        pyplot.show()
+    else:
+        pyplot.clf()
@@ -0,0 +1,165 @@
+"""
+Domain decomposition of SIRS sweeps across worker processes. The lattice lives in
+multiprocessing.shared_memory, and each worker owns a strip of whole rows. A sweep updates
+the checkerboard sublattices (see Lattice.colourMasks) one after another: sites of one colour
+share no nearest neighbours, so while a colour is updated every site a worker reads (its own
+and the halo rows above and below its strip, read straight from the shared lattice) is of
+another colour and does not change. Strips therefore never conflict, and all workers meet at
+a barrier before the next colour. This is the checkerboard dynamics, but each worker draws
+from its own random stream, so trajectories differ from the single process scheme.
+
+Workers are started with fork, so they share the mapping of the parent and need nothing
+pickled. This runs on one Linux (or other Unix) machine with any number of local processes.
+"""
+import numpy as np
+import atexit
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+def strips(xDim, workers):
+    """
+    Rows (start, stop) owned by each worker, of (nearly) equal height.
+    """
+    edges = np.linspace(0, xDim, workers + 1).astype(int)
+    return([(int(edges[i]), int(edges[i + 1])) for i in range(0, workers)])
+
+def stripUpdate(lat, r0, r1, mask, pInf, p2, p3, rng):
+    """
+    Update the sites of one sublattice in rows r0 to r1, in place, as Lattice.checkerboardSweep.
+    :param lat: The shared lattice.
+    :param mask: The sublattice mask for rows r0 to r1.
+    :return transitions: Number of infections, recoveries and losses of immunity.
+    """
+    xDim = lat.shape[0]
+    infected = (lat.take(np.arange(r0 - 1, r1 + 1) % xDim, axis=0) == 1).astype(np.int8) # Strip and halo rows
+    NI = infected[:-2] + infected[2:] + np.roll(infected[1:-1], 1, axis=1) + np.roll(infected[1:-1], -1, axis=1)
+    strip = lat[r0:r1]
+    sites = strip[mask]
+    rand = rng.random(sites.shape)                                                  # One random number per site
+    new = sites.copy()
+    infection = (sites == 0) & (rand < pInf[NI[mask]])
+    recovery = (sites == 1) & (rand < p2)
+    loss = (sites == -1) & (rand < p3)
+    new[infection] = 1                                                              # Infection
+    new[recovery] = -1                                                              # Recovery
+    new[loss] = 0                                                                   # Loss of immunity
+    strip[mask] = new
+    return([np.count_nonzero(infection), np.count_nonzero(recovery), np.count_nonzero(loss)])
+
+def work(lat, transitions, w, r0, r1, masks, probs, seedSeq, command, barrier, colourBarrier, conn):
+    """
+    Worker loop: wait at the barrier, sweep rows r0 to r1 colour by colour, record the
+    transitions in row w of the shared transitions array and wait again. Stops when command
+    is negative. With command 1 the state of the random stream is sent down the pipe conn
+    instead of sweeping, and with command 2 it is replaced by one received from conn.
+    """
+    rng = np.random.default_rng(seedSeq)
+    p1, p2, p3 = probs
+    pInf = 1. - (1. - p1)**np.arange(0, 5)
+    masks = [mask[r0:r1] for mask in masks]
+    while True:
+        barrier.wait()
+        if command.value < 0:
+            break
+        if command.value == 1:
+            conn.send(rng.bit_generator.state)
+            barrier.wait()
+            continue
+        if command.value == 2:
+            rng.bit_generator.state = conn.recv()
+            barrier.wait()
+            continue
+        total = np.zeros(3, dtype=np.int64)
+        for mask in masks:
+            total += stripUpdate(lat, r0, r1, mask, pInf, p2, p3, rng)
+            colourBarrier.wait()                                                    # Colour done in every strip
+        transitions[w] = total
+        barrier.wait()
+
+class stripPool(object):
+    """
+    A lattice in shared memory and the worker processes that sweep it.
+    """
+    def __init__(self, lattice, colours, probs, seed=None, workers=1):
+        """
+        :param lattice: Initial lattice, copied into shared memory (see self.lattice).
+        :param colours: Sublattice masks from Lattice.colourMasks().
+        :param probs: Probabilities (p1, p2, p3).
+        :param seed: Seed (or SeedSequence) for the random streams, one spawned per worker.
+        :param workers: Number of worker processes, each owning a strip of rows.
+        """
+        if "fork" not in mp.get_all_start_methods():
+            print("Error. The distributed scheme needs processes started with fork, not available here.")
+            exit()
+        ctx = mp.get_context("fork")
+        self.workers = max(1, min(workers, lattice.shape[0]))
+        # Seeds are spawned before the shared memory is allocated, so a bad seed leaves none behind.
+        seeds = (seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)).spawn(self.workers)
+        self.memory = [shared_memory.SharedMemory(create=True, size=max(1, lattice.nbytes)),
+                       shared_memory.SharedMemory(create=True, size=self.workers*3*8)]
+        self.lattice = np.ndarray(lattice.shape, dtype=lattice.dtype, buffer=self.memory[0].buf)
+        self.lattice[...] = lattice
+        self.transitions = np.ndarray((self.workers, 3), dtype=np.int64, buffer=self.memory[1].buf)
+        self.command = ctx.Value("i", 0, lock=False)    # 0 to sweep, 1 or 2 to get or set the random states, -1 to stop
+        self.barrier = ctx.Barrier(self.workers + 1)    # Workers and the main process
+        colourBarrier = ctx.Barrier(self.workers)       # Workers only, between colours
+        self.pipes = [ctx.Pipe() for w in range(0, self.workers)]  # (main end, worker end) for random states
+        self.processes = [ctx.Process(target=work, args=(self.lattice, self.transitions, w, r0, r1, colours, probs, seeds[w], self.command, self.barrier, colourBarrier, self.pipes[w][1]), daemon=True)
+                          for w, (r0, r1) in enumerate(strips(lattice.shape[0], self.workers))]
+        for process in self.processes:
+            process.start()
+        self.closed = False
+        atexit.register(self.close)
+
+    def sweep(self):
+        """
+        Perform one sweep of the shared lattice, returning once every strip is done.
+        :return transitions: Number of infections, recoveries and losses of immunity in the sweep.
+        """
+        self.command.value = 0
+        self.barrier.wait()                             # Start
+        self.barrier.wait()                             # Every strip done
+        return(self.transitions.sum(axis=0))
+
+    def getStates(self):
+        """
+        Get the state of every worker's random stream, e.g. for a checkpoint.
+        :return states: List of bit generator states, one per worker.
+        """
+        self.command.value = 1
+        self.barrier.wait()
+        states = [main.recv() for main, end in self.pipes]
+        self.barrier.wait()
+        return(states)
+
+    def setStates(self, states):
+        """
+        Replace the state of every worker's random stream with those from getStates().
+        """
+        if len(states) != self.workers:
+            print("Error. Random states saved for {} workers, but there are {}.".format(len(states), self.workers))
+            exit()
+        for (main, end), state in zip(self.pipes, states):
+            main.send(state)
+        self.command.value = 2
+        self.barrier.wait()
+        self.barrier.wait()
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.command.value = -1
+        self.barrier.wait()
+        for process in self.processes:
+            process.join()
+        self.lattice, self.transitions = None, None
+        for mem in self.memory:
+            mem.unlink()                                # Freed once every mapping is gone
+            try:
+                mem.close()
+            except BufferError:
+                pass                                    # The lattice object still holds views, unmapped at exit
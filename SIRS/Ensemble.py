@@ -0,0 +1,132 @@
+"""
+Ensemble of independent SIRS replicas held as one (R, X, Y) array, all advanced together with
+the checkerboard update scheme (see Lattice.checkerboardSweep). Each replica has its own
+probabilities and initial proportions, so a whole grid of parameter points can be run at once.
+"""
+import numpy as np
+import Lattice as lat
+import Observables
+
+class ensemble(object):
+    """
+    Stack of R SIRS lattices with periodic boundary conditions. States are as for Lattice.lattice;
+    0 is susceptible, 1 is infected, -1 is recovered, and 2 is immune.
+    """
+    def __init__(self, xDim=50, yDim=0, initProportions=[0.5, 0.5, 0., 0.], probs=[(1./3., 1./3., 1./3.)], tEquib=100, tCorr=10, seed=None, status=True, dtype="int8", keep="all", keepLength=1024):
+        """
+        :param xDim: The x dimension of each lattice. Defaults to 50.
+        :param yDim: The y dimension of each lattice (optional), defaults to square lattice.
+        :param initProportions: Fraction of sites in each state (S, I, R, Im), either one tuple for
+                                all replicas or a list with one tuple per replica.
+        :param probs: List of probabilities (p1, p2, p3), one tuple per replica.
+        :param tEquib: The equilibrium time of the system (number of sweeps)
+        :param tCorr: Autocorrelation time of the system (number of sweeps)
+        :param seed: Seed for the random number generator.
+        :param status: Whether to print the state once created.
+        :param dtype: Type of the lattice array, one of Lattice.dtypes.
+        :param keep: Which measurements of I to keep as a raw series for each replica, "all", "ring"
+                     (only the last keepLength) or "none". Statistics are accumulated as the run
+                     goes either way, as for Lattice.lattice.
+        :param keepLength: Number of measurements kept with keep="ring".
+        """
+        if dtype not in lat.dtypes:
+            print("Error. Lattice type {} not recognised. Options are {}.".format(dtype, ", ".join(lat.dtypes)))
+            exit()
+        if keep not in lat.keeps:
+            print("Error. Keep option {} not recognised. Options are {}.".format(keep, ", ".join(lat.keeps)))
+            exit()
+        self.rng = np.random.default_rng(seed)
+        self.tEquib = tEquib    # Equilibration time
+        self.tCorr = tCorr      # Auto-correlation time
+        self.t = 0              # Number of sweeps performed.
+        self.stop = False       # Stop once every replica has no infected sites
+        self.xDim = xDim
+        if yDim > 0:
+            self.yDim = yDim
+        else:
+            self.yDim = xDim
+        self.size = self.xDim*self.yDim
+        probs = np.array(probs, dtype=float).reshape(-1, 3)
+        self.replicas = probs.shape[0]
+        self.p1, self.p2, self.p3 = probs[:, 0], probs[:, 1], probs[:, 2]
+        if np.ndim(initProportions[0]) == 0:
+            initProportions = [initProportions]*self.replicas
+        # Define lattices
+        self.lattice = np.empty((self.replicas, self.xDim, self.yDim), dtype=dtype)
+        for r in range(0, self.replicas):
+            sites = lat.initialSites(self.size, initProportions[r], dtype)
+            self.rng.shuffle(sites)
+            self.lattice[r] = sites.reshape(self.xDim, self.yDim)
+        self.colours = lat.colourMasks(self.xDim, self.yDim)
+        self.work = (np.empty(self.lattice.shape, dtype=np.int8), np.empty(self.lattice.shape, dtype=np.int8)) # For checkerboardSweep()
+        self.counts = lat.countStates(self.lattice) # Number of S, I, R and Im sites of each replica, shape (R, 4)
+        # Measurements of I for each replica, up to and including the first with no infected sites.
+        self.I = [Observables.observable(keep, keepLength, dtype=np.int64) for r in range(0, self.replicas)]
+        self.absorbed = np.zeros(self.replicas, dtype=bool) # Replicas measured with no infected sites
+        if status:
+            print(self)
+
+    def __str__(self):
+        """
+        Returns string for printing key details of object.
+        """
+        return("Ensemble of {} replicas of shape {}, {} replicas still have infected sites.".format(self.replicas, (self.xDim, self.yDim), np.count_nonzero(self.getFrac())))
+
+    def getFrac(self):
+        """
+        Get the number of infected sites on each replica, from the running counts.
+        """
+        return(self.counts[:, 1].copy())
+
+    def next(self):
+        """
+        Perform one sweep of every replica, then measure.
+        """
+        lat.updateCounts(self.counts, lat.checkerboardSweep(self.lattice, self.colours, self.p1, self.p2, self.p3, self.rng, self.work))
+        self.t += 1
+        I = self.getFrac()
+        if (self.t > self.tEquib and self.t % self.tCorr == 0) or not I.any():     # Measure, and once none have infected sites left
+            self.measure(I)
+        if not I.any():
+            self.stop = True
+
+    def measure(self, I):
+        """
+        Add the infected counts to the measurements of every replica not yet absorbed.
+        """
+        for r in np.flatnonzero(~self.absorbed):
+            self.I[r].add(self.t, I[r])
+        self.absorbed |= I == 0
+
+    def run(self, tMax=1000):
+        for i in range(0, tMax):
+            if not self.stop:
+                self.next()
+            else:
+                break
+
+    def series(self, r):
+        """
+        Get the kept infected count series of replica r (empty with keep="none").
+        :return t: Array of measurement times.
+        :return I: Array of the infected count at each time.
+        """
+        return(self.I[r].times(), self.I[r].values().astype(float))
+
+    def analyse(self):
+        """
+        Get statistics for each replica, with the same conventions as Lattice.lattice.analyse():
+        replicas which reached the absorbing state have average and variance of zero.
+        :return results: Dictionary of arrays with one entry per replica ("avPsi", "varPsi",
+                         "avI", "varI", "n") along with "N", the number of sites, and aggregate
+                         "meanPsi" and "errPsi" (standard error on <psi> across replicas).
+        """
+        # Absorbed replicas count measurements up to the first with no infected sites.
+        n = np.array([obs.n for obs in self.I], dtype=int)
+        absorbed = np.array([obs.n == 0 or obs.min == 0 for obs in self.I])
+        avI = np.where(absorbed, 0., [obs.mean for obs in self.I])
+        varI = np.where(absorbed, 0., [obs.var() for obs in self.I])
+        avPsi = avI/float(self.size)
+        varPsi = varI/float(self.size)**2
+        return({"avPsi" : avPsi, "varPsi" : varPsi, "avI" : avI, "varI" : varI, "n" : n,
+                "N" : self.size, "meanPsi" : avPsi.mean(), "errPsi" : avPsi.std()/np.sqrt(self.replicas)})
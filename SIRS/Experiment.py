@@ -1,11 +1,11 @@
 import numpy as np
 import Lattice as lat
+import Ensemble
 import interactive as interact
-import matplotlib.pyplot as pyplot
-import matplotlib.pylab as pl
 import sys
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Default values:
 params = {"X Dimension":50,
@@ -17,165 +17,310 @@ params = {"X Dimension":50,
           "tEquib" : 150,
           "Animate" : False,
           "Measure" : True,
-          "outDir" : "Experiment"
+          "outDir" : "Experiment",
+          "Update" : "sequential",
+          "Kernel" : "auto",
+          "Workers" : 1,
+          "Resume" : False,
+          "Checkpoint" : 0,
+          "Ensemble" : False,
+          "Adaptive" : 0.,
+          "Keep" : "all",
+          "KeepLength" : 1024,
+          "Plot" : True
           }
 """
 Default correlation and equilibration times are based on "psiVsTime.png",
 which is the value of psi as a function of t output every sweep with initial
 proportions [0.5, 0.4, 0., 0.1] and probabilities (0.2, 1/3, 1/3) as an example.
 The system equilibrates (roughly) in 150 sweeps, and local fluctuations are on a
-scale of around 10-15 sweeps. 
+scale of around 10-15 sweeps.
+
+Each run gets its own random stream spawned from a single SeedSequence in run order,
+so results are the same whatever the number of workers (-w).
+
+With -res Y an interrupted experiment is continued in the same output directory. Runs already
+in Results.csv are skipped, and runs with a checkpoint (saved every -ckpt sweeps) carry on from
+it, so the results match an uninterrupted experiment.
+
+With -ens Y the remaining points of each stage are run together as one Ensemble.ensemble,
+which uses the checkerboard update scheme whatever -u is (with a warning if it is not
+checkerboard). Run directories are not written in this mode and -w is ignored. -keep and -kl
+bound the measurements kept for each replica as for single runs.
+
+With -adapt <relErr> each run stops once <psi> has the given relative error (or an absolute
+error of 0.001), and only strongly correlated runs, near the critical region, may continue
+past the usual number of sweeps, up to 4 times as many. See Lattice.lattice.runAdaptive.
 """
 
-# Get input from command line
-args = sys.argv[1:]
-interact.readArgs(args, params)
-np.random.seed(params["Seed"]) #None is default, changes each run.
-
-if (not params["Measure"]) or params["Animate"]:
-    print("Warning. Measurements set to false or animation set to true")
-    print("This will be ignored in the experiment.")
-
-outDir = params["outDir"]
-if os.path.exists(outDir):
-    print("Error. Output directory exists. Will not overwrite. Exitting...")
-    exit()
-else:
-    os.mkdir(outDir)
-with open("{}/Results.csv".format(outDir), "w") as outFile:
-    outFile.write("Run:,p1:,p2:,p3:,<I>:,<Psi>:,Var_I:,Var_Psi,N,n:\n")
-
-
-# Phase diagram:
-p2 = 0.5
-p1Vals = [float(i)/1000. for i in range(0, 1001, 25)]
-p3Vals = [float(i)/1000. for i in range(0, 1001, 25)]
-runNum = 1
-
-p1Res = []
-p3Res = []
-psi = []
-varIList = []
-varPsiList = []
-NList = []
-nList = []
-maxSweeps = 1000
-
-def runLat(p1, p2, p3, maxSweeps, initParams=[0.5, 0.5, 0., 0.]):
-    global params, runNum, p1Res, p3Res, psi, varIList, NList, nList, varPsiList
-    # Set p Values
+def runLat(task):
+    """
+    Run the lattice for one parameter point. Runs in a worker process, so everything it needs
+    is passed in.
+    :param task: Tuple (runNum, p1, p2, p3, fIm, maxSweeps, seedSeq, settings), where fIm is the
+                 immune fraction, seedSeq the SeedSequence for this run and settings the
+                 experiment parameters.
+    :return result: Tuple (runNum, p1, p2, p3, fIm, <I>, <psi>, Var_I, Var_psi, N, n).
+    """
+    runNum, p1, p2, p3, fIm, maxSweeps, seedSeq, settings = task
+    # Set p Values and initial proportions
     pVals = [p1, p2, p3]
+    initParams = [(0.5-fIm/2.), (0.5-fIm/2.), 0., fIm]
+    # Seed the global state (used by the sequential scheme) and the lattice's generator.
+    np.random.seed(seedSeq.generate_state(1)[0])
     # Output progress:
     timeStr = time.gmtime(time.time())
     timeStr = "{:02d}:{:02d}".format(timeStr.tm_hour, timeStr.tm_min)
     print("Starting run {} at {}".format(runNum, timeStr))
     # Define lattice
-    lattice = lat.lattice(params["X Dimension"], 
-                          params["Y Dimension"], 
-                          initProportions=initParams, 
+    lattice = lat.lattice(settings["X Dimension"],
+                          settings["Y Dimension"],
+                          initProportions=initParams,
                           probs=pVals,
-                          tCorr=params["tCorr"],
-                          tEquib=params["tEquib"],
+                          tCorr=settings["tCorr"],
+                          tEquib=settings["tEquib"],
                           measure=True,
                           label="Run{}".format(runNum),
-                          outDir=params["outDir"],
-                          status=False)
-    # Run lattice
-    lattice.run(tMax=maxSweeps)
-    # Analyse
-    avPsi, varPsi, avI, varI, N, n = lattice.analyse(showPlot=False)
-    with open("{}/Results.csv".format(outDir), "a") as outFile:
-        outFile.write("{},{},{},{},{},{},{},{},{},{}\n".format(runNum, p1, p2, p3, avI, avPsi, varI, varPsi, N, n))
-    p1Res.append(p1)
-    p3Res.append(p3)
-    psi.append(avPsi)
-    varIList.append(varI)
-    varPsiList.append(varPsi)
-    NList.append(N)
-    nList.append(n)
-
-print("Beginning Phase diagram")
-for p1 in p1Vals:
-    for p3 in p3Vals:
-        runLat(p1, p2, p3, maxSweeps)
+                          outDir=settings["outDir"],
+                          status=False,
+                          update=settings["Update"],
+                          seed=seedSeq,
+                          kernel=settings["Kernel"],
+                          resume=settings["Resume"],
+                          keep=settings["Keep"],
+                          keepLength=settings["KeepLength"],
+                          workers=settings["Workers"])
+    try:
+        if settings["Resume"] and lattice.loadCheckpoint():
+            print("Run {} continuing from sweep {}".format(runNum, lattice.t))
+        # Run lattice
+        if settings["Adaptive"] > 0:
+            lattice.runAdaptive(tMax=maxSweeps - lattice.t, relErr=settings["Adaptive"], tLimit=4*maxSweeps - lattice.t, checkpoint=settings["Checkpoint"])
+        else:
+            lattice.run(tMax=maxSweeps - lattice.t, checkpoint=settings["Checkpoint"])
+        # Analyse
+        avPsi, varPsi, avI, varI, N, n = lattice.analyse(showPlot=False, plot=settings["Plot"])
+    finally:
+        lattice.close()
+    if os.path.exists("{}/Checkpoint.npz".format(lattice.path)):
+        os.remove("{}/Checkpoint.npz".format(lattice.path))
+    return((runNum, p1, p2, p3, fIm, avI, avPsi, varI, varPsi, N, n))
+
+def runEnsemble(tasks, settings):
+    """
+    Run a list of tasks (which must share maxSweeps) as a single ensemble of replicas.
+    The ensemble is seeded from the SeedSequence of the first task.
+    :return results: List of result tuples as returned by runLat, in task order.
+    """
+    print("Starting ensemble of {} runs ({} to {})".format(len(tasks), tasks[0][0], tasks[-1][0]))
+    ens = Ensemble.ensemble(settings["X Dimension"],
+                            settings["Y Dimension"],
+                            initProportions=[[(0.5-task[4]/2.), (0.5-task[4]/2.), 0., task[4]] for task in tasks],
+                            probs=[task[1:4] for task in tasks],
+                            tCorr=settings["tCorr"],
+                            tEquib=settings["tEquib"],
+                            seed=tasks[0][6],
+                            status=False,
+                            keep=settings["Keep"],
+                            keepLength=settings["KeepLength"])
+    ens.run(tMax=tasks[0][5])
+    stats = ens.analyse()
+    output = []
+    for r, task in enumerate(tasks):
+        output.append(tuple(task[0:5]) + (stats["avI"][r], stats["avPsi"][r], stats["varI"][r], stats["varPsi"][r], stats["N"], stats["n"][r]))
+    return(output)
+
+def readResults(outDir):
+    """
+    Read the runs already completed from Results.csv.
+    :return done: Dictionary of result tuples keyed by run number.
+    """
+    done = {}
+    with open("{}/Results.csv".format(outDir), "r") as inFile:
+        for line in inFile.readlines()[1:]:
+            vals = line.strip().split(",")
+            if len(vals) != 11:
+                continue # Partly written line
+            done[int(vals[0])] = tuple([int(vals[0])] + [float(v) for v in vals[1:9]] + [int(vals[9]), int(vals[10])])
+    return(done)
+
+def runAll(tasks, workers, done):
+    """
+    Run a list of tasks, in parallel if more than one worker is requested, skipping those
+    already done. Each result is appended to Results.csv as soon as it is available.
+    :param tasks: List of tasks for runLat.
+    :param workers: Number of worker processes.
+    :param done: Dictionary of completed results keyed by run number, updated with new ones.
+    :return results: Dictionary of result lists, in task order.
+    """
+    for task in tasks:
+        if task[0] in done and tuple(done[task[0]][1:5]) != tuple(task[1:5]):
+            print("Error. Run {} in Results.csv has different parameters to this experiment. Exiting.".format(task[0]))
+            exit()
+    todo = [task for task in tasks if task[0] not in done]
+    if len(todo) < len(tasks):
+        print("Skipping {} completed runs.".format(len(tasks) - len(todo)))
+    # With the distributed scheme the workers split each run instead, so runs go one at a time.
+    pool = workers > 1 and not params["Ensemble"] and params["Update"] != "distributed"
+    with open("{}/Results.csv".format(params["outDir"]), "a") as outFile:
+        if params["Ensemble"]:
+            output = runEnsemble(todo, params) if len(todo) > 0 else []
+        elif pool:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            output = executor.map(runLat, todo)
+        else:
+            output = map(runLat, todo)
+        for res in output:
+            outFile.write("{},{},{},{},{},{},{},{},{},{},{}\n".format(*res))
+            outFile.flush()
+            done[res[0]] = res
+        if pool:
+            executor.shutdown()
+    output = [done[task[0]] for task in tasks]
+    keys = ["p1", "p3", "psi", "varI", "varPsi", "N", "n"]
+    cols = [1, 3, 6, 7, 8, 9, 10]
+    return({key : [res[c] for res in output] for key, c in zip(keys, cols)})
+
+def plotPhaseDiagram(res, p1Vals, p3Vals, outDir):
+    """
+    Draw <psi> and the variance of I per site over the (p1, p3) grid of the first stage. The
+    plotting modules are imported here, so that importing this module (as every worker process
+    does) does not load matplotlib.
+    """
+    import matplotlib.pyplot as pyplot
+    import matplotlib.pylab as pl
+    p1Bins = [min(p1Vals)-0.005] + [float(p1Vals[i] + p1Vals[i-1])/2. - 0.005 for i in range(1, len(p1Vals))] + [max(p1Vals) + 0.005]
+    p3Bins = [min(p3Vals)-0.005] + [float(p3Vals[i] + p3Vals[i-1])/2. - 0.005 for i in range(1, len(p3Vals))] + [max(p3Vals) + 0.005]
+    pl.hist2d(res["p1"], res["p3"], weights=res["psi"], bins=[p1Bins, p3Bins])
+    pyplot.xlim(0, 1)
+    pyplot.ylim(0, 1)
+    pyplot.xlabel("$P_{1}$")
+    pyplot.ylabel("$P_{3}$")
+    pyplot.colorbar()
+    pyplot.title(r"$\left<\psi\right> = \frac{\left<I\right>}{N}$")
+    pyplot.savefig("{}/Phase_Diagram.png".format(outDir))
+    pyplot.clf()
+    weight = np.array(res["varI"])/np.array(res["N"])
+    pl.hist2d(res["p1"], res["p3"], weights=weight, bins=[p1Bins, p3Bins])
+    pyplot.xlim(0, 1)
+    pyplot.ylim(0, 1)
+    pyplot.xlabel("$P_{1}$")
+    pyplot.ylabel("$P_{3}$")
+    pyplot.colorbar()
+    pyplot.title(r"$\frac{\sigma_{I}^{2}}{N}$")
+    pyplot.savefig("{}/Variance.png".format(outDir))
+    pyplot.clf()
+
+def plotCut(res, outDir):
+    """
+    Draw the variance of I per site along the cut in p1 of the second stage.
+    """
+    import matplotlib.pyplot as pyplot
+    weight = np.array(res["varI"])/np.array(res["N"])
+    pyplot.plot(res["p1"], weight, "k-")
+    pyplot.xlabel("$P_{1}$")
+    pyplot.ylabel(r"$\frac{\sigma_{I}^{2}}{N}$")
+    pyplot.savefig("{}/VarCut.png".format(outDir))
+    pyplot.clf()
+
+def plotImmunity(res, fracIm, outDir):
+    """
+    Draw <psi> against the immune fraction for the third stage, with standard errors and with
+    standard deviations as error bars.
+    """
+    import matplotlib.pyplot as pyplot
+    # Error is standard error on mean
+    err = np.sqrt(res["varPsi"])/np.sqrt(res["n"])
+    pyplot.errorbar(fracIm, res["psi"], yerr = err, color = "k", ecolor = "k", linestyle = "--", marker = "s", capsize=2)
+    pyplot.xlabel("$f_{im}$")
+    pyplot.ylabel(r"$\left<psi\right>$")
+    pyplot.savefig("{}/ImmuneFraction.png".format(outDir))
+    pyplot.clf()
+
+    pyplot.errorbar(fracIm, res["psi"], yerr = np.sqrt(res["varPsi"]), color = "k", ecolor = "k", linestyle = "--", marker = "s", capsize=2)
+    pyplot.xlabel("$f_{im}$")
+    pyplot.ylabel(r"$\left<psi\right>$")
+    pyplot.savefig("{}/ImmuneFraction_stDevErrBar.png".format(outDir))
+    pyplot.clf()
+
+if __name__ == "__main__":
+    # Get input from command line
+    args = sys.argv[1:]
+    interact.readArgs(args, params)
+
+    if (not params["Measure"]) or params["Animate"]:
+        print("Warning. Measurements set to false or animation set to true")
+        print("This will be ignored in the experiment.")
+    if params["Ensemble"] and params["Update"] != "checkerboard":
+        print("Warning. Ensembles (-ens Y) always use the checkerboard scheme, -u {} is ignored.".format(params["Update"]))
+
+    outDir = params["outDir"]
+    if os.path.exists(outDir) and params["Resume"]:
+        print("Resuming experiment in {}".format(outDir))
+        done = readResults(outDir)
+        with open("{}/Seed.txt".format(outDir), "r") as inFile:
+            entropy = int(inFile.read())
+    elif os.path.exists(outDir):
+        print("Error. Output directory exists. Will not overwrite (use -res Y to resume). Exitting...")
+        exit()
+    else:
+        os.mkdir(outDir)
+        done = {}
+        entropy = params["Seed"]
+        with open("{}/Results.csv".format(outDir), "w") as outFile:
+            outFile.write("Run:,p1:,p2:,p3:,fIm:,<I>:,<Psi>:,Var_I:,Var_Psi,N,n:\n")
+
+    # Random streams for every run come from one root sequence, save its entropy so it can be repeated.
+    rootSeq = np.random.SeedSequence(entropy)
+    print("Root seed: {}".format(rootSeq.entropy))
+    with open("{}/Seed.txt".format(outDir), "w") as outFile:
+        outFile.write(str(rootSeq.entropy))
+    workers = params["Workers"]
+    runNum = 1
+
+    # Phase diagram:
+    p2 = 0.5
+    p1Vals = [float(i)/1000. for i in range(0, 1001, 25)]
+    p3Vals = [float(i)/1000. for i in range(0, 1001, 25)]
+    maxSweeps = 1000
+
+    print("Beginning Phase diagram")
+    points = [(p1, p3) for p1 in p1Vals for p3 in p3Vals]
+    seeds = rootSeq.spawn(len(points))
+    tasks = []
+    for (p1, p3), seedSeq in zip(points, seeds):
+        tasks.append((runNum, p1, p2, p3, 0., maxSweeps, seedSeq, params))
         runNum += 1
+    res = runAll(tasks, workers, done)
+    plotPhaseDiagram(res, p1Vals, p3Vals, outDir)
+
+    print("Phase diagram completed. Beginning cut.")
+    # Cut in phase diagram
+    p2 = 0.5
+    p3 = 0.5
+    p1Vals = [float(i)/100. for i in range(20, 51, 1)]
+    maxSweeps = 10000
 
-p1Bins = [min(p1Vals)-0.005] + [float(p1Vals[i] + p1Vals[i-1])/2. - 0.005 for i in range(1, len(p1Vals))] + [max(p1Vals) + 0.005]
-p3Bins = [min(p3Vals)-0.005] + [float(p3Vals[i] + p3Vals[i-1])/2. - 0.005 for i in range(1, len(p3Vals))] + [max(p3Vals) + 0.005]
-pl.hist2d(p1Res, p3Res, weights=psi, bins=[p1Bins, p3Bins])
-pyplot.xlim(0, 1)
-pyplot.ylim(0, 1)
-pyplot.xlabel("$P_{1}$")
-pyplot.ylabel("$P_{3}$")
-pyplot.colorbar()
-pyplot.title(r"$\left<\psi\right> = \frac{\left<I\right>}{N}$")
-pyplot.savefig("{}/Phase_Diagram.png".format(outDir))
-pyplot.clf()
-weight = np.array(varIList)/np.array(NList)
-pl.hist2d(p1Res, p3Res, weights=weight, bins=[p1Bins, p3Bins])
-pyplot.xlim(0, 1)
-pyplot.ylim(0, 1)
-pyplot.xlabel("$P_{1}$")
-pyplot.ylabel("$P_{3}$")
-pyplot.colorbar()
-pyplot.title(r"$\frac{\sigma_{I}^{2}}{N}$")
-pyplot.savefig("{}/Variance.png".format(outDir))
-pyplot.clf()
-
-print("Phase diagram completed. Beginning cut.")
-# Cut in phase diagram
-p2 = 0.5
-p3 = 0.5
-p1Vals = [float(i)/100. for i in range(20, 51, 1)]
-p1Res = []
-p3Res = []
-psi = []
-varIList = []
-varPsiList = []
-NList = []
-nList = []
-maxSweeps = 10000
-
-for p1 in p1Vals:
-    runLat(p1, p2, p3, maxSweeps)
-    runNum += 1
-
-weight = np.array(varIList)/np.array(NList)
-pyplot.plot(p1Res, weight, "k-")
-pyplot.xlabel("$P_{1}$")
-pyplot.ylabel(r"$\frac{\sigma_{I}^{2}}{N}$")
-pyplot.savefig("{}/VarCut.png".format(outDir))
-pyplot.clf()
-
-print("Cut completed. Beginning immunity.")
-# Effect of immunity
-p1 = 0.5
-p2 = 0.5
-p3 = 0.5
-psi = []
-varIList = []
-varPsiList = []
-NList = []
-nList = []
-fracIm = [float(i)/100. for i in range(0, 101, 1)]
-maxSweeps = 10000
-
-for fIm in fracIm:
-    initParams=[(0.5-fIm/2.), (0.5-fIm/2.), 0., fIm]
-    runLat(p1, p2, p3, maxSweeps, initParams=initParams)
-    runNum += 1
-
-# Error is standard error on mean
-err = np.sqrt(varPsiList)/np.sqrt(nList)
-pyplot.errorbar(fracIm, psi, yerr = err, color = "k", ecolor = "k", linestyle = "--", marker = "s", capsize=2)
-pyplot.xlabel("$f_{im}$")
-pyplot.ylabel(r"$\left<psi\right>$")
-pyplot.savefig("{}/ImmuneFraction.png".format(outDir))
-pyplot.clf()
-
-pyplot.errorbar(fracIm, psi, yerr = np.sqrt(varPsiList), color = "k", ecolor = "k", linestyle = "--", marker = "s", capsize=2)
-pyplot.xlabel("$f_{im}$")
-pyplot.ylabel(r"$\left<psi\right>$")
-pyplot.savefig("{}/ImmuneFraction_stDevErrBar.png".format(outDir))
-pyplot.clf()
+    seeds = rootSeq.spawn(len(p1Vals))
+    tasks = []
+    for p1, seedSeq in zip(p1Vals, seeds):
+        tasks.append((runNum, p1, p2, p3, 0., maxSweeps, seedSeq, params))
+        runNum += 1
+    res = runAll(tasks, workers, done)
+    plotCut(res, outDir)
 
+    print("Cut completed. Beginning immunity.")
+    # Effect of immunity
+    p1 = 0.5
+    p2 = 0.5
+    p3 = 0.5
+    fracIm = [float(i)/100. for i in range(0, 101, 1)]
+    maxSweeps = 10000
+
+    seeds = rootSeq.spawn(len(fracIm))
+    tasks = []
+    for fIm, seedSeq in zip(fracIm, seeds):
+        tasks.append((runNum, p1, p2, p3, fIm, maxSweeps, seedSeq, params))
+        runNum += 1
+    res = runAll(tasks, workers, done)
+    plotImmunity(res, fracIm, outDir)
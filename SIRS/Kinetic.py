@@ -0,0 +1,227 @@
+"""
+Rejection free (n-fold way, or BKL) random sequential SIRS dynamics. A random sequential
+step picks one of the N sites at random and changes it with a probability set by its state
+and, for S sites, its number k of infected neighbours: 1-(1-p1)^k for S, p2 for I, p3 for R
+and 0 for Im. Where infections are sparse almost every pick changes nothing. Here sites are
+instead kept in classes by that probability (S with k = 0 to 4, I, R, Im), so with Q the sum
+of the probabilities over all sites:
+- the number of steps up to and including the next change is drawn at once, as it is
+  geometric with success probability Q/N per step,
+- the site that changes is drawn with probability proportional to its own, by picking a
+  class by its total and then a site of the class uniformly.
+Only the changes are simulated and the steps between them are skipped exactly, so the
+dynamics are the same in distribution as the sequential and batched schemes. After a change
+only the site and, if it became or stopped being infected, its S neighbours move class.
+
+The event loop is a kernel as in Sweep.py, each giving the same trajectory for a given seed:
+reference   The loop run directly on NumPy arrays. Slow, kept for checking the others.
+python      The same loop on Python lists, which index much faster than NumPy arrays.
+numba       The same loop compiled with Numba, only available if Numba is installed.
+Random numbers are drawn in blocks and handed to the kernel.
+"""
+import numpy as np
+import importlib.util
+
+classes = 8     # S with k = 0 to 4 infected neighbours (0 to 4), I (5), R (6), Im (7)
+block = 4096    # Random numbers drawn at a time
+
+def events(lat, cls, members, sizes, pos, prob, xDim, yDim, left, wait, rand):
+    """
+    Simulate the changes in the next left steps, in place, until the steps or random numbers run out.
+    :param lat: Flattened lattice.
+    :param cls: Class of each site.
+    :param members: Sites of each class, class c in members[c*N:c*N + sizes[c]].
+    :param sizes: Number of sites in each class.
+    :param pos: Index of each site among the members of its class.
+    :param prob: Chance of a change for a site of each class.
+    :param left: Steps left to simulate.
+    :param wait: Steps until the next change, 0 if not drawn yet.
+    :param rand: Uniform random numbers to use.
+    :return left, wait: Steps left (0 unless rand ran out) and steps until the next change
+                        (-1 if nothing can change).
+    :return used: Number of random numbers used.
+    :return nInf, nRec, nSus: Number of infections, recoveries and losses of immunity.
+    """
+    N = xDim*yDim
+    r = 0
+    nInf = 0
+    nRec = 0
+    nSus = 0
+    while left > 0:
+        if wait == 0:                                               # Draw the steps to the next change
+            Q = 0.
+            for c in range(classes):
+                Q += prob[c]*sizes[c]
+            if Q <= 0.:
+                return((0, -1, r, nInf, nRec, nSus))               # Nothing can change
+            if r >= len(rand):
+                break
+            q = Q/N
+            if q >= 1.:
+                wait = 1
+            else:
+                wait = int(np.log(1. - rand[r])/np.log1p(-q)) + 1
+            r += 1
+        if wait > left:                                             # No change in the steps left
+            wait -= left
+            left = 0
+            break
+        if r + 2 > len(rand):
+            break
+        left -= wait
+        wait = 0
+        # Pick the class by its total, then a site of it uniformly.
+        Q = 0.
+        for c in range(classes):
+            Q += prob[c]*sizes[c]
+        x = rand[r]*Q
+        chosen = 0
+        for c in range(classes):
+            w = prob[c]*sizes[c]
+            if w > 0.:
+                chosen = c                                          # Last possible class, in case x falls
+                if x < w:                                           # past the end through rounding
+                    break
+                x -= w
+        i = int(rand[r + 1]*sizes[chosen])
+        if i >= sizes[chosen]:
+            i = sizes[chosen] - 1
+        s = members[chosen*N + i]
+        r += 2
+        state = lat[s]
+        si = s//yDim
+        sj = s - si*yDim
+        nbs = (((si - 1 + xDim) % xDim)*yDim + sj, ((si + 1) % xDim)*yDim + sj, si*yDim + (sj + 1) % yDim, si*yDim + (sj - 1 + yDim) % yDim)
+        if state == 0:                                              # Infection
+            lat[s] = 1
+            new = 5
+            nInf += 1
+        elif state == 1:                                            # Recovery
+            lat[s] = -1
+            new = 6
+            nRec += 1
+        else:                                                       # Loss of immunity
+            lat[s] = 0
+            new = 0
+            for n in nbs:
+                if lat[n] == 1:
+                    new += 1
+            nSus += 1
+        # Move sites to their new classes: s itself, then S neighbours if s became or stopped being infected.
+        for m in range(5):
+            if m == 0:
+                site = s
+                target = new
+            else:
+                site = nbs[m - 1]
+                if state == -1 or lat[site] != 0:
+                    continue
+                target = cls[site] + 1 if state == 0 else cls[site] - 1
+            old = cls[site]
+            last = members[old*N + sizes[old] - 1]                  # Swap the last member into site's place
+            members[old*N + pos[site]] = last
+            pos[last] = pos[site]
+            sizes[old] -= 1
+            members[target*N + sizes[target]] = site
+            pos[site] = sizes[target]
+            sizes[target] += 1
+            cls[site] = target
+    return((left, wait, r, nInf, nRec, nSus))
+
+compiled = None # events() compiled with Numba, once needed
+
+def eventsNumba(*args):
+    """
+    Run events() compiled with Numba, importing Numba and compiling on the first call.
+    """
+    global compiled
+    if compiled is None:
+        import numba
+        compiled = numba.njit(cache=True)(events)
+    return(compiled(*args))
+
+kernels = {"reference" : events, "python" : events} # Python runs on lists, see kineticState
+if importlib.util.find_spec("numba") is not None:
+    kernels["numba"] = eventsNumba
+    fastest = "numba"
+else:
+    fastest = "python"
+
+class kineticState(object):
+    """
+    Class of every site and the members of every class, kept up to date as sites change.
+    """
+    def __init__(self, lat, p1, p2, p3, kernel="auto"):
+        """
+        :param lat: The lattice, changed in place by sweep().
+        :param p1: Probability of infection (per infected neighbour).
+        :param p2: Probability of recovery.
+        :param p3: Probability of becoming susceptible.
+        :param kernel: "reference", "python" or "numba" (see kernels), "auto" for the fastest available.
+        """
+        if kernel == "auto" or kernel not in kernels:
+            kernel = fastest
+        self.kernel = kernels[kernel]
+        self.lists = kernel == "python"                                             # Python lists index much faster than arrays
+        self.flat = lat.reshape(-1)                                                 # View, updated in place
+        self.xDim, self.yDim = lat.shape
+        self.size = lat.size
+        self.prob = np.concatenate([1. - (1. - p1)**np.arange(0, 5), [p2, p3, 0.]])
+        self.wait = 0       # Steps until the next change, 0 if to be drawn
+        self.rebuild(lat)
+
+    def rebuild(self, lat):
+        """
+        Sort every site into its class from scratch.
+        """
+        infected = (lat == 1).astype(np.int8)
+        NI = np.roll(infected, 1, axis=0) + np.roll(infected, -1, axis=0)\
+           + np.roll(infected, 1, axis=1) + np.roll(infected, -1, axis=1)           # Infected nearest neighbours
+        self.cls = np.select([lat == 0, lat == 1, lat == -1], [NI, 5, 6], 7).reshape(-1).astype(np.int64)
+        order = np.argsort(self.cls, kind="stable")
+        self.sizes = np.bincount(self.cls, minlength=classes).astype(np.int64)
+        starts = np.cumsum(self.sizes) - self.sizes
+        self.pos = np.empty(self.size, dtype=np.int64)
+        self.pos[order] = np.arange(self.size) - np.repeat(starts, self.sizes)
+        self.members = np.zeros(classes*self.size, dtype=np.int64)
+        self.members[self.cls*self.size + self.pos] = np.arange(self.size)
+        if self.lists:
+            self.cls, self.members, self.sizes, self.pos, self.prob = [a.tolist() for a in (self.cls, self.members, self.sizes, self.pos, self.prob)]
+
+    def state(self):
+        """
+        Everything sweep() depends on besides the lattice and random numbers, for a checkpoint.
+        Saving the order of the members too means a resumed run picks the same sites.
+        :return saved: Dictionary of arrays, for restore().
+        """
+        return({"wait" : np.array(self.wait), "cls" : np.asarray(self.cls), "members" : np.asarray(self.members),
+                "sizes" : np.asarray(self.sizes), "pos" : np.asarray(self.pos)})
+
+    def restore(self, saved):
+        """
+        Continue from the result of state(), for the same lattice.
+        """
+        self.wait = int(saved["wait"])
+        self.cls, self.members, self.sizes, self.pos = [np.array(saved[key], dtype=np.int64) for key in ["cls", "members", "sizes", "pos"]]
+        if self.lists:
+            self.cls, self.members, self.sizes, self.pos = [a.tolist() for a in (self.cls, self.members, self.sizes, self.pos)]
+
+    def sweep(self, rng):
+        """
+        Perform N random sequential steps (one sweep), simulating only the changes.
+        :param rng: NumPy random Generator.
+        :return transitions: Number of infections, recoveries and losses of immunity in the sweep.
+        """
+        transitions = np.zeros(3, dtype=np.int64)
+        left = self.size
+        while left > 0:
+            rand = rng.random(block)
+            if self.lists:
+                rand = rand.tolist()
+            left, self.wait, used, nInf, nRec, nSus = self.kernel(self.flat, self.cls, self.members, self.sizes, self.pos, self.prob,
+                                                                  self.xDim, self.yDim, left, self.wait, rand)
+            transitions += (nInf, nRec, nSus)
+            if self.wait < 0:
+                self.wait = 0
+                break
+        return(transitions)
@@ -1,23 +1,149 @@
 import numpy as np
-import matplotlib.pyplot as pyplot
-from matplotlib import colors
-from matplotlib.animation import FuncAnimation
-from matplotlib.patches import Patch
 import os
-from PIL import Image
+import json
+import pickle
+import Sweep
+import Observables
+import Distributed
+import Kinetic
 
-# make a color map of fixed colors
-cList = ["yellow", "orange", "red", "black"]
-cmap = colors.ListedColormap(cList)
-bounds=[-1.5, -0.5, 0.5, 1.5, 2.5]
-norm = colors.BoundaryNorm(bounds, cmap.N)
+updates = ["sequential", "checkerboard", "batched", "distributed", "kinetic"]
+keeps = ["all", "ring", "none"]
+dtypes = ["int8", "int16", "int32", "int64"]
+states = [0, 1, -1, 2] # Value of each state, in the order (S, I, R, Im) used for counts
+palette = [(255, 255, 0), (255, 165, 0), (255, 0, 0), (0, 0, 0)] # Colours of R, S, I and Im in recorded frames, as in Display
+
+def colourMasks(xDim, yDim):
+    """
+    Split the lattice into sublattices with no two nearest neighbours in the same one, so each
+    sublattice can be updated at once. Two colours (a checkerboard) are enough when both
+    dimensions are even; otherwise the periodic boundary joins sites of the same colour and
+    three are used.
+    :return masks: List of boolean arrays, one for each colour.
+    """
+    i, j = np.indices((xDim, yDim))
+    if xDim % 2 == 0 and yDim % 2 == 0:
+        colour = (i + j) % 2
+    else:
+        # Colour each ring with 0, 1 alternating, and 2 for the last site of an odd ring.
+        fi = np.where((xDim % 2 == 1) & (i == xDim - 1), 2, i % 2)
+        fj = np.where((yDim % 2 == 1) & (j == yDim - 1), 2, j % 2)
+        colour = (fi + fj) % 3
+    return([colour == c for c in np.unique(colour)])
+
+def initialSites(size, initProportions, dtype=np.int8):
+    """
+    Get the (unshuffled) states of every site for the given initial proportions.
+    :param size: Number of sites.
+    :param initProportions: Fraction of sites in each state as a tuple (S, I, R, Im).
+    :param dtype: Type of the array, a signed integer type.
+    :return sites: 1D array of states.
+    """
+    # Check proportions are physical:
+    if sum(initProportions) > 1.0000001:
+        print("Error. Proportions sum to more than 1. Exiting.")
+        exit()
+    if sum(initProportions) < 0.9999999:
+        print("Warning. Proportions sum to less than 1. Extra will be made up of S sites.")
+    # Number of sites with each state
+    N = [int(round(size*initProportions[i])) for i in range(0, 4)]
+    # Account for any rounding of these fractions by adding susceptible sites, only a small number.
+    while sum(N) < size:
+        N[0] += 1
+    while sum(N) > size:
+        N[0] -= 1
+    return(np.repeat(np.array(states, dtype=dtype), N))
+
+def countStates(lat):
+    """
+    Count the sites in each state from scratch.
+    :param lat: The lattice (X, Y), or stack of lattices (R, X, Y).
+    :return counts: Number of S, I, R and Im sites, shape (4,) or (R, 4).
+    """
+    return(np.stack([np.count_nonzero(lat == s, axis=(-2, -1)) for s in states], axis=-1))
+
+def updateCounts(counts, transitions):
+    """
+    Update state counts in place from the transitions made in a sweep. Sites only move
+    S -> I -> R -> S, so the three transition counts give the change in every state.
+    :param counts: Counts from countStates().
+    :param transitions: Number of infections, recoveries and losses of immunity, shape (3,) or (R, 3).
+    """
+    transitions = np.asarray(transitions)
+    nInf, nRec, nSus = transitions[..., 0], transitions[..., 1], transitions[..., 2]
+    counts[..., 0] += nSus - nInf
+    counts[..., 1] += nInf - nRec
+    counts[..., 2] += nRec - nSus
+
+def neighbourSum(a, out):
+    """
+    Sum of the four nearest neighbours of every site, with periodic boundary conditions, over
+    the last two axes and written into out without allocating (as the sum of np.roll by +-1 on each).
+    :param a: Array to sum, (X, Y) or (R, X, Y).
+    :param out: Array of the same shape, not overlapping a.
+    """
+    for axis in (-2, -1):
+        n = a.shape[axis]
+        A, O = np.moveaxis(a, axis, 0), np.moveaxis(out, axis, 0)   # Views with the axis first
+        if axis == -2:
+            np.add(A[:-2], A[2:], out=O[1:-1])
+            np.add(A[-1], A[1 % n], out=O[0])
+            if n > 1:
+                np.add(A[-2], A[0], out=O[-1])
+        else:
+            np.add(O[1:-1], A[:-2], out=O[1:-1])
+            np.add(O[1:-1], A[2:], out=O[1:-1])
+            np.add(O[0], A[-1], out=O[0])
+            np.add(O[0], A[1 % n], out=O[0])
+            if n > 1:
+                np.add(O[-1], A[-2], out=O[-1])
+                np.add(O[-1], A[0], out=O[-1])
+
+def checkerboardSweep(lat, colours, p1, p2, p3, rng, work=None):
+    """
+    Perform one sweep by updating each sublattice in turn. Sites in a sublattice share no
+    nearest neighbours, so all of them are updated at once from pre-drawn random numbers.
+    Works on a single lattice (X, Y) or a stack of replicas (R, X, Y), in place.
+    :param lat: The lattice, or stack of lattices.
+    :param colours: Sublattice masks from colourMasks().
+    :param p1: Probability of infection, a number or an array with one entry per replica.
+    :param p2: Probability of recovery, as p1.
+    :param p3: Probability of becoming susceptible, as p1.
+    :param rng: NumPy random Generator.
+    :param work: Optional pair of int8 arrays of the lattice shape for the infected sites and their
+                 counts, so they are not allocated every sweep.
+    :return transitions: Number of infections, recoveries and losses of immunity in the sweep,
+                         shape (3,) or (R, 3).
+    """
+    transitions = 0
+    p1, p2, p3 = [np.asarray(p, dtype=float)[..., None] for p in (p1, p2, p3)]
+    # Chance of an S site being infected with k infected neighbours, testing each with p1.
+    pInf = 1. - (1. - p1)**np.arange(0, 5)
+    if work is None:
+        work = (np.empty(lat.shape, dtype=np.int8), np.empty(lat.shape, dtype=np.int8))
+    infected, NI = work
+    for mask in colours:
+        np.equal(lat, 1, out=infected)
+        neighbourSum(infected, NI)                                                  # Infected nearest neighbours
+        sites = lat[..., mask]
+        rand = rng.random(sites.shape)                                              # One random number per site
+        new = sites.copy()
+        infection = (sites == 0) & (rand < np.take_along_axis(pInf, NI[..., mask], axis=-1))
+        recovery = (sites == 1) & (rand < p2)
+        loss = (sites == -1) & (rand < p3)
+        new[infection] = 1                                                          # Infection
+        new[recovery] = -1                                                          # Recovery
+        new[loss] = 0                                                               # Loss of immunity
+        lat[..., mask] = new                                                        # Immune sites never change.
+        transitions = transitions + np.stack([np.count_nonzero(m, axis=-1) for m in (infection, recovery, loss)], axis=-1)
+    return(transitions)
 
 class lattice(object):
     """
     Lattice object for the SIRS model with built in dynamics and periodic boundary conditions. Each site has 
     one of 4 states; 0 is susceptible, 1 is infected, -1 is recovered, and 2 is immune.
     """
-    def __init__(self, xDim=50, yDim=0, initProportions=[0.5, 0.5, 0., 0.], probs=(1./3., 1./3., 1./3.), measure=True, tEquib=100, tCorr=10, outDir="Data", label="Run", status=True):
+    def __init__(self, xDim=50, yDim=0, initProportions=[0.5, 0.5, 0., 0.], probs=(1./3., 1./3., 1./3.), measure=True, tEquib=100, tCorr=10, outDir="Data", label="Run", status=True, update="sequential", seed=None, kernel="auto", resume=False, keep="all", keepLength=1024, countSeries=False, dtype="int8", workers=1):
         """
         Constructor for the lattice object. Defaults to square lattice.
         :param xDim: The x dimension of the lattice. Defaults to 50.
@@ -29,7 +155,44 @@ class lattice(object):
         :param tEquib: The equilibrium time of the system (number of sweeps)
         :param tCorr: Autocorrelation time of the system (number of sweeps)
         :param outDir: 
+        :param update: Update scheme, "sequential" (random sequential, default), "checkerboard"
+                       (every site once per sweep, one sublattice at a time) or "batched" (random
+                       sequential from random numbers drawn once per sweep) or "distributed" (checkerboard
+                       sublattices updated in strips by worker processes, see Distributed.py) or "kinetic"
+                       (random sequential, simulating only the steps that change a site, see Kinetic.py).
+        :param seed: Seed for the random number generator used by the checkerboard and batched schemes.
+                     The sequential scheme uses the global NumPy random state.
+        :param kernel: Sweep kernel for the batched scheme, "reference", "python" or "numba" (see Sweep.py).
+                       The kinetic scheme uses its own kernel of the same name (see Kinetic.py).
+                       Defaults to the fastest available.
+        :param resume: Allow the run directory to exist already, e.g. to continue from a checkpoint.
+        :param keep: Which measurements of I to keep as a raw series, "all", "ring" (only the
+                     last keepLength) or "none". Statistics are accumulated as the run goes
+                     either way (see Observables.observable), so "ring" and "none" use the
+                     same memory however long the run.
+        :param keepLength: Number of measurements kept with keep="ring".
+        :param countSeries: Whether to record the number of sites in each state after every sweep
+                            (see countHistory()), kept as set by keep. Needs measure on.
+        :param dtype: Type of the lattice array, one of dtypes. States fit in int8, which uses an
+                      eighth of the memory of the default integer.
+        :param workers: Number of worker processes for the distributed scheme.
         """
+        if update not in updates:
+            print("Error. Update scheme {} not recognised. Options are {}.".format(update, ", ".join(updates)))
+            exit()
+        self.update = update
+        if dtype not in dtypes:
+            print("Error. Lattice type {} not recognised. Options are {}.".format(dtype, ", ".join(dtypes)))
+            exit()
+        self.dtype = np.dtype(dtype)
+        self.rng = np.random.default_rng(seed)
+        if kernel == "auto":
+            kernel = Sweep.fastest
+        if kernel not in Sweep.kernels:
+            print("Error. Kernel {} not available. Options are {}.".format(kernel, ", ".join(Sweep.kernels)))
+            exit()
+        self.kernel = Sweep.kernels[kernel]
+        self.kernelName = kernel
         self.outDir = outDir
         self.label = label
         self.path = self.outDir + "/" + self.label
@@ -38,10 +201,19 @@ class lattice(object):
         self.tEquib = tEquib    # Equilibration time
         self.tCorr = tCorr      # Auto-correlation time
         self.stop = False       # Stop calculations (e.g. if no infected sites)
+        self.hooks = []         # Functions called with the lattice after every sweep
         if self.measure:
-            self.IList = []
-            self.tList = []        
-            if os.path.exists(self.path):
+            if keep not in keeps:
+                print("Error. Keep option {} not recognised. Options are {}.".format(keep, ", ".join(keeps)))
+                exit()
+            self.I = Observables.observable(keep, keepLength, dtype=np.int64) # Measurements of I
+            self.countSeries = None # Counts of each state after every sweep, if recorded
+            if countSeries and keep != "none":
+                self.countSeries = Observables.series(keepLength, dtype=np.int64, width=4, ring=(keep == "ring"))
+            if os.path.exists(self.path) and resume:
+                # Continuing a previous run, reuse its directory
+                pass
+            elif os.path.exists(self.path):
                 # Don't overwrite previous data
                 print("Error. Output path {} already exists and measure is on. Exiting to avoid overwrite.".format(self.path))
                 exit()
@@ -59,26 +231,26 @@ class lattice(object):
         else:
             self.yDim = xDim
         self.size = self.xDim*self.yDim
-        # Check proportions are physical:
-        if sum(initProportions) > 1.0000001:
-            print("Error. Proportions sum to more than 1. Exiting.")
-            exit()
-        if sum(initProportions) < 0.9999999:
-            print("Warning. Proportions sum to less than 1. Extra will be made up of S sites.")
-        # Number of sites with each state
-        N = [int(round(self.size*initProportions[i])) for i in range(0, 4)]
-        # Account for any rounding of these fractions by adding susceptible sites, only a small number.
-        while sum(N) < self.size:
-            N[0] += 1
-        while sum(N) > self.size:
-            N[0] -= 1
         # Define lattice
-        sites = np.array([0]*N[0] + [1]*N[1] + [-1]*N[2] + [2]*N[3])
-        np.random.shuffle(sites)
+        sites = initialSites(self.size, initProportions, self.dtype)
+        if self.update == "sequential":
+            np.random.shuffle(sites)
+        else:
+            self.rng.shuffle(sites)
         self.lattice = sites.reshape(self.xDim, self.yDim)
+        self.counts = countStates(self.lattice) # Number of S, I, R and Im sites, kept up to date by each sweep
+        if self.update == "checkerboard":
+            self.colours = colourMasks(self.xDim, self.yDim)
+            self.work = (np.empty(self.lattice.shape, dtype=np.int8), np.empty(self.lattice.shape, dtype=np.int8)) # For checkerboardSweep()
         
         # Store probabilities
         self.p1, self.p2, self.p3 = probs
+        self.shared = None # Shared memory lattice and worker processes, only used by the distributed scheme.
+        self.kinetic = None # Sites sorted by chance of changing, only used by the kinetic scheme, built at the first sweep.
+        if self.update == "distributed":
+            self.colours = colourMasks(self.xDim, self.yDim)
+            self.shared = Distributed.stripPool(self.lattice, self.colours, probs, seed, workers)
+            self.lattice = self.shared.lattice                                      # Updated by the workers
         if status:
             # Print state
             print(self)
@@ -87,12 +259,72 @@ class lattice(object):
         """
         Returns string for printing key details of object.
         """
-        return("Array has shape {}, contains {} S cells, {} I, {} R, and {} Im entries.".format(self.lattice.shape, np.count_nonzero(self.lattice == 0), np.count_nonzero(self.lattice == 1), np.count_nonzero(self.lattice == -1), np.count_nonzero(self.lattice == 2)))
+        return("Array has shape {}, contains {} S cells, {} I, {} R, and {} Im entries.".format(self.lattice.shape, *self.counts))
     
     def next(self):
         """
-        Perform one sweep.
+        Perform one sweep with the selected update scheme, then measure.
+        """
+        if self.update == "checkerboard":
+            self.nextCheckerboard()
+        elif self.update == "batched":
+            self.nextBatched()
+        elif self.update == "distributed":
+            updateCounts(self.counts, self.shared.sweep())
+        elif self.update == "kinetic":
+            self.nextKinetic()
+        else:
+            self.nextSequential()
+        self.t += 1                                                                 # Increase time.
+        if self.measure and self.countSeries is not None:
+            self.countSeries.add(self.t, self.counts)
+        if self.t > self.tEquib and self.t % self.tCorr == 0 and self.measure:    # If time is right
+            self.I.add(self.t, self.getFrac())                                      # Update measurements
+        if self.getFrac() == 0:                                                     # If no infected sites remain
+            if self.measure:                                                        # Update measurements if on
+                self.I.add(self.t, 0)                                               #
+            self.stop = True                                                        # End run
+        for hook in self.hooks:
+            hook(self)
+
+    def nextCheckerboard(self):
+        """
+        Perform one sweep by updating each sublattice in turn with checkerboardSweep().
+        Every site is updated exactly once per sweep, unlike the random sequential scheme where
+        the number of updates of a site in a sweep varies, so this is a different dynamics with
+        the same rules.
+        """
+        updateCounts(self.counts, checkerboardSweep(self.lattice, self.colours, self.p1, self.p2, self.p3, self.rng, self.work))
+
+    def nextBatched(self):
+        """
+        Perform one sweep of random sequential updates, drawing every site index and random
+        number for the sweep in two calls and running the updates in the chosen kernel.
+        Each step uses a single random number; an S site with k infected neighbours is
+        infected with probability 1-(1-p1)^k, as for testing each neighbour in turn.
+        """
+        sites = self.rng.integers(0, self.size, size=self.size)                     # Site picked at each step
+        rand = self.rng.random(self.size)                                           # Random number for each step
+        pInf = 1. - (1. - self.p1)**np.arange(0, 5)
+        flat = self.lattice.reshape(-1)                                             # View, updated in place
+        updateCounts(self.counts, self.kernel(flat, sites, rand, self.xDim, self.yDim, pInf, self.p2, self.p3))
+
+    def nextKinetic(self):
+        """
+        Perform one sweep of random sequential updates rejection free: the steps between changes
+        are skipped, drawn all at once, and each change is picked with the right probability
+        (see Kinetic.py). The same dynamics as the sequential and batched schemes in distribution,
+        much faster where few sites can change.
+        """
+        if self.kinetic is None:
+            self.kinetic = Kinetic.kineticState(self.lattice, self.p1, self.p2, self.p3, self.kernelName)
+        updateCounts(self.counts, self.kinetic.sweep(self.rng))
+
+    def nextSequential(self):
         """
+        Perform one sweep of random sequential updates, one random site at a time.
+        """
+        nInf, nRec, nSus = 0, 0, 0                                                  # Transitions this sweep
         for s in range(0, self.size):                                               # Each step
             i = np.random.randint(0, self.xDim)                                     # Pick random site
             j = np.random.randint(0, self.yDim)                                     # 
@@ -106,74 +338,213 @@ class lattice(object):
                             infected = True                                         #
                             break                                                   # Only test for infection once
                 self.lattice[i, j] = int(infected)                                  # Update lattice
+                nInf += int(infected)                                               #
             elif self.lattice[i, j] == 1:                                           # For infected sites
-                if np.random.rand() < self.p2: self.lattice[i, j] = -1              # Test for recovery, recover if passes
+                if np.random.rand() < self.p2:                                      # Test for recovery, recover if passes
+                    self.lattice[i, j] = -1                                         #
+                    nRec += 1                                                       #
                 else: self.lattice[i, j] = 1                                        # Otherwise keep infected
             elif self.lattice[i, j] == -1:                                          # For recovered sites
-                if np.random.rand() < self.p3: self.lattice[i, j] = 0               # Test for (and change to) susceptibility
+                if np.random.rand() < self.p3:                                      # Test for (and change to) susceptibility
+                    self.lattice[i, j] = 0                                          #
+                    nSus += 1                                                       #
                 else: self.lattice[i, j] = -1                                       # Else keep the same
                                                                                     # Immune cells not considered.
-        self.t += 1                                                                 # Increase time.
-        if self.t > self.tEquib and self.t % self.tCorr == 0 and self.measure:    # If time is right
-            self.tList.append(self.t)                                               # Update lists
-            self.IList.append(self.getFrac())                                       # 
-        if self.getFrac() == 0:                                                     # If no infected sites remain
-            if self.measure:                                                        # Update lists if measurements on
-                self.tList.append(self.t)                                           #
-                self.IList.append(self.getFrac())                                   # 
-            self.stop = True                                                        # End run
+        updateCounts(self.counts, (nInf, nRec, nSus))
+
+    def close(self):
+        """
+        Stop the worker processes of the distributed scheme and free its shared memory. Nothing
+        to do for the other schemes.
+        """
+        if self.shared is not None:
+            self.lattice = np.array(self.lattice)                                   # Keep the state once the shared memory is gone
+            self.shared.close()
+            self.shared = None
 
     def getFrac(self):
         """
-        Get the number of infected sites on the lattice.
+        Get the number of infected sites on the lattice, from the running counts.
         """
-        I = np.count_nonzero(self.lattice == 1)
-        return(I)
+        return(int(self.counts[1]))
 
-    def animate(self, f, tMax):
-        if not self.stop:
-            if self.t <= tMax:
-                self.next()
-            im = pyplot.imshow(self.lattice, cmap=cmap, interpolation="nearest") #"seismic"
-            pyplot.clim(-1.5, 2.5)
-            return([im])
-        else:
-            return([])
-        
-    def display(self, tMax=1000):
-        fig, axis = pyplot.subplots()
-        for s in axis.spines: axis.spines[s].set_color("r")
-        axis.spines['left'].set_position(('outward', 1))
-        axis.spines['top'].set_position(('outward', 0.5))
-        pyplot.imshow(self.lattice, cmap=cmap, interpolation="nearest") #"bwr"
-        pyplot.clim(-1.5, 2.5)
-        labels = ["Recovered", "Susceptible", "Infected", "Immune"]
-        legendElements = []
-        for e in [1, 2, 0, 3]:
-            legendElements.append(Patch(facecolor=cList[e], edgecolor="k", label=labels[e]))
-        fig.legend(handles=legendElements, loc="center right")
-        axis.set_position([0.01, 0.08, 0.85, 0.85], which='both')
-        anim = FuncAnimation(fig, self.animate, tMax, interval=0, blit=True, repeat=False, fargs=(tMax,))
-        pyplot.show()
-        print("Animation finished. Please close the animation window.")
-
-    def run(self, tMax=1000):
+    def countHistory(self):
+        """
+        Get the number of sites in each state after every sweep, if recorded (countSeries).
+        :return t: Array of times (sweeps).
+        :return counts: Array of shape (n, 4), the number of S, I, R and Im sites at each time.
+        """
+        if not self.measure or self.countSeries is None:
+            return(np.array([], dtype=np.int64), np.empty((0, 4), dtype=np.int64))
+        return(self.countSeries.times(), self.countSeries.values())
+
+    def display(self, tMax=1000, sweeps=1, factor=0, view="sample"):
+        """
+        Animate the lattice (see Display.display, imported here so headless runs never load matplotlib).
+        :param sweeps: Number of sweeps per frame.
+        :param factor: Downsampling factor for large lattices, 0 to choose one to fit the screen.
+        :param view: How blocks are downsampled, "sample" or "density".
+        """
+        import Display
+        Display.display(self, tMax, sweeps, factor, view)
+
+    def recordTrajectory(self, path, frames):
+        """
+        Save the state now and after every following sweep as int8 to a memory mapped file (see
+        Trajectory.py), through a hook. Close the writer returned once the run is over.
+        :param path: Output .npy file.
+        :param frames: Number of frames to allocate space for, usually tMax + 1.
+        :return writer: The Trajectory.trajectoryWriter.
+        """
+        import Trajectory
+        writer = Trajectory.trajectoryWriter(path, self.lattice.shape, frames)
+        writer(self)
+        self.hooks.append(writer)
+        return(writer)
+
+    def frame(self):
+        """
+        Get the current state as a uint8 image of palette indices (state + 1, so R, S, I, Im are 0 to 3)
+        for a Video.frameWriter.
+        """
+        return((self.lattice + 1).astype(np.uint8))
+
+    def record(self, path, tMax=1000, sweeps=1, factor=1, fmt="auto", fps=30):
+        """
+        Run for up to tMax sweeps without a window, writing a frame every sweeps sweeps (see Video.py).
+        :param path: Output file or directory.
+        :param factor: Keep every factor-th row and column of each frame.
+        :param fmt: Video format, one of Video.formats.
+        :param fps: Frames per second of movies.
+        """
+        import Video
+        sweeps = max(1, sweeps)
+        writer = Video.frameWriter(path, self.lattice.shape, tMax//sweeps + 1, palette, fmt, fps, factor)
+        try:
+            self.run(tMax, video=writer, every=sweeps)
+        finally:
+            writer.close()
+        print("{} frames written to {}".format(writer.count, writer.path))
+
+    def run(self, tMax=1000, checkpoint=0, video=None, every=1):
+        """
+        Perform up to tMax sweeps, stopping early if no infected sites remain.
+        :param checkpoint: Save a checkpoint every this many sweeps (0 for never).
+        :param video: Video.frameWriter to pass a frame to every every sweeps (and at the start), or None.
+        """
+        if video is not None:
+            video.write(self.frame())
         for i in range(0, tMax):
             if not self.stop:
                 self.next()
+                if video is not None and (i + 1) % every == 0:
+                    video.write(self.frame())
+                if checkpoint > 0 and self.t % checkpoint == 0:
+                    self.saveCheckpoint()
             else: 
                 break
 
-    def analyse(self, showPlot=False):
+    def runAdaptive(self, tMax=1000, relErr=0.01, absErr=0.001, tLimit=None, tauCrit=2., checkpoint=0):
+        """
+        Perform sweeps until <psi> is known well enough, rather than for a fixed number. Needs
+        measurements on. The run stops as soon as the standard error on <psi> (from blocking
+        analysis of the measurements) is below relErr*<psi> or absErr, which also ends runs
+        that are at or close to the absorbing state. The error is only trusted once it is flat
+        over several blocking levels (see Observables.blockingStats.plateau), as it is an
+        underestimate until the run is long compared with the correlation time. Runs that have
+        not converged after tMax sweeps only continue, up to tLimit, if their measurements are
+        strongly correlated (autocorrelation time above tauCrit measurements), as happens near
+        the critical region.
+        :param tMax: Usual sweep budget.
+        :param relErr: Target relative error on <psi>.
+        :param absErr: Target absolute error on <psi>.
+        :param tLimit: Largest number of sweeps for correlated runs, defaults to 4*tMax.
+        :param tauCrit: Autocorrelation time (in measurements) above which the budget is extended.
+        :param checkpoint: Save a checkpoint every this many sweeps (0 for never).
+        """
+        if tLimit is None:
+            tLimit = 4*tMax
+        for i in range(0, max(tMax, tLimit)):
+            if self.stop:
+                break
+            self.next()
+            if checkpoint > 0 and self.t % checkpoint == 0:
+                self.saveCheckpoint()
+            if self.I.plateau():
+                err = self.I.error()/float(self.size)
+                if err <= max(relErr*self.I.mean/float(self.size), absErr):
+                    break
+            if i + 1 >= tMax and self.I.tau() < tauCrit:
+                break
+
+    def saveCheckpoint(self):
+        """
+        Save everything needed to continue the run (lattice, time, measurement accumulators,
+        random states including those of distributed workers, and the classes of the kinetic
+        scheme) to Checkpoint.npz in the run directory. Written to a temporary file first so an
+        interrupted save leaves the previous checkpoint intact.
+        """
+        legacy = np.random.get_state()
+        path = "{}/Checkpoint.npz".format(self.path)
+        extra = {} # Scheme specific state
+        if self.kinetic is not None:
+            extra = {"kinetic" + key.capitalize() : value for key, value in self.kinetic.state().items()}
+        if self.shared is not None:
+            extra["workerRng"] = json.dumps(self.shared.getStates())             # Each worker's own stream
+        with open(path + ".tmp", "wb") as outFile:
+            np.savez(outFile, lattice=self.lattice, t=self.t, stop=self.stop, **extra,
+                     I=np.frombuffer(pickle.dumps(self.I), dtype=np.uint8),
+                     countSeries=np.frombuffer(pickle.dumps(self.countSeries), dtype=np.uint8),
+                     rng=json.dumps(self.rng.bit_generator.state),
+                     legacyKey=legacy[1], legacyPos=legacy[2], legacyGauss=legacy[3], legacyCached=legacy[4])
+        os.replace(path + ".tmp", path)
+
+    def loadCheckpoint(self):
+        """
+        Continue from Checkpoint.npz in the run directory, if there is one.
+        :return loaded: Whether a checkpoint was found and loaded.
         """
-        Function to analyse the results of this run and plot, showing if requested.
+        path = "{}/Checkpoint.npz".format(self.path)
+        if not os.path.exists(path):
+            return(False)
+        with np.load(path) as data:
+            self.lattice[...] = data["lattice"]                                     # In place, as it may be shared
+            self.kinetic = None                                                     # Rebuilt from the lattice if not saved
+            if "kineticWait" in data.files:
+                # Continue the kinetic scheme from its saved classes and wait, not just the lattice.
+                self.kinetic = Kinetic.kineticState(self.lattice, self.p1, self.p2, self.p3, self.kernelName)
+                self.kinetic.restore({key : data["kinetic" + key.capitalize()] for key in ["wait", "cls", "members", "sizes", "pos"]})
+            self.counts = countStates(self.lattice)
+            self.t = int(data["t"])
+            self.stop = bool(data["stop"])
+            self.I = pickle.loads(data["I"].tobytes())
+            self.countSeries = pickle.loads(data["countSeries"].tobytes())
+            self.rng.bit_generator.state = json.loads(str(data["rng"]))
+            if self.shared is not None and "workerRng" in data.files:
+                self.shared.setStates(json.loads(str(data["workerRng"])))
+            np.random.set_state(("MT19937", data["legacyKey"], int(data["legacyPos"]), int(data["legacyGauss"]), float(data["legacyCached"])))
+        return(True)
+
+    def analyse(self, showPlot=False, plot=True):
         """
-        psi = np.array(self.IList)/float(self.size)
+        Function to analyse the results of this run and plot, showing if requested. Statistics
+        come from the accumulated measurements, the output file and plot from the kept series.
+        :param plot: Whether to plot psi against time to PsiVsTime.png. Without it matplotlib is never imported.
+        """
+        tList = self.I.times()
+        IList = self.I.values()
+        psi = IList/float(self.size)
         with open("{}/Result.csv".format(self.path), "w") as outFile:
             outFile.write("t,I\n")
-            for i in range(0, len(self.tList)):
-                outFile.write("{},{}\n".format(self.tList[i], self.IList[i]))
-        if 0 in self.IList or len(self.IList) == 0:
+            for i in range(0, len(tList)):
+                outFile.write("{},{}\n".format(tList[i], IList[i]))
+        if self.countSeries is not None:
+            t, counts = self.countHistory()
+            with open("{}/Counts.csv".format(self.path), "w") as outFile:
+                outFile.write("t,S,I,R,Im\n")
+                for i in range(0, len(t)):
+                    outFile.write("{},{},{},{},{}\n".format(t[i], *counts[i]))
+        if self.I.min == 0 or self.I.n == 0:
             # If the system reaches an absorbing state, it would stay infinitely long,
             # therefore average psi and variance are said to be zero
             avPsi = 0.
@@ -183,19 +554,14 @@ class lattice(object):
         else:
             # Convert I to psi (normalised)
             # Get statistics
-            avPsi = np.average(psi)
-            varPsi = np.var(psi)
-            avI = np.average(self.IList)
-            varI = np.var(self.IList)
+            avI = self.I.mean
+            varI = self.I.var()
+            avPsi = avI/float(self.size)
+            varPsi = varI/float(self.size)**2
         N = self.size
-        n = len(psi)
-        pyplot.plot(self.tList, psi)
-        pyplot.xlabel("Time (sweeps)")
-        pyplot.ylabel("$\psi$")
-        pyplot.savefig("{}/PsiVsTime.png".format(self.path))
-        if showPlot:
-            pyplot.show()
-        else:
-            pyplot.clf()
+        n = self.I.n
+        if plot:
+            import Display # Plotting only loaded when needed
+            Display.plotPsi(tList, psi, self.path, showPlot)
         return(avPsi, varPsi, avI, varI, N, n)
         
@@ -1,9 +1,7 @@
 import numpy as np
 import Lattice as lat
 import interactive as interact
-import matplotlib.pyplot as pyplot
 import sys
-from scipy.optimize import curve_fit
 
 # Default values:
 params = {"X Dimension":50,
@@ -18,7 +16,22 @@ params = {"X Dimension":50,
           "Animate" : True,
           "Measure" : True,
           "RunLabel" : "Run",
-          "outDir" : "Data"
+          "outDir" : "Data",
+          "Update" : "sequential",
+          "Kernel" : "auto",
+          "Keep" : "all",
+          "KeepLength" : 1024,
+          "CountSeries" : False,
+          "Plot" : True,
+          "SweepsPerFrame" : 1,
+          "Downsample" : 0,
+          "View" : "sample",
+          "Video" : None,
+          "VideoFormat" : "auto",
+          "FPS" : 30,
+          "Trajectory" : None,
+          "DType" : "int8",
+          "Workers" : 1
           }
 """
 Default correlation and equilibration times are based on "psiVsTime.png",
@@ -38,10 +51,6 @@ args = sys.argv[1:]
 interact.readArgs(args, params)
 np.random.seed(params["Seed"]) #None is default, changes each run.
 
-if not (params["Measure"] or params["Animate"]):
-    print("Error, system is set to neither animate nor measure. Exiting...")
-    exit()
-
 lattice = lat.lattice(params["X Dimension"], 
                       params["Y Dimension"], 
                       initProportions=params["Initial"], 
@@ -50,15 +59,39 @@ lattice = lat.lattice(params["X Dimension"],
                       tEquib=params["tEquib"],
                       measure=params["Measure"],
                       label=params["RunLabel"],
-                      outDir=params["outDir"])
+                      outDir=params["outDir"],
+                      update=params["Update"],
+                      seed=params["Seed"],
+                      kernel=params["Kernel"],
+                      keep=params["Keep"],
+                      keepLength=params["KeepLength"],
+                      countSeries=params["CountSeries"],
+                      dtype=params["DType"],
+                      workers=params["Workers"])
+
+# Save every sweep to a trajectory file if asked, through a hook on the lattice.
+trajectory = None
+if params["Trajectory"] is not None:
+    trajectory = lattice.recordTrajectory(params["Trajectory"], params["tMax"] + 1)
 
-if params["Animate"]:
-    lattice.display(tMax=params["tMax"])
+if params["Video"] is not None:
+    # Record to file instead of animating, with no window and no matplotlib.
+    lattice.record(params["Video"], tMax=params["tMax"], sweeps=params["SweepsPerFrame"], factor=max(1, params["Downsample"]), fmt=params["VideoFormat"], fps=params["FPS"])
+elif params["Animate"]:
+    lattice.display(tMax=params["tMax"], sweeps=params["SweepsPerFrame"], factor=params["Downsample"], view=params["View"])
 else:
     lattice.run(tMax=params["tMax"])
+    if not params["Measure"]:
+        # Nothing to analyse, just report the final state.
+        print("After {} sweeps: {}".format(lattice.t, lattice))
+if trajectory is not None:
+    trajectory.close()
+    print("{} frames saved to {}".format(trajectory.count, trajectory.path))
 
 if params["Measure"]:
-    avPsi, varPsi, avI, varI, N, n = lattice.analyse(showPlot=True)
+    avPsi, varPsi, avI, varI, N, n = lattice.analyse(showPlot=True, plot=params["Plot"])
     print("Average psi: {:.3f}\nVariance: {:.3f}".format(avPsi, varPsi))
+    if n >= lattice.I.stats.minBlocks and avPsi > 0:
+        print("Error on psi: {:.4f} ({} measurements, autocorrelation time {:.1f} measurements)".format(lattice.I.error()/float(N), n, lattice.I.tau()))
 
 print("#"*40 + "\nNote: If animation was exited manually then an error may appear above.\nDisregard this error.\n" + "#"*40)
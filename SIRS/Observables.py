@@ -0,0 +1,180 @@
+"""
+Online statistics for measurements taken during a run, updated one value at a time in constant
+memory so that long runs can be monitored (and stopped) as they go.
+"""
+import numpy as np
+from Series import series
+
+class runningStats(object):
+    """
+    Running mean and variance with Welford's algorithm.
+    """
+    def __init__(self):
+        self.n = 0          # Number of values
+        self.mean = 0.      # Mean of values
+        self.M2 = 0.        # Sum of squared deviations from the mean
+
+    def add(self, x):
+        """
+        Add a value.
+        """
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta/self.n
+        self.M2 += delta*(x - self.mean)
+
+    def var(self):
+        """
+        Population variance of the values (as np.var).
+        """
+        if self.n == 0:
+            return(0.)
+        return(self.M2/self.n)
+
+    def error(self):
+        """
+        Standard error on the mean, assuming the values are uncorrelated.
+        """
+        if self.n < 2:
+            return(np.inf)
+        return(np.sqrt(self.M2/(self.n*(self.n - 1))))
+
+class blockingStats(object):
+    """
+    Blocking analysis (Flyvbjerg and Petersen) done online. Level l keeps running statistics
+    of the means of blocks of 2^l consecutive values. Correlated values give an error on the
+    mean that grows with the block size until blocks are longer than the correlation time,
+    so the largest estimate over levels with enough blocks is used.
+    """
+    def __init__(self, minBlocks=16):
+        """
+        :param minBlocks: Fewest blocks a level needs for its error estimate to be used.
+        """
+        self.minBlocks = minBlocks
+        self.levels = []    # runningStats for each level
+        self.pending = []   # Value waiting for a partner at each level, or None
+
+    def add(self, x):
+        """
+        Add a value, pairing it up into blocks at each level.
+        """
+        level = 0
+        while x is not None:
+            if level == len(self.levels):
+                self.levels.append(runningStats())
+                self.pending.append(None)
+            self.levels[level].add(x)
+            if self.pending[level] is None:
+                self.pending[level] = x
+                x = None
+            else:
+                x = 0.5*(self.pending[level] + x)
+                self.pending[level] = None
+                level += 1
+
+    @property
+    def n(self):
+        return(self.levels[0].n if len(self.levels) > 0 else 0)
+
+    @property
+    def mean(self):
+        return(self.levels[0].mean if len(self.levels) > 0 else 0.)
+
+    def var(self):
+        return(self.levels[0].var() if len(self.levels) > 0 else 0.)
+
+    def error(self):
+        """
+        Standard error on the mean allowing for correlations.
+        """
+        errors = [level.error() for level in self.levels if level.n >= self.minBlocks]
+        if len(errors) == 0:
+            return(np.inf)
+        return(max(errors))
+
+    def plateau(self, levels=3):
+        """
+        Whether the blocked error has stopped growing with the block size, as it does once blocks
+        are longer than the correlation time, so that error() can be trusted. The largest levels
+        levels with minBlocks blocks must agree, each no more than its own statistical error (a
+        fraction 1/sqrt(2(n-1)) for n blocks) above the one below. A single flat step is not
+        enough, as noise in the largest level often hides the growth.
+        """
+        usable = [level for level in self.levels if level.n >= self.minBlocks]
+        if len(usable) < levels:
+            return(False)
+        for top, below in zip(usable[-levels + 1:], usable[-levels:-1]):
+            if top.error() > below.error()*(1. + 1./np.sqrt(2.*(top.n - 1))):
+                return(False)
+        return(True)
+
+    def tau(self):
+        """
+        Integrated autocorrelation time in units of the spacing between values, from the ratio
+        of the blocked to the naive error. About 0.5 for uncorrelated values.
+        """
+        if self.n < self.minBlocks or self.levels[0].var() == 0.:
+            return(0.5)
+        return(0.5*(self.error()/self.levels[0].error())**2)
+
+class observable(object):
+    """
+    A measurement with its statistics accumulated as it is taken: mean, variance, blocked
+    error and autocorrelation time (blockingStats) and, optionally, the raw series (series).
+    """
+    def __init__(self, keep="all", length=1024, dtype=float):
+        """
+        :param keep: Which raw values to keep, "all", "ring" (the last length values) or "none".
+        :param length: Initial capacity for "all", or the number of values kept for "ring".
+        :param dtype: Type of the raw values.
+        """
+        self.stats = blockingStats()
+        self.series = None
+        if keep in ["all", "ring"]:
+            self.series = series(length, dtype=dtype, ring=(keep == "ring"))
+        self.min = np.inf   # Smallest value seen
+
+    def add(self, t, x):
+        """
+        Add value x measured at time t.
+        """
+        self.stats.add(x)
+        self.min = min(self.min, x)
+        if self.series is not None:
+            self.series.add(t, x)
+
+    @property
+    def n(self):
+        return(self.stats.n)
+
+    @property
+    def mean(self):
+        return(self.stats.mean)
+
+    def var(self):
+        return(self.stats.var())
+
+    def error(self):
+        return(self.stats.error())
+
+    def plateau(self):
+        return(self.stats.plateau())
+
+    def tau(self):
+        return(self.stats.tau())
+
+    def times(self):
+        """
+        Times of the raw values kept (empty if none are).
+        """
+        if self.series is None:
+            return(np.array([], dtype=np.int64))
+        return(self.series.times())
+
+    def values(self):
+        """
+        Raw values kept (empty if none are).
+        """
+        if self.series is None:
+            return(np.array([]))
+        return(self.series.values())
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import os
+import time
+import shutil
+"""
+Startup time benchmark. Times fresh Python processes importing the simulation and running
+Main.py headless for a single sweep, and lists which heavy modules each one loads. Headless
+runs should load NumPy only.
+
+Usage: python StartupBench.py <repeats>  (default 10)
+"""
+
+heavy = ["matplotlib", "PIL", "scipy", "numba"]
+env = dict(os.environ, MPLBACKEND="Agg") # No windows from plots
+
+cases = {"Python alone" : ["-c", "pass"],
+         "import numpy" : ["-c", "import numpy"],
+         "import Lattice" : ["-c", "import Lattice"],
+         "Main.py -A N -M N -N 1" : ["Main.py", "-A", "N", "-M", "N", "-N", "1", "-x", "20"],
+         "Main.py -A N -M Y -plot N -N 1" : ["Main.py", "-A", "N", "-M", "Y", "-plot", "N", "-N", "1", "-x", "20", "-o", "StartupBench"],
+         "Main.py -A N -M Y -N 1" : ["Main.py", "-A", "N", "-M", "Y", "-N", "1", "-x", "20", "-o", "StartupBench"]}
+
+def loaded(args):
+    """
+    Get the heavy modules loaded by running args (script or -c code) in a fresh process.
+    """
+    if args[0] == "-c":
+        code = args[1]
+    else:
+        code = "import sys; sys.argv = {}; exec(open({!r}).read())".format(args, args[0])
+    code += "\nimport sys, os\nos.write(1, ('\\nLOADED:' + ','.join(m for m in {} if m in sys.modules) + '\\n').encode())".format(heavy)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env).stdout
+    return([line[7:] for line in out.splitlines() if line.startswith("LOADED:")][-1])
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("{:34s} {:>10s} {:>10s}  {}".format("Case", "Median (s)", "Min (s)", "Heavy modules loaded"))
+    for name, args in cases.items():
+        times = []
+        for r in range(0, repeats):
+            shutil.rmtree("StartupBench", ignore_errors=True)
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+            times.append(time.perf_counter() - start)
+        shutil.rmtree("StartupBench", ignore_errors=True)
+        times.sort()
+        print("{:34s} {:10.3f} {:10.3f}  {}".format(name, times[len(times)//2], times[0], loaded(args) or "none"))
+    shutil.rmtree("StartupBench", ignore_errors=True)
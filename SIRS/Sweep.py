@@ -0,0 +1,109 @@
+"""
+Kernels for random sequential SIRS sweeps from pre-drawn random numbers. Each kernel performs
+exactly the same comparisons on the same numbers, so for a given set of draws all of them give
+bit identical lattices:
+reference   The step of the original sequential scheme (Lattice.nextSequential) on the 2D
+            lattice, written apart from sweep() so that the others are checked against code
+            they do not share. Slow.
+python      The loop in sweep() on Python lists, which index much faster than NumPy arrays.
+numba       The same loop compiled with Numba, only available if Numba is installed. Numba is
+            slow to import, so it is only imported (and the loop compiled) on first use.
+"""
+import importlib.util
+
+def sweep(lat, sites, rand, xDim, yDim, pInf, p2, p3):
+    """
+    Perform random sequential updates in place on a flattened lattice.
+    :param lat: Flattened lattice (array or list).
+    :param sites: Flat index of the site picked at each step.
+    :param rand: Uniform random number for each step.
+    :param xDim: The x dimension of the lattice.
+    :param yDim: The y dimension of the lattice.
+    :param pInf: Probability of infection for each number of infected neighbours (0-4).
+    :param p2: Probability of recovery.
+    :param p3: Probability of becoming susceptible.
+    :return transitions: Number of infections, recoveries and losses of immunity in the sweep.
+    """
+    nInf = 0
+    nRec = 0
+    nSus = 0
+    for s in range(len(sites)):
+        n = sites[s]
+        state = lat[n]
+        if state == 0:                                              # Susceptible, count infected NNs
+            i = n//yDim
+            j = n - i*yDim
+            k = 0
+            if lat[((i - 1 + xDim) % xDim)*yDim + j] == 1: k += 1
+            if lat[((i + 1) % xDim)*yDim + j] == 1: k += 1
+            if lat[i*yDim + (j + 1) % yDim] == 1: k += 1
+            if lat[i*yDim + (j - 1 + yDim) % yDim] == 1: k += 1
+            if rand[s] < pInf[k]:
+                lat[n] = 1
+                nInf += 1
+        elif state == 1:                                            # Infected
+            if rand[s] < p2:
+                lat[n] = -1
+                nRec += 1
+        elif state == -1:                                           # Recovered
+            if rand[s] < p3:
+                lat[n] = 0
+                nSus += 1
+    return((nInf, nRec, nSus))
+
+def sweepReference(lat, sites, rand, xDim, yDim, pInf, p2, p3):
+    """
+    Perform random sequential updates in place as the original sequential scheme does, one site
+    at a time on the 2D lattice, but with the site and random number of each step taken from
+    the draws. An S site is infected if its number is below the chance of infection by any of
+    its k infected neighbours, pInf[k], rather than testing each neighbour with a number of its
+    own. Arguments and return value as for sweep().
+    """
+    grid = lat.reshape(xDim, yDim)                                  # View, updated in place
+    nInf, nRec, nSus = 0, 0, 0
+    for n, r in zip(sites, rand):
+        i, j = divmod(int(n), yDim)                                 # Site picked at this step
+        if grid[i, j] == 0:                                         # For susceptible sites
+            NNs = [((i-1)%xDim, j), ((i+1)%xDim, j), (i, (j+1)%yDim), (i, (j-1)%yDim)]
+            k = sum(1 for nn in NNs if grid[nn] == 1)               # Infected nearest neighbours
+            if r < pInf[k]:                                         # Test for infection
+                grid[i, j] = 1
+                nInf += 1
+        elif grid[i, j] == 1:                                       # For infected sites
+            if r < p2:                                              # Test for recovery
+                grid[i, j] = -1
+                nRec += 1
+        elif grid[i, j] == -1:                                      # For recovered sites
+            if r < p3:                                              # Test for susceptibility
+                grid[i, j] = 0
+                nSus += 1
+                                                                    # Immune sites never change.
+    return((nInf, nRec, nSus))
+
+def sweepList(lat, sites, rand, xDim, yDim, pInf, p2, p3):
+    """
+    Run sweep() on Python lists and copy the result back into the flattened lattice lat.
+    """
+    cells = lat.tolist()
+    transitions = sweep(cells, sites.tolist(), rand.tolist(), xDim, yDim, pInf.tolist(), p2, p3)
+    lat[:] = cells
+    return(transitions)
+
+compiled = None # sweep() compiled with Numba, once needed
+
+def sweepNumba(lat, sites, rand, xDim, yDim, pInf, p2, p3):
+    """
+    Run sweep() compiled with Numba, importing Numba and compiling on the first call.
+    """
+    global compiled
+    if compiled is None:
+        import numba
+        compiled = numba.njit(cache=True)(sweep)
+    return(compiled(lat, sites, rand, xDim, yDim, pInf, p2, p3))
+
+kernels = {"reference" : sweepReference, "python" : sweepList}
+if importlib.util.find_spec("numba") is not None:
+    kernels["numba"] = sweepNumba
+    fastest = "numba"
+else:
+    fastest = "python"
@@ -0,0 +1,119 @@
+"""
+Storage of the full state after every sweep, for analysis after the run. Frames go straight
+into a memory mapped .npy file preallocated for the whole run, so memory use does not grow
+with the run length, and are read back one at a time with the file mapped rather than loaded.
+States are stored as int8, or for 0/1 lattices (Game of Life) packed 8 cells per byte along
+each row (np.packbits with bitorder="little", as in Packed.py). A .json file next to the .npy
+records the number of frames written, the lattice shape, the packing and the first sweep.
+
+A trajectoryWriter is attached to a lattice through its hooks, which are called after every
+sweep (see lattice.recordTrajectory()).
+"""
+import numpy as np
+import os
+import json
+
+class trajectoryWriter(object):
+    """
+    Writes one frame per call into a preallocated memory mapped file.
+    """
+    def __init__(self, path, shape, frames, packed=False):
+        """
+        :param path: Output file, .npy is added if missing.
+        :param shape: Shape of the lattice.
+        :param frames: Number of frames to allocate space for, usually tMax + 1.
+        :param packed: Whether to pack 8 sites per byte (sites must be 0 or 1).
+        """
+        if os.path.splitext(path)[1].lower() != ".npy":
+            path = path + ".npy"
+        self.path = path
+        self.shape = tuple(shape)
+        self.packed = packed
+        self.rowBytes = -(-self.shape[1]//8)
+        store = (frames, self.shape[0], self.rowBytes) if packed else (frames,) + self.shape
+        self.store = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8 if packed else np.int8, shape=store)
+        self.count = 0  # Frames written so far
+        self.t0 = None  # Sweep of the first frame
+        self.last = None # Sweep of the last frame given, saved or not
+        self.full = False
+
+    def __call__(self, lattice):
+        """
+        Hook for lattice.hooks: write the current state of the lattice.
+        """
+        if self.last is not None and lattice.t != self.last + 1:
+            # Frames are consecutive sweeps, so a gap (e.g. a skipped cycle) can not be stored.
+            print("Error. Trajectory frames must be consecutive sweeps, got sweep {} after {}.".format(lattice.t, self.last))
+            exit()
+        self.last = lattice.t
+        if self.packed and getattr(lattice, "packed", None) is not None:
+            # The packed engine already holds rows in the same bit order, so no unpacking is needed.
+            frame = lattice.packed.astype("<u8", copy=False).view(np.uint8)[:, :self.rowBytes]
+            self.add(frame, lattice.t, isPacked=True)
+        else:
+            self.add(lattice.lattice, lattice.t)
+
+    def add(self, lat, t, isPacked=False):
+        """
+        Write a frame.
+        :param lat: 2D array of the state (already packed if isPacked).
+        :param t: Sweep of the state.
+        """
+        if self.count == self.store.shape[0]:
+            if not self.full:
+                print("Warning. Trajectory file {} is full after {} frames, later sweeps are not saved.".format(self.path, self.count))
+                self.full = True
+            return
+        if self.t0 is None:
+            self.t0 = t
+        if self.packed and not isPacked:
+            self.store[self.count] = np.packbits(lat != 0, axis=1, bitorder="little")
+        else:
+            self.store[self.count] = lat
+        self.count += 1
+
+    def close(self):
+        """
+        Flush the frames to disk and write the .json file.
+        """
+        self.store.flush()
+        with open(os.path.splitext(self.path)[0] + ".json", "w") as outFile:
+            json.dump({"frames" : self.count, "shape" : list(self.shape), "packed" : self.packed, "t0" : self.t0}, outFile)
+
+class trajectoryReader(object):
+    """
+    Random access to the frames of a trajectory file without loading it. reader[t] is the
+    state at sweep t, as a 2D int8 array.
+    """
+    def __init__(self, path):
+        """
+        :param path: .npy file written by a trajectoryWriter.
+        """
+        if os.path.splitext(path)[1].lower() != ".npy":
+            path = path + ".npy"
+        with open(os.path.splitext(path)[0] + ".json", "r") as inFile:
+            info = json.load(inFile)
+        self.shape = tuple(info["shape"])
+        self.packed = info["packed"]
+        self.t0 = info["t0"] if info["t0"] is not None else 0
+        self.store = np.load(path, mmap_mode="r")[:info["frames"]]
+
+    def __len__(self):
+        return(self.store.shape[0])
+
+    def times(self):
+        """
+        Sweeps of the frames stored.
+        """
+        return(np.arange(self.t0, self.t0 + len(self)))
+
+    def __getitem__(self, t):
+        """
+        State at sweep t. Only that frame is read from disk.
+        """
+        i = t - self.t0
+        if i < 0 or i >= len(self):
+            raise IndexError("Sweep {} is not in the trajectory (sweeps {} to {}).".format(t, self.t0, self.t0 + len(self) - 1))
+        if self.packed:
+            return(np.unpackbits(self.store[i], axis=1, count=self.shape[1], bitorder="little").view(np.int8))
+        return(np.array(self.store[i]))
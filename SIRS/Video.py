@@ -0,0 +1,143 @@
+"""
+Recording of runs without a window. Frames (2D uint8 arrays of palette indices, from
+lattice.frame()) are handed to a frameWriter, which queues them for a background thread that
+does the encoding, so the simulation carries on while frames are written. Formats:
+raw     Frames stored as uint8 in a memory mapped .npy file preallocated for the whole run, with a
+        .json file giving the number of frames written and the palette. Read with readRaw().
+ffmpeg  Frames piped to ffmpeg as RGB and encoded to a movie (e.g. .mp4), if ffmpeg is installed.
+png     A directory of indexed (palette) PNG files, one per frame.
+"""
+import numpy as np
+import os
+import json
+import queue
+import shutil
+import subprocess
+import threading
+
+formats = ["auto", "raw", "ffmpeg", "png"]
+
+def chooseFormat(path):
+    """
+    Pick a format from the output path: raw for .npy, ffmpeg for movie extensions (if installed,
+    raw otherwise), and png for anything else (a directory).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return("raw")
+    if ext in [".mp4", ".avi", ".mkv", ".mov", ".gif", ".webm"]:
+        if shutil.which("ffmpeg") is not None:
+            return("ffmpeg")
+        print("Warning. ffmpeg not found, writing raw frames to {} instead.".format(os.path.splitext(path)[0] + ".npy"))
+        return("raw")
+    return("png")
+
+class frameWriter(object):
+    """
+    Writes frames on a background thread. Call write() with each frame and close() at the end.
+    """
+    def __init__(self, path, shape, frames, palette, fmt="auto", fps=30, factor=1, queueSize=64):
+        """
+        :param path: Output file (raw or ffmpeg) or directory (png).
+        :param shape: Shape of the lattice.
+        :param frames: Largest number of frames that will be written (the raw file is preallocated for these).
+        :param palette: List of (R, G, B) colours, one per value a frame can hold.
+        :param fmt: One of formats. "auto" chooses from the path (see chooseFormat()).
+        :param fps: Frames per second of movies.
+        :param factor: Keep only every factor-th row and column of each frame, for large lattices.
+        :param queueSize: Frames held in the queue before write() waits for the encoder.
+        """
+        if fmt not in formats:
+            print("Error. Video format {} not recognised. Options are {}.".format(fmt, ", ".join(formats)))
+            exit()
+        if fmt == "auto":
+            fmt = chooseFormat(path)
+        if fmt == "raw" and os.path.splitext(path)[1].lower() != ".npy":
+            path = os.path.splitext(path)[0] + ".npy"
+        self.fmt = fmt
+        self.path = path
+        self.factor = max(1, factor)
+        self.shape = (-(-shape[0]//self.factor), -(-shape[1]//self.factor))
+        self.palette = np.array(palette, dtype=np.uint8)
+        self.count = 0 # Frames written so far
+        self.error = None # Exception raised by the writer thread, if any
+        if self.fmt == "raw":
+            self.store = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(frames,) + self.shape)
+        elif self.fmt == "ffmpeg":
+            # Most codecs need even dimensions, so frames are padded by a row or column if needed.
+            self.padded = (self.shape[0] + self.shape[0] % 2, self.shape[1] + self.shape[1] % 2)
+            self.pipe = subprocess.Popen(["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                                          "-s", "{}x{}".format(self.padded[1], self.padded[0]), "-r", str(fps), "-i", "-",
+                                          "-pix_fmt", "yuv420p", path], stdin=subprocess.PIPE)
+        else:
+            if not os.path.exists(path):
+                os.mkdir(path)
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def write(self, frame):
+        """
+        Queue a frame to be written. Waits only if the queue is full.
+        :param frame: 2D uint8 array of palette indices.
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put(np.array(frame[::self.factor, ::self.factor], dtype=np.uint8))
+
+    def work(self):
+        """
+        Write queued frames until close() sends None.
+        """
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.encode(frame)
+                self.count += 1
+            except Exception as e:
+                self.error = e
+
+    def encode(self, frame):
+        if self.fmt == "raw":
+            self.store[self.count] = frame
+        elif self.fmt == "ffmpeg":
+            rgb = np.zeros(self.padded + (3,), dtype=np.uint8)
+            rgb[:self.shape[0], :self.shape[1]] = self.palette[frame]
+            self.pipe.stdin.write(rgb.tobytes())
+        else:
+            from PIL import Image
+            img = Image.fromarray(frame, mode="P")
+            img.putpalette(self.palette.reshape(-1).tolist())
+            img.save("{}/frame_{:06d}.png".format(self.path, self.count), optimize=False)
+
+    def close(self):
+        """
+        Wait for every queued frame to be written, then finish the file.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.fmt == "raw":
+            self.store.flush()
+            del self.store
+            with open(os.path.splitext(self.path)[0] + ".json", "w") as outFile:
+                json.dump({"frames" : self.count, "shape" : list(self.shape), "palette" : self.palette.tolist()}, outFile)
+        elif self.fmt == "ffmpeg":
+            self.pipe.stdin.close()
+            self.pipe.wait()
+        if self.error is not None:
+            raise self.error
+
+def readRaw(path):
+    """
+    Open raw frames written by a frameWriter without loading them.
+    :return frames: Read only memory mapped array of shape (frames, X, Y).
+    :return palette: Array of (R, G, B) colours.
+    """
+    with open(os.path.splitext(path)[0] + ".json", "r") as inFile:
+        info = json.load(inFile)
+    frames = np.load(path, mmap_mode="r")[:info["frames"]]
+    return(frames, np.array(info["palette"], dtype=np.uint8))
@@ -14,7 +14,7 @@ def readArgs(args, params):
                 exit()
         elif args[i] in ["-RS", "-rs"]: 
             try:
-                updates["Seed"] = float(args[i+1])
+                updates["Seed"] = int(float(args[i+1]))
                 i += 2
             except:
                 print("Unrecognised seed.")
@@ -110,6 +110,167 @@ def readArgs(args, params):
             except:
                 print("Unrecognised value for -o.")
                 exit()
+        elif args[i] in ["-u", "-U"]:
+            try:
+                updates["Update"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -u.")
+                exit()
+        elif args[i] in ["-kernel", "-Kernel"]:
+            try:
+                updates["Kernel"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -kernel.")
+                exit()
+        elif args[i] in ["-w", "-W"]:
+            try:
+                updates["Workers"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -w.")
+                exit()
+        elif args[i] in ["-res", "-Res"]:
+            try:
+                if args[i+1] in ["Y", "y"]:
+                    updates["Resume"] = True
+                    i += 2
+                elif args[i+1] in ["N", "n"]:
+                    updates["Resume"] = False
+                    i += 2
+                else:
+                    print("-res should be followed by 'Y' or 'N'.")
+                    exit()
+            except:
+                print("Error with -res tag.")
+                exit()
+        elif args[i] in ["-ens", "-Ens"]:
+            try:
+                if args[i+1] in ["Y", "y"]:
+                    updates["Ensemble"] = True
+                    i += 2
+                elif args[i+1] in ["N", "n"]:
+                    updates["Ensemble"] = False
+                    i += 2
+                else:
+                    print("-ens should be followed by 'Y' or 'N'.")
+                    exit()
+            except:
+                print("Error with -ens tag.")
+                exit()
+        elif args[i] in ["-adapt", "-Adapt"]:
+            try:
+                updates["Adaptive"] = float(args[i+1])
+                i += 2
+            except:
+                print("Unrecognised value for -adapt.")
+                exit()
+        elif args[i] in ["-ckpt", "-Ckpt"]:
+            try:
+                updates["Checkpoint"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -ckpt.")
+                exit()
+        elif args[i] in ["-counts", "-Counts"]:
+            try:
+                if args[i+1] in ["Y", "y"]:
+                    updates["CountSeries"] = True
+                    i += 2
+                elif args[i+1] in ["N", "n"]:
+                    updates["CountSeries"] = False
+                    i += 2
+                else:
+                    print("-counts should be followed by 'Y' or 'N'.")
+                    exit()
+            except:
+                print("Error with -counts tag.")
+                exit()
+        elif args[i] in ["-plot", "-Plot"]:
+            try:
+                if args[i+1] in ["Y", "y"]:
+                    updates["Plot"] = True
+                    i += 2
+                elif args[i+1] in ["N", "n"]:
+                    updates["Plot"] = False
+                    i += 2
+                else:
+                    print("-plot should be followed by 'Y' or 'N'.")
+                    exit()
+            except:
+                print("Error with -plot tag.")
+                exit()
+        elif args[i] in ["-k", "-K"]:
+            try:
+                updates["SweepsPerFrame"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -k.")
+                exit()
+        elif args[i] in ["-d", "-D"]:
+            try:
+                updates["Downsample"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -d.")
+                exit()
+        elif args[i] in ["-view", "-View"]:
+            try:
+                updates["View"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -view.")
+                exit()
+        elif args[i] in ["-vid", "-Vid"]:
+            try:
+                updates["Video"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -vid.")
+                exit()
+        elif args[i] in ["-vf", "-VF"]:
+            try:
+                updates["VideoFormat"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -vf.")
+                exit()
+        elif args[i] in ["-fps", "-FPS"]:
+            try:
+                updates["FPS"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -fps.")
+                exit()
+        elif args[i] in ["-traj", "-Traj"]:
+            try:
+                updates["Trajectory"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -traj.")
+                exit()
+        elif args[i] in ["-dtype", "-DType"]:
+            try:
+                updates["DType"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -dtype.")
+                exit()
+        elif args[i] in ["-keep", "-Keep"]:
+            try:
+                updates["Keep"] = args[i+1]
+                i += 2
+            except:
+                print("Unrecognised value for -keep.")
+                exit()
+        elif args[i] in ["-kl", "-KL"]:
+            try:
+                updates["KeepLength"] = int(float(args[i+1]))
+                i += 2
+            except:
+                print("Unrecognised value for -kl.")
+                exit()
         else:
             print("Key {} not recognised. Ignoring.".format(args[i]))
             i += 2
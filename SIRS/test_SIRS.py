@@ -0,0 +1,205 @@
+"""
+Checks of the SIRS update schemes and tools, run with pytest from this directory.
+"""
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import Lattice
+import Sweep
+import Experiment
+import Ensemble
+import Observables
+import Trajectory
+import Kinetic
+
+def sirs(tmp_path, update="batched", label="Run", **kwargs):
+    """
+    Small lattice writing into tmp_path.
+    """
+    settings = dict(xDim=20, probs=(0.5, 0.5, 0.5), measure=True, tEquib=0, tCorr=1, outDir=str(tmp_path),
+                    label=label, status=False, update=update, seed=4)
+    settings.update(kwargs)
+    return(Lattice.lattice(**settings))
+
+def test_trajectory_full_drops_frames(tmp_path):
+    lat = sirs(tmp_path)
+    writer = lat.recordTrajectory(str(tmp_path / "traj"), 3)
+    lat.run(6)
+    writer.close()
+    assert lat.t == 6
+    reader = Trajectory.trajectoryReader(str(tmp_path / "traj"))
+    assert list(reader.times()) == [0, 1, 2]
+
+def resumed(tmp_path, update, sweeps=12, at=5, **kwargs):
+    """
+    Final lattice and I series of a run straight through, and of one checkpointed after at
+    sweeps and continued by a fresh lattice.
+    """
+    np.random.seed(7)
+    straight = sirs(tmp_path, update, label="Straight", **kwargs)
+    straight.run(sweeps)
+    np.random.seed(7)
+    first = sirs(tmp_path, update, label="Resumed", **kwargs)
+    first.run(at)
+    first.saveCheckpoint()
+    np.random.seed(8)                                                               # Restored from the checkpoint
+    second = sirs(tmp_path, update, label="Resumed", resume=True, **kwargs)
+    assert second.loadCheckpoint()
+    second.run(sweeps - at)
+    return(straight, second)
+
+@pytest.mark.parametrize("update", ["sequential", "checkerboard", "batched", "distributed", "kinetic"])
+def test_checkpoint_resume_matches(tmp_path, update):
+    straight, second = resumed(tmp_path, update)
+    assert second.t == straight.t
+    assert (second.lattice == straight.lattice).all()
+    assert (np.asarray(second.I.values()) == np.asarray(straight.I.values())).all()
+
+@pytest.mark.parametrize("kernel", ["python", "numba"])
+def test_kinetic_kernels_match_reference(tmp_path, kernel):
+    if kernel not in Kinetic.kernels:
+        pytest.skip("Numba not installed")
+    runs = []
+    for name in ["reference", kernel]:
+        lat = sirs(tmp_path, "kinetic", label=name, kernel=name)
+        lat.run(10)
+        runs.append(lat.lattice.copy())
+    assert (runs[0] == runs[1]).all()
+
+def test_ensemble_keep_bounds_memory():
+    probs = [(0.5, 0.5, 0.5), (0.1, 1./3., 1./3.), (0.3, 0.5, 0.2)]
+    results = {}
+    for keep in ["all", "ring", "none"]:
+        ens = Ensemble.ensemble(20, probs=probs, tEquib=10, tCorr=2, seed=3, status=False, keep=keep, keepLength=8)
+        ens.run(300)
+        results[keep] = ens.analyse()
+        if keep == "ring":
+            assert max(len(ens.series(r)[0]) for r in range(0, ens.replicas)) <= 8
+    for keep in ["ring", "none"]:
+        for key in ["avPsi", "varPsi", "n"]:
+            assert np.allclose(results[keep][key], results["all"][key])
+
+@pytest.mark.parametrize("kernel", ["python", "numba"])
+def test_batched_kernels_match_reference(tmp_path, kernel):
+    if kernel not in Sweep.kernels:
+        pytest.skip("Numba not installed")
+    runs = []
+    for name in ["reference", kernel]:
+        lat = sirs(tmp_path, "batched", label=name, kernel=name, yDim=15)
+        lat.run(10)
+        runs.append(lat)
+    assert (runs[0].lattice == runs[1].lattice).all()
+    assert (runs[0].counts == runs[1].counts).all()
+
+@pytest.mark.parametrize("update", Lattice.updates)
+def test_counts_kept_up_to_date(tmp_path, update):
+    lat = sirs(tmp_path, update, measure=False)
+    for t in range(0, 10):
+        lat.next()
+        assert (lat.counts == Lattice.countStates(lat.lattice)).all()
+    lat.close()
+
+@pytest.mark.parametrize("shape", [(20, 20), (15, 21), (7, 8)])
+def test_colour_masks_cover_lattice_without_neighbours(shape):
+    masks = Lattice.colourMasks(*shape)
+    assert (sum(mask.astype(int) for mask in masks) == 1).all()
+    for mask in masks:
+        for axis in [0, 1]:
+            assert not (mask & np.roll(mask, 1, axis=axis)).any()
+
+@pytest.mark.parametrize("update", ["batched", "distributed"])
+def test_run_repeatable(tmp_path, update):
+    results = []
+    for name in ["First", "Second"]:
+        settings = dict(Experiment.params, **{"X Dimension" : 20, "tEquib" : 5, "tCorr" : 1, "Update" : update, "Workers" : 2, "outDir" : str(tmp_path / name)})
+        results.append(Experiment.runLat((0, 0.5, 0.5, 0.5, 0., 40, np.random.SeedSequence(3), settings)))
+    assert results[0] == results[1]
+
+def test_run_closes_workers(tmp_path):
+    settings = dict(Experiment.params, **{"X Dimension" : 20, "tEquib" : 5, "tCorr" : 1, "Update" : "distributed", "Workers" : 2, "outDir" : str(tmp_path)})
+    before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    Experiment.runLat((0, 0.5, 0.5, 0.5, 0., 40, np.random.SeedSequence(3), settings))
+    after = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    assert after <= before
+
+def test_ensemble_absorbed_replica():
+    ens = Ensemble.ensemble(20, probs=[(0., 0.5, 0.5), (0.5, 0.5, 0.5)], tEquib=10, tCorr=2, seed=3, status=False)
+    ens.run(200)
+    results = ens.analyse()
+    assert results["avPsi"][0] == 0. and results["avPsi"][1] > 0.
+
+def test_adaptive_stops_absorbed_run(tmp_path):
+    lat = sirs(tmp_path, probs=(0., 0.5, 0.5))
+    lat.runAdaptive(tMax=500)
+    assert lat.t < 500
+
+def test_blocking_waits_for_plateau():
+    rng = np.random.default_rng(5)
+    correlated = Observables.blockingStats()
+    uncorrelated = Observables.blockingStats()
+    x = 0.
+    for t in range(0, 1024):
+        x = 0.99*x + rng.normal()                                                   # Correlation time of about 100 values
+        correlated.add(1000. + x)
+        uncorrelated.add(1000. + rng.normal())
+    assert correlated.error() < 0.01*correlated.mean                                # Small, but not yet to be trusted
+    assert not correlated.plateau()
+    assert uncorrelated.plateau()
+
+def test_adaptive_waits_for_blocking_levels(tmp_path):
+    lat = sirs(tmp_path)
+    lat.runAdaptive(tMax=2000, relErr=0.05)
+    assert lat.I.n >= 4*lat.I.stats.minBlocks and lat.t < 2000
+
+def test_observable_matches_numpy():
+    x = np.random.default_rng(1).random(1000)
+    I = Observables.observable(keep="ring", length=100)
+    for t in range(0, x.size):
+        I.add(t, x[t])
+    assert np.isclose(I.mean, x.mean()) and np.isclose(I.var(), x.var())
+    assert (I.values() == x[-100:]).all() and (I.times() == np.arange(900, 1000)).all()
+
+@pytest.mark.parametrize("name", ["Series.py", "Trajectory.py", "Video.py"])
+def test_shared_modules_match_game_of_life(name):
+    here = os.path.dirname(os.path.abspath(__file__))
+    other = os.path.join(here, "..", "GameOfLife", name)
+    if not os.path.exists(other):
+        pytest.skip("GameOfLife directory not present")
+    with open(os.path.join(here, name), "rb") as mine, open(other, "rb") as theirs:
+        assert mine.read() == theirs.read()
+
+def test_headless_import_skips_plotting():
+    code = "import sys, Lattice, Experiment; print(sorted(m for m in ['matplotlib', 'PIL', 'numba'] if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_stage_plots(tmp_path):
+    res = {"p1" : [0.2, 0.3], "p3" : [0.5, 0.5], "psi" : [0.1, 0.2], "varI" : [1., 2.], "varPsi" : [0.01, 0.02], "N" : [400, 400], "n" : [10, 10]}
+    Experiment.plotPhaseDiagram(res, [0.2, 0.3], [0.5], str(tmp_path))
+    Experiment.plotCut(res, str(tmp_path))
+    Experiment.plotImmunity(res, [0., 0.5], str(tmp_path))
+    for name in ["Phase_Diagram", "Variance", "VarCut", "ImmuneFraction", "ImmuneFraction_stDevErrBar"]:
+        assert (tmp_path / (name + ".png")).exists()
+
+def test_trajectory_round_trip(tmp_path):
+    lat = sirs(tmp_path)
+    writer = lat.recordTrajectory(str(tmp_path / "traj"), 5)
+    states = [lat.lattice.copy()]
+    for t in range(0, 4):
+        lat.next()
+        states.append(lat.lattice.copy())
+    writer.close()
+    reader = Trajectory.trajectoryReader(str(tmp_path / "traj"))
+    for t in range(0, 5):
+        assert (reader[t] == states[t]).all()
+
+@pytest.mark.parametrize("update", ["checkerboard", "batched"])
+def test_int8_matches_int64(tmp_path, update):
+    runs = []
+    for dtype in ["int8", "int64"]:
+        lat = sirs(tmp_path, update, label=dtype, dtype=dtype)
+        lat.run(10)
+        runs.append(lat.lattice.copy())
+    assert (runs[0] == runs[1]).all()